@@ -1,9 +1,8 @@
 import os
 import json
 from openai import OpenAI, AsyncOpenAI
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, AsyncIterator
 from sqlalchemy.orm import Session
-from sqlalchemy import func, Float
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,6 +11,8 @@ load_dotenv()
 from agent_core.database import SessionLocal
 from agent_core.models.main_models import Exam, Subject, Question, Choice, UserProgress, DifficultyLevel, ExamSession
 from agent_core.core.expert_engine import ExpertEngine
+from agent_core.core.blueprints import rebuild_blueprints
+from agent_core.core import catalogue_cache, subject_profiles, tool_executor, topic_stats
 
 # Configure OpenAI
 api_key = os.getenv("OPENAI_API_KEY")
@@ -19,6 +20,15 @@ client = OpenAI(api_key=api_key)
 async_client = AsyncOpenAI(api_key=api_key)
 MODEL_ID = "gpt-4o"
 
+def _run_tool_in_own_session(function_name: str, function_args: Dict) -> Any:
+    """Worker-thread entry point: sessions are not thread-safe, so each tool call gets its own."""
+    agent = ExamAgent()
+    try:
+        return getattr(agent, function_name)(**function_args)
+    finally:
+        agent.close()
+
+
 class ExamAgent:
     """
     A senior virtual assistant with Adaptive Learning, Weakness Detection, 
@@ -36,11 +46,7 @@ class ExamAgent:
 
     def get_weak_topics(self, user_id: int) -> str:
         """Analyzes user performance and returns a string breakdown of accuracy per topic."""
-        stats = self.db.query(
-            UserProgress.topic,
-            func.avg(UserProgress.is_correct.cast(Float)).label('accuracy')
-        ).filter(UserProgress.user_id == user_id)\
-         .group_by(UserProgress.topic).all()
+        stats = topic_stats.topic_accuracy(self.db, user_id)
         
         if not stats:
             return "No performance history available yet. Start practicing!"
@@ -64,6 +70,13 @@ class ExamAgent:
             is_correct=is_correct
         )
         self.db.add(progress)
+        topic_stats.record_attempts(self.db, [{
+            "user_id": user_id,
+            "subject_id": q.subject_id,
+            "topic": q.topic,
+            "difficulty": q.difficulty,
+            "is_correct": is_correct,
+        }])
         self.db.commit()
         return f"Successfully logged performance for {q.topic}."
 
@@ -107,11 +120,7 @@ class ExamAgent:
         Includes correct answer metadata for internal system verification.
         """
         # 1. Identify raw accuracy for topic selection
-        stats = self.db.query(
-            UserProgress.topic,
-            func.avg(UserProgress.is_correct.cast(Float)).label('accuracy')
-        ).filter(UserProgress.user_id == user_id)\
-         .group_by(UserProgress.topic).all()
+        stats = topic_stats.topic_accuracy(self.db, user_id)
         
         weak_topics = {topic: acc for topic, acc in stats}
         
@@ -233,51 +242,31 @@ class ExamAgent:
 
     def grade_essay(self, content: str, criteria: str) -> str:
         """Grades an IELTS essay, Scholarship SOP, or academic writing."""
-        result = AIEngine.grade_essay_or_sop_sync(content, criteria)
+        result = ExpertEngine.grade_essay_or_sop_sync(content, criteria)
+        return json.dumps(result, indent=2)
+
+    async def grade_essay_async(self, content: str, criteria: str) -> str:
+        result = await ExpertEngine.grade_essay_or_sop(content, criteria)
         return json.dumps(result, indent=2)
 
     def run_interview_coach(self, scenario: str, user_text: str) -> str:
         """Provides expert feedback on an interview response."""
-        result = AIEngine.simulate_interview_sync(scenario, user_text)
+        result = ExpertEngine.simulate_interview_sync(scenario, user_text)
+        return json.dumps(result, indent=2)
+
+    async def run_interview_coach_async(self, scenario: str, user_text: str) -> str:
+        result = await ExpertEngine.simulate_interview(scenario, user_text)
         return json.dumps(result, indent=2)
 
     def get_subject_profile(self, subject_id: int, user_id: int = 1) -> str:
         """
         Generates a profile for a specific subject by analyzing its questions 
          and finding related documentation in the data folder.
+        Served from the subject profile store; regenerated only when the subject's content changes.
         """
-        subject = self.db.query(Subject).get(subject_id)
-        if not subject:
+        profile = subject_profiles.get_profile_sync(self.db, subject_id, user_id)
+        if profile is None:
             return json.dumps({"error": "Subject not found"})
-        
-        # 1. Fetch questions
-        questions = self.db.query(Question).filter(Question.subject_id == subject_id).limit(30).all()
-        q_data = [{"text": q.text, "topic": q.topic} for q in questions]
-        
-        # 2. Search for related files
-        extra_content = ""
-        data_root = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
-        # Heuristic search for files containing the subject name
-        for root, dirs, files in os.walk(data_root):
-            for file in files:
-                if subject.name.lower() in file.lower() and file.endswith(".md"):
-                    try:
-                        with open(os.path.join(root, file), "r", encoding="utf-8") as f:
-                            extra_content += f.read() + "\n\n"
-                    except:
-                        pass
-        
-        # 3. Analyze via Expert Engine
-        profile = AIEngine.analyze_syllabus_sync(subject.name, q_data, extra_content)
-        
-        # 4. Integrate stats (User Specific)
-        topics = self.db.query(UserProgress.topic, func.avg(UserProgress.is_correct.cast(Float)))\
-            .join(Question).filter(Question.subject_id == subject_id)\
-            .filter(UserProgress.user_id == user_id)\
-            .group_by(UserProgress.topic).all()
-        
-        profile["performance"] = {t: round(acc * 100, 1) for t, acc in topics}
-        
         return json.dumps(profile)
 
     def generate_new_content(self, exam_name: str, topic: str, difficulty: str, count: int = 5) -> str:
@@ -301,6 +290,7 @@ class ExamAgent:
             subject = exam.subjects[0] if exam.subjects else Subject(name=subject_name, exam_id=exam.id)
             if not subject.id:
                 self.db.add(subject)
+                catalogue_cache.bump_generation(self.db)
                 self.db.commit()
                 self.db.refresh(subject)
 
@@ -330,10 +320,42 @@ class ExamAgent:
                 self.db.add(choice)
             added_count += 1
         
+        if added_count:
+            rebuild_blueprints(self.db, subject.id, years=[None])
+            catalogue_cache.bump_generation(self.db)
         self.db.commit()
         return f"Successfully generated and stored {added_count} new questions for {exam_name} - {topic}."
 
-    async def chat(self, user_id: int, message: str, history: List[Dict] = [], subject_context: str = None) -> str:
+    # Blocking tools, run in the tool thread pool with their own session
+    SYNC_TOOLS = {
+        "list_available_exams", "search_exams", "get_weak_topics", "get_adaptive_v2", "log_answer",
+        "generate_new_content", "get_practice_batch", "get_session_summary", "get_simulation_history",
+    }
+    # Tools with a native async implementation
+    ASYNC_TOOLS = {
+        "grade_essay": "grade_essay_async",
+        "run_interview_coach": "run_interview_coach_async",
+    }
+
+    async def _dispatch_tool(self, function_name: str, function_args: Dict) -> Any:
+        if function_name == "navigate_to":
+            return f"Command sent: Navigating to {function_args['page']}"
+        if function_name == "start_exam":
+            return f"Command sent: Starting exam session for subject {function_args['subject_id']} at {function_args['difficulty']} difficulty."
+        if function_name in self.ASYNC_TOOLS:
+            return await getattr(self, self.ASYNC_TOOLS[function_name])(**function_args)
+        if function_name in self.SYNC_TOOLS:
+            return await tool_executor.run_sync(_run_tool_in_own_session, function_name, function_args)
+        return f"Error: Unknown tool '{function_name}'."
+
+    async def chat_stream(self, user_id: int, message: str, history: List[Dict] = [], subject_context: str = None) -> AsyncIterator[Dict]:
+        """
+        Streams a chat turn as events:
+          {"type": "action", "action": {...}}  navigate/start_exam, as soon as the model requests it
+          {"type": "tool", "name": ...}        another tool is being executed
+          {"type": "token", "text": ...}       a piece of the final answer
+          {"type": "done", "actions": [...]}   end of turn
+        """
         # Define tools for OpenAI
         tools = [
             {
@@ -543,70 +565,126 @@ class ExamAgent:
         
         messages.append({"role": "user", "content": message})
 
-        response = await async_client.chat.completions.create(
+        # First pass: stream the reply, accumulating any tool calls from their deltas
+        stream = await async_client.chat.completions.create(
             model=MODEL_ID,
             messages=messages,
             tools=tools,
-            tool_choice="auto"
+            tool_choice="auto",
+            stream=True
         )
 
-        response_message = response.choices[0].message
-        
-        if response_message.tool_calls:
-            messages.append(response_message)
+        content = ""
+        tool_calls = {}  # index -> {"id", "name", "arguments"}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content += delta.content
+                if not tool_calls:
+                    yield {"type": "token", "text": delta.content}
+            for tc in delta.tool_calls or []:
+                call = tool_calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                if tc.id:
+                    call["id"] = tc.id
+                if tc.function and tc.function.name:
+                    call["name"] += tc.function.name
+                if tc.function and tc.function.arguments:
+                    call["arguments"] += tc.function.arguments
+
+        if not tool_calls:
+            yield {"type": "done", "actions": []}
+            return
+
+        ordered_calls = [tool_calls[i] for i in sorted(tool_calls)]
+        messages.append({
+            "role": "assistant",
+            "content": content or None,
+            "tool_calls": [
+                {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                for c in ordered_calls
+            ],
+        })
+        
+        actions_taken = []
+        print(f"DEBUG: Processing tool calls for User {user_id}: {[c['name'] for c in ordered_calls]}")
+        calls = []
+        for call in ordered_calls:
+            function_name = call["name"]
+            function_args = json.loads(call["arguments"] or "{}")
             
-            actions_taken = []
-            print(f"DEBUG: Processing tool calls for User {user_id}: {[tc.function.name for tc in response_message.tool_calls]}")
-            for tool_call in response_message.tool_calls:
-                function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
-                
-                # FORCE injection of current user_id to prevent IDOR via tool-guessing
-                # If the tool expects a user_id, it will be overridden by the session's verified user_id.
-                if "user_id" in function_args or function_name in [
-                    "get_weak_topics", "get_adaptive_v2", "log_answer", 
-                    "get_practice_batch", "get_session_summary", "get_simulation_history"
-                ]:
-                    function_args["user_id"] = user_id
-                
-                # Special handling for navigation/start_exam which don't have DB methods
-                if function_name == "navigate_to":
-                    result = f"Command sent: Navigating to {function_args['page']}"
-                    actions_taken.append({"type": "navigate", "page": function_args['page']})
-                elif function_name == "start_exam":
-                    result = f"Command sent: Starting exam session for subject {function_args['subject_id']} at {function_args['difficulty']} difficulty."
-                    actions_taken.append({
-                        "type": "start_exam", 
-                        "exam_id": function_args['exam_id'],
-                        "subject_id": function_args['subject_id'],
-                        "difficulty": function_args['difficulty']
-                    })
-                elif function_name == "search_exams":
-                    result = self.search_exams(**function_args)
-                else:
-                    # Execute the corresponding method
-                    method = getattr(self, function_name)
-                    result = method(**function_args)
-                
-                function_response = json.dumps(result) if not isinstance(result, str) else result
-                
-                messages.append({
-                    "tool_call_id": tool_call.id,
-                    "role": "tool",
-                    "name": function_name,
-                    "content": function_response,
-                })
+            # FORCE injection of current user_id to prevent IDOR via tool-guessing
+            # If the tool expects a user_id, it will be overridden by the session's verified user_id.
+            if "user_id" in function_args or function_name in [
+                "get_weak_topics", "get_adaptive_v2", "log_answer", 
+                "get_practice_batch", "get_session_summary", "get_simulation_history"
+            ]:
+                function_args["user_id"] = user_id
             
-            second_response = await async_client.chat.completions.create(
-                model=MODEL_ID,
-                messages=messages,
-            )
-            final_text = second_response.choices[0].message.content or ''
-            if actions_taken:
-                # We prefix with [ACTION_TRIGGERED] if not already present (Expert Engine was told to include it, but we'll ensure)
-                action_json = json.dumps(actions_taken)
-                return f"{final_text}\n\n[ACTIONS: {action_json}]"
+            # Special handling for navigation/start_exam which don't have DB methods
+            action = None
+            if function_name == "navigate_to":
+                action = {"type": "navigate", "page": function_args['page']}
+            elif function_name == "start_exam":
+                action = {
+                    "type": "start_exam", 
+                    "exam_id": function_args['exam_id'],
+                    "subject_id": function_args['subject_id'],
+                    "difficulty": function_args['difficulty']
+                }
+            if action:
+                actions_taken.append(action)
+                # Sent before any tool runs so the UI can switch views immediately
+                yield {"type": "action", "action": action}
+            else:
+                yield {"type": "tool", "name": function_name}
+            calls.append((function_name, function_args))
+
+        # All tool calls of this turn run concurrently, off the event loop
+        results = await tool_executor.run_tool_calls(calls, self._dispatch_tool)
+
+        for call, (function_name, _), result in zip(ordered_calls, calls, results):
+            function_response = json.dumps(result) if not isinstance(result, str) else result
             
-            return final_text
+            messages.append({
+                "tool_call_id": call["id"],
+                "role": "tool",
+                "name": function_name,
+                "content": function_response,
+            })
         
-        return response_message.content
+        # Second pass: stream the final answer token by token
+        second_stream = await async_client.chat.completions.create(
+            model=MODEL_ID,
+            messages=messages,
+            stream=True
+        )
+        async for chunk in second_stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield {"type": "token", "text": chunk.choices[0].delta.content}
+
+        yield {"type": "done", "actions": actions_taken}
+
+    async def chat(self, user_id: int, message: str, history: List[Dict] = [], subject_context: str = None) -> str:
+        """
+        Non-streaming reply, with actions as an [ACTIONS: ...] trailer. Like the
+        pre-streaming chat(), a turn that calls tools returns only the answer
+        written after the tool results; any text streamed before the first tool
+        call is dropped.
+        """
+        final_text = ""
+        actions_taken = []
+        async for event in self.chat_stream(user_id, message, history, subject_context):
+            if event["type"] == "token":
+                final_text += event["text"]
+            elif event["type"] in ("tool", "action"):
+                # Tool events sit between the first pass and the post-tool answer
+                final_text = ""
+            elif event["type"] == "done":
+                actions_taken = event["actions"]
+        if actions_taken:
+            # We prefix with [ACTION_TRIGGERED] if not already present (Expert Engine was told to include it, but we'll ensure)
+            action_json = json.dumps(actions_taken)
+            return f"{final_text}\n\n[ACTIONS: {action_json}]"
+        return final_text
@@ -1,10 +1,19 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import os
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Changing BCRYPT_ROUNDS makes verify_and_update() return a fresh hash, so stored hashes are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt is pure CPU, so it runs in its own process pool: no GIL contention and no
+# request-handling threadpool slots held while hashing. Created lazily in the worker process.
+_password_executor = None
 
 # JWT configuration
 # JWT configuration
@@ -21,6 +30,35 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+def _verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def _get_password_executor():
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS)
+    return _password_executor
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), get_password_hash, password)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    """
+    Verifies a password off the event loop.
+    Returns (is_valid, new_hash); new_hash is set when the stored hash uses outdated cost parameters.
+    """
+    if not plain_password or not hashed_password:
+        return False, None
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_password_executor(), _verify_and_update, plain_password, hashed_password)
+
+def shutdown_password_executor():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False)
+        _password_executor = None
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
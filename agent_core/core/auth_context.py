@@ -0,0 +1,136 @@
+"""
+Auth Context
+============
+Verified-claims cache for authenticated requests.
+
+auth_middleware verifies the bearer token once and puts the claims on
+request.state; get_current_user then resolves a lightweight UserSnapshot
+(id, username, is_admin, tier) from this cache instead of re-decoding the
+JWT and selecting the User row on every request.
+
+Entries are keyed by a hash of the token and expire after
+AUTH_CACHE_TTL_SECONDS, at the token's own expiry, or when the cached tier
+lapses, whichever comes first. toggle_admin and subscription purchase call
+invalidate_user(). The cache is per process, so other workers pick the
+change up within the TTL.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from jose import JWTError, jwt
+
+from agent_core.core import auth
+from agent_core.models.main_models import SubscriptionTier, User
+
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    username: str
+    is_admin: bool
+    tier: SubscriptionTier
+    tier_expires_at: Optional[datetime] = None
+
+    @property
+    def current_tier(self) -> SubscriptionTier:
+        return self.tier
+
+
+def snapshot_user(user: User) -> UserSnapshot:
+    """Built from the tier projection on the user row (see subscriptions.py); no subscription rows are loaded."""
+    tier = user.current_tier
+    expires = user.tier_expires_at if tier != SubscriptionTier.FREE else None
+    return UserSnapshot(user.id, user.username, bool(user.is_admin), tier, expires)
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    def __init__(self, ttl_seconds: int = AUTH_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()  # key -> {"expires", "claims", "user", "user_expires"}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires"] <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            keys = self._by_user.get(entry["claims"]["user_id"])
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[entry["claims"]["user_id"]]
+
+    def verify(self, token: str) -> Dict:
+        """Returns the token's claims, decoding the JWT only on a cache miss. Raises JWTError."""
+        key = token_key(token)
+        with self._lock:
+            entry = self._get(key)
+            if entry:
+                return entry["claims"]
+
+        claims = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        if claims.get("sub") is None or claims.get("user_id") is None:
+            raise JWTError("Token is missing subject claims")
+
+        expires = time.time() + self.ttl
+        if claims.get("exp"):
+            expires = min(expires, float(claims["exp"]))
+        with self._lock:
+            self._entries[key] = {"expires": expires, "claims": claims, "user": None, "user_expires": 0.0}
+            self._by_user.setdefault(claims["user_id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return claims
+
+    def get_user(self, token: str) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._get(token_key(token))
+            if entry and entry["user"] is not None and entry["user_expires"] > time.time():
+                return entry["user"]
+        return None
+
+    def set_user(self, token: str, snapshot: UserSnapshot):
+        user_expires = time.time() + self.ttl
+        if snapshot.tier_expires_at:
+            # Re-resolve the tier as soon as the subscription it came from lapses
+            user_expires = min(user_expires, time.time() + (snapshot.tier_expires_at - datetime.utcnow()).total_seconds())
+        with self._lock:
+            entry = self._get(token_key(token))
+            if entry:
+                entry["user"] = snapshot
+                entry["user_expires"] = user_expires
+
+    def invalidate_user(self, user_id: int):
+        """Forgets every cached snapshot of a user (their tokens stay verified)."""
+        with self._lock:
+            for key in self._by_user.get(user_id, ()):
+                entry = self._entries.get(key)
+                if entry:
+                    entry["user"] = None
+
+
+auth_cache = AuthCache()
@@ -0,0 +1,122 @@
+"""
+Exam Blueprints
+===============
+Materialised question-id pools keyed by (subject_id, year, section_kind),
+where section_kind is "mcq" (has choices) or "theory" (no choices).
+
+Blueprints are refreshed incrementally for the (subject, year) pairs touched
+by an import or by generated content, so an ICAN full-exam paper can be
+assembled from two array samples and one bulk fetch.
+"""
+
+import random
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from agent_core.models.main_models import ExamBlueprint, Question
+from agent_core.core.question_selector import (
+    ICAN_FOUNDATION_MCQ, ICAN_FOUNDATION_THEORY, ICAN_SKILLS_TOTAL
+)
+
+MCQ = "mcq"
+THEORY = "theory"
+
+
+def _year_filter(column, years: Iterable[Optional[int]]):
+    years = set(years)
+    clauses = []
+    known = [y for y in years if y is not None]
+    if known:
+        clauses.append(column.in_(known))
+    if None in years:
+        clauses.append(column.is_(None))
+    return or_(*clauses)
+
+
+def rebuild_blueprints(db: Session, subject_id: int, years: Optional[Iterable[Optional[int]]] = None):
+    """
+    Recomputes the blueprints of one subject (optionally only for some years).
+    Flushes but does not commit, so it joins the caller's transaction.
+    """
+    query = db.query(Question.year, Question.id, Question.choices.any())\
+        .filter(Question.subject_id == subject_id)
+    if years is not None:
+        years = list(years)
+        if not years:
+            return
+        query = query.filter(_year_filter(Question.year, years))
+
+    pools: Dict[Tuple[Optional[int], str], List[int]] = {}
+    for year, q_id, is_mcq in query.order_by(Question.id).all():
+        pools.setdefault((year, MCQ if is_mcq else THEORY), []).append(q_id)
+
+    existing_query = db.query(ExamBlueprint).filter(ExamBlueprint.subject_id == subject_id)
+    if years is not None:
+        existing_query = existing_query.filter(_year_filter(ExamBlueprint.year, years))
+    existing = {(bp.year, bp.section_kind): bp for bp in existing_query.all()}
+
+    now = datetime.utcnow()
+    for key, ids in pools.items():
+        bp = existing.pop(key, None)
+        if bp is None:
+            bp = ExamBlueprint(subject_id=subject_id, year=key[0], section_kind=key[1])
+            db.add(bp)
+        bp.question_ids = ids
+        bp.updated_at = now
+
+    # Pools that no longer have any questions
+    for bp in existing.values():
+        db.delete(bp)
+    db.flush()
+
+
+def rebuild_all_blueprints(db: Session) -> int:
+    """Backfills blueprints for every subject that has questions."""
+    subject_ids = [row[0] for row in db.query(Question.subject_id).distinct().all() if row[0] is not None]
+    for subject_id in subject_ids:
+        rebuild_blueprints(db, subject_id)
+    db.commit()
+    return len(subject_ids)
+
+
+def _load_pools(db: Session, subject_ids: List[int], year: Optional[int]) -> Optional[Dict[str, List[int]]]:
+    rows = db.query(ExamBlueprint.year, ExamBlueprint.section_kind, ExamBlueprint.question_ids)\
+        .filter(ExamBlueprint.subject_id.in_(subject_ids)).all()
+    if not rows:
+        return None
+
+    # Year filter: fall back to every year if the requested one has no pool
+    if year and any(r[0] == year for r in rows):
+        rows = [r for r in rows if r[0] == year]
+
+    pools = {MCQ: [], THEORY: []}
+    for _, kind, ids in rows:
+        pools.setdefault(kind, []).extend(ids or [])
+    return pools
+
+
+def _sample(ids: List[int], k: int) -> List[int]:
+    return random.sample(ids, k=min(k, len(ids)))
+
+
+def sample_ican_full_exam_ids(db: Session, subject_ids: List[int], level: Optional[str], year: Optional[int] = None) -> Optional[List[int]]:
+    """
+    Assembles an ICAN full-exam paper from blueprints.
+    Returns None when no blueprint exists yet, so the caller can fall back to SQL selection.
+    """
+    if not subject_ids:
+        return None
+    pools = _load_pools(db, subject_ids, year)
+    if pools is None:
+        return None
+
+    if level == "Foundation":
+        return _sample(pools[MCQ], ICAN_FOUNDATION_MCQ) + _sample(pools[THEORY], ICAN_FOUNDATION_THEORY)
+
+    selected = _sample(pools[THEORY], ICAN_SKILLS_TOTAL)
+    if len(selected) < ICAN_SKILLS_TOTAL:
+        selected += _sample(pools[MCQ], ICAN_SKILLS_TOTAL - len(selected))
+    return selected
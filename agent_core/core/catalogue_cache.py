@@ -0,0 +1,118 @@
+"""
+Catalogue Response Cache
+========================
+Serialised JSON for the catalogue endpoints (/api/exams,
+/api/exams/{id}/subjects), which return the same thing to every user and
+only change when content is imported or generated. Responses that never
+change (/api/categories) are built once at import with build_response().
+
+Each response is built once per query shape (e.g. ("exams", category,
+sub_category, name)) and kept as bytes with a strong ETag (sha256 of the
+body), in an LRU of CATALOGUE_CACHE_MAX_ENTRIES shapes. Entries are tagged
+with the catalogue generation they were built under:
+  - writers call bump_generation(db) in the transaction that changes exams,
+    subjects or questions (scripts/import_data.py, generate_new_content);
+    when it commits, this process re-reads the generation on its next lookup
+  - readers compare against the catalogue_generation row, re-read at most
+    every CATALOGUE_GENERATION_CHECK_SECONDS, so every worker process picks
+    up a bump within that interval
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from agent_core.models.main_models import CatalogueGeneration
+
+CATALOGUE_CACHE_MAX_ENTRIES = int(os.getenv("CATALOGUE_CACHE_MAX_ENTRIES", "256"))
+CATALOGUE_GENERATION_CHECK_SECONDS = float(os.getenv("CATALOGUE_GENERATION_CHECK_SECONDS", "1"))
+
+CachedResponse = namedtuple("CachedResponse", ["body", "etag"])
+
+
+def read_generation(db: Session) -> int:
+    generation = db.execute(select(CatalogueGeneration.generation).where(CatalogueGeneration.id == 1)).scalar()
+    return generation or 0
+
+
+def bump_generation(db: Session):
+    """Marks the catalogue as changed; takes effect when the caller's transaction commits."""
+    updated = db.execute(
+        update(CatalogueGeneration).where(CatalogueGeneration.id == 1)
+        .values(generation=CatalogueGeneration.generation + 1, updated_at=datetime.utcnow())
+    ).rowcount
+    if not updated:
+        # Databases migrated before v0003 seeded the row
+        db.add(CatalogueGeneration(id=1, generation=1, updated_at=datetime.utcnow()))
+        db.flush()
+    # Not before the commit: a reader in between would re-cache the old generation
+    event.listen(db, "after_commit", lambda session: catalogue_cache.invalidate(), once=True)
+
+
+def serialise(payload) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_response(payload) -> CachedResponse:
+    """Serialised payload with its strong ETag (sha256 of the body)."""
+    body = serialise(payload)
+    return CachedResponse(body, f'"{hashlib.sha256(body).hexdigest()}"')
+
+
+class CatalogueCache:
+    def __init__(self, max_entries: int = CATALOGUE_CACHE_MAX_ENTRIES,
+                 check_seconds: float = CATALOGUE_GENERATION_CHECK_SECONDS):
+        self.max_entries = max_entries
+        self.check_seconds = check_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (generation, CachedResponse)
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+        self._epoch = 0  # bumped by invalidate(), so a read that started before it is not kept
+        self._lock = threading.Lock()
+
+    def generation(self, db: Session) -> int:
+        now = time.monotonic()
+        generation = self._generation
+        if generation is None or now - self._checked_at >= self.check_seconds:
+            epoch = self._epoch
+            generation = read_generation(db)
+            with self._lock:
+                if epoch == self._epoch:
+                    self._generation = generation
+                    self._checked_at = now
+        return generation
+
+    def invalidate(self):
+        """Forces the next lookup in this process to re-read the generation."""
+        with self._lock:
+            self._epoch += 1
+            self._generation = None
+
+    def get(self, db: Session, key: tuple, build: Callable[[], object]) -> CachedResponse:
+        """The cached response for `key`, built with build() (a JSON-serialisable payload) when missing or stale."""
+        generation = self.generation(db)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] == generation:
+                self._entries.move_to_end(key)
+                return item[1]
+
+        cached = build_response(build())
+        with self._lock:
+            self._entries[key] = (generation, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+
+catalogue_cache = CatalogueCache()
@@ -0,0 +1,258 @@
+"""
+Corpus Index
+============
+Persisted manifest of every file under data/ with its exam, subject, year,
+format, size, mtime and content hash.
+
+The manifest (data/.corpus_index.json) is refreshed incrementally: files are
+stat'ed and only re-hashed when their size or mtime changed. Lookups by
+subject / exam / year are dictionary reads, so callers no longer os.walk
+the whole tree and substring-match file names for every query.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DATA_ROOT = os.path.join(PROJECT_ROOT, "data")
+MANIFEST_NAME = ".corpus_index.json"
+MANIFEST_VERSION = 1
+REFRESH_INTERVAL_SECONDS = int(os.getenv("CORPUS_INDEX_REFRESH_SECONDS", "60"))
+
+CATEGORY_DIRS = {"academic", "academics", "professional", "scholarships", "scholarship", "international"}
+# Grouping folders that never name an exam or subject
+GROUPING_DIRS = {"secondary", "core"}
+# Build outputs that live under data/ but are not corpus files (see core/waec_catalogue.py)
+GENERATED_DIRS = {"waec_catalogue"}
+RAW_DIR_EXAMS = {"aloc_raw": "JAMB", "jamb_2023_raw": "JAMB"}
+NOISE_TOKENS = {"aloc", "web", "past", "questions", "may", "nov", "june", "july", "dec", "jan", "feb", "march", "april"}
+
+_YEAR_RE = re.compile(r"^(19|20)\d{2}$")
+
+
+def normalise(name: Optional[str]) -> Optional[str]:
+    if name is None:
+        return None
+    return " ".join(name.replace("_", " ").replace("-", " ").lower().split())
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe(rel_path: str) -> Dict:
+    """Derives exam, subject, year and format from a data/-relative path."""
+    parts = rel_path.replace("\\", "/").split("/")
+    dirs, filename = parts[:-1], parts[-1]
+    stem, ext = os.path.splitext(filename)
+    ext = ext.lstrip(".").lower()
+    fmt = "aloc" if stem.endswith("_aloc") and ext == "json" else ext
+
+    # Exam: first folder below the category (skipping grouping folders), or the raw-dump mapping
+    exam = None
+    folder_names = [d for d in dirs if d.lower() not in CATEGORY_DIRS and d.lower() not in GROUPING_DIRS]
+    if dirs and dirs[0] in RAW_DIR_EXAMS:
+        exam = RAW_DIR_EXAMS[dirs[0]]
+        folder_names = []
+    elif folder_names:
+        exam = folder_names[0].upper()
+
+    tokens = [t for t in stem.split("_") if t]
+    # An upper-case file prefix (WAEC_, NECO_, ICAN_) names the exam even when the file is misfiled
+    if len(tokens) > 1 and tokens[0].isalpha() and tokens[0].isupper() and len(tokens[0]) >= 3:
+        exam = tokens[0]
+    year = None
+    subject_tokens = []
+    for i, token in enumerate(tokens):
+        if _YEAR_RE.match(token):
+            year = int(token)
+        elif i == 0 and exam and token.upper() == exam:
+            continue
+        elif token.lower() in NOISE_TOKENS:
+            continue
+        else:
+            subject_tokens.append(token)
+
+    if year is None:
+        for d in reversed(dirs):
+            if _YEAR_RE.match(d):
+                year = int(d)
+                break
+
+    if subject_tokens:
+        subject = " ".join(subject_tokens)
+    elif len(folder_names) > 1:
+        subject = folder_names[-1]  # e.g. JAMB/Biology/2023.md
+    else:
+        subject = None
+    if subject and subject.islower():
+        subject = subject.title()
+
+    return {"exam": exam, "subject": subject, "year": year, "format": fmt}
+
+
+class CorpusIndex:
+    def __init__(self, data_root: str = DATA_ROOT, manifest_path: Optional[str] = None):
+        self.data_root = data_root
+        self.manifest_path = manifest_path or os.path.join(data_root, MANIFEST_NAME)
+        self.entries: Dict[str, Dict] = {}
+        self._by_subject: Dict[str, List[Dict]] = {}
+        self._by_exam: Dict[str, List[Dict]] = {}
+        self._by_exam_subject: Dict[tuple, List[Dict]] = {}
+        self._by_subject_year: Dict[tuple, List[Dict]] = {}
+        self._by_exam_subject_year: Dict[tuple, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._load()
+
+    # --- Persistence ---
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.entries = manifest.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+        self._rebuild_lookups()
+
+    def _save(self):
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            print(f"CORPUS INDEX WARNING: Could not persist manifest: {e}")
+
+    # --- Refresh ---
+
+    def refresh(self, force: bool = False) -> "CorpusIndex":
+        """Re-stats data/ and re-hashes only new or modified files."""
+        with self._lock:
+            if not force and time.time() - self._last_refresh < REFRESH_INTERVAL_SECONDS:
+                return self
+
+            seen = set()
+            changed = False
+            for root, dirs, files in os.walk(self.data_root):
+                dirs[:] = sorted(d for d in dirs if d not in GENERATED_DIRS)
+                for file in files:
+                    if file.startswith("."):
+                        continue
+                    full_path = os.path.join(root, file)
+                    rel_path = os.path.relpath(full_path, self.data_root).replace(os.sep, "/")
+                    seen.add(rel_path)
+                    try:
+                        stat = os.stat(full_path)
+                    except OSError:
+                        continue
+                    entry = self.entries.get(rel_path)
+                    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                        continue
+                    self.entries[rel_path] = {
+                        "path": rel_path,
+                        **describe(rel_path),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        "sha256": file_hash(full_path),
+                    }
+                    changed = True
+
+            for rel_path in list(self.entries):
+                if rel_path not in seen:
+                    del self.entries[rel_path]
+                    changed = True
+
+            if changed:
+                self._save()
+                self._rebuild_lookups()
+            self._last_refresh = time.time()
+        return self
+
+    def _rebuild_lookups(self):
+        by_subject, by_exam, by_exam_subject, by_subject_year, by_exam_subject_year = {}, {}, {}, {}, {}
+        for rel_path in sorted(self.entries):
+            entry = self.entries[rel_path]
+            subject = normalise(entry["subject"])
+            exam = normalise(entry["exam"])
+            year = entry["year"]
+            by_subject.setdefault(subject, []).append(entry)
+            by_exam.setdefault(exam, []).append(entry)
+            by_exam_subject.setdefault((exam, subject), []).append(entry)
+            by_subject_year.setdefault((subject, year), []).append(entry)
+            by_exam_subject_year.setdefault((exam, subject, year), []).append(entry)
+        self._by_subject = by_subject
+        self._by_exam = by_exam
+        self._by_exam_subject = by_exam_subject
+        self._by_subject_year = by_subject_year
+        self._by_exam_subject_year = by_exam_subject_year
+
+    # --- Lookups ---
+
+    def lookup(self, subject: Optional[str] = None, exam: Optional[str] = None, year: Optional[int] = None, fmt: Optional[str] = None) -> List[Dict]:
+        """Exact (normalised) lookup by any combination of subject, exam and year."""
+        subject_key, exam_key = normalise(subject), normalise(exam)
+        if subject_key and exam_key and year:
+            results = self._by_exam_subject_year.get((exam_key, subject_key, year), [])
+        elif subject_key and exam_key:
+            results = self._by_exam_subject.get((exam_key, subject_key), [])
+        elif subject_key and year:
+            results = self._by_subject_year.get((subject_key, year), [])
+        elif subject_key:
+            results = self._by_subject.get(subject_key, [])
+        elif exam_key:
+            results = [e for e in self._by_exam.get(exam_key, []) if not year or e["year"] == year]
+        else:
+            results = [e for e in self.entries.values() if not year or e["year"] == year]
+        if fmt:
+            results = [e for e in results if e["format"] == fmt]
+        return list(results)
+
+    def lookup_subject(self, subject: str, exam: Optional[str] = None, year: Optional[int] = None, fmt: Optional[str] = None) -> List[Dict]:
+        """
+        Like lookup(), but when no subject matches exactly, falls back to subjects
+        of the same exam that contain every word of the requested name (e.g.
+        "English" -> "English Language"). Without an exam there is no fallback:
+        a loose match across every exam would mix unrelated papers.
+        """
+        results = self.lookup(subject=subject, exam=exam, year=year, fmt=fmt)
+        exam_key = normalise(exam)
+        words = (normalise(subject) or "").split()
+        if results or not exam_key or not words:
+            return results
+        for entry_exam, subject_key in self._by_exam_subject:
+            if entry_exam == exam_key and subject_key and all(w in subject_key for w in words):
+                results.extend(self.lookup(subject=subject_key, exam=exam, year=year, fmt=fmt))
+        return results
+
+    def abspath(self, entry: Dict) -> str:
+        return os.path.join(self.data_root, entry["path"].replace("/", os.sep))
+
+
+_index: Optional[CorpusIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_corpus_index() -> CorpusIndex:
+    """Process-wide index, refreshed at most every CORPUS_INDEX_REFRESH_SECONDS."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CorpusIndex()
+    return _index.refresh()
+
+
+if __name__ == "__main__":
+    index = CorpusIndex().refresh(force=True)
+    print(f"[OK] Indexed {len(index.entries)} file(s) -> {index.manifest_path}")
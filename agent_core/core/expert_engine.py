@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+from agent_core.core.llm_cache import llm_cache, make_key
+
 # Configure OpenAI
 api_key = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=api_key)
@@ -15,6 +17,38 @@ MODEL_ID = "gpt-4o"
 FAST_MODEL_ID = "gpt-4o-mini"
 
 class ExpertEngine:
+    # --- Cached JSON completions (see llm_cache.py) ---
+
+    @staticmethod
+    def _cached_json_completion_sync(method: str, model: str, prompt: str) -> Dict:
+        key = make_key(method, model, prompt)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(response.choices[0].message.content)
+        llm_cache.set(key, method, model, result)
+        return result
+
+    @staticmethod
+    async def _cached_json_completion(method: str, model: str, prompt: str) -> Dict:
+        key = make_key(method, model, prompt)
+        cached = await llm_cache.aget(key)
+        if cached is not None:
+            return cached
+        response = await async_client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(response.choices[0].message.content)
+        await llm_cache.aset(key, method, model, result)
+        return result
+
     @staticmethod
     def grade_essay_or_sop_sync(content: str, criteria: str) -> Dict:
         """Sync version of grading."""
@@ -26,12 +60,7 @@ class ExpertEngine:
 
         prompt = f"Act as an expert examiner for {criteria}. {rubric_instructions}\nSubmission:\n{content}"
         
-        response = client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return ExpertEngine._cached_json_completion_sync("grade_essay_or_sop_sync", MODEL_ID, prompt)
 
     @staticmethod
     async def grade_essay_or_sop(content: str, criteria: str) -> Dict:
@@ -74,12 +103,7 @@ class ExpertEngine:
         Return ONLY valid JSON.
         """
         
-        response = await async_client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return await ExpertEngine._cached_json_completion("grade_essay_or_sop", MODEL_ID, prompt)
 
     @staticmethod
     def generate_questions_sync(exam_type: str, topic: str, difficulty: str, count: int = 5) -> List[Dict]:
@@ -151,12 +175,7 @@ class ExpertEngine:
     def simulate_interview_sync(question: str, user_answer: str) -> Dict:
         """Sync version of interview evaluation."""
         prompt = f"Act as an interviewer. Question: {question}\nAnswer: {user_answer}\nEvaluate and return ONLY JSON."
-        response = client.chat.completions.create(
-            model=FAST_MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return ExpertEngine._cached_json_completion_sync("simulate_interview_sync", FAST_MODEL_ID, prompt)
 
     @staticmethod
     async def simulate_interview(question: str, user_answer: str) -> Dict:
@@ -185,12 +204,7 @@ class ExpertEngine:
         Return ONLY valid JSON.
         """
         
-        response = await async_client.chat.completions.create(
-            model=FAST_MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return await ExpertEngine._cached_json_completion("simulate_interview", FAST_MODEL_ID, prompt)
     @staticmethod
     async def grade_theory_response(question_text: str, reference_solution: str, user_answer: str) -> Dict:
         """
@@ -219,12 +233,7 @@ class ExpertEngine:
         Return ONLY valid JSON.
         """
         
-        response = await async_client.chat.completions.create(
-            model=FAST_MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return await ExpertEngine._cached_json_completion("grade_theory_response", FAST_MODEL_ID, prompt)
 
     @staticmethod
     async def analyze_syllabus(subject_name: str, questions: List[Dict], extra_content: str = "") -> Dict:
@@ -255,12 +264,7 @@ class ExpertEngine:
         Return ONLY valid JSON.
         """
         
-        response = await async_client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return await ExpertEngine._cached_json_completion("analyze_syllabus", MODEL_ID, prompt)
 
     @staticmethod
     def analyze_syllabus_sync(subject_name: str, questions: List[Dict], extra_content: str = "") -> Dict:
@@ -282,12 +286,7 @@ class ExpertEngine:
         
         Return ONLY valid JSON.
         """
-        response = client.chat.completions.create(
-            model=MODEL_ID,
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return ExpertEngine._cached_json_completion_sync("analyze_syllabus_sync", MODEL_ID, prompt)
 
     @staticmethod
     async def analyze_exam_result(results: Dict) -> Dict:
@@ -318,9 +317,4 @@ class ExpertEngine:
         Return ONLY valid JSON.
         """
         
-        response = await async_client.chat.completions.create(
-            model=MODEL_ID, # Use GPT-4o for complex grading
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        return json.loads(response.choices[0].message.content)
+        return await ExpertEngine._cached_json_completion("analyze_exam_result", MODEL_ID, prompt)
@@ -0,0 +1,219 @@
+"""
+Simulation Grading
+==================
+Scores a simulation submission.
+
+All answered questions (and their choices) are loaded in one query, MCQs are
+marked locally, and every theory answer is sent to the expert grader at once,
+bounded by a semaphore and a per-call timeout. A grading that fails or times
+out scores 0 and is reported under "ungraded" instead of failing the whole
+submission, so submit latency is roughly that of the slowest single grading.
+The database phases (loading the questions, recording progress) run in a
+worker thread, so a submission never blocks the event loop on the database.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from agent_core.core import question_loader, topic_stats
+from agent_core.core.expert_engine import ExpertEngine
+from agent_core.models.main_models import DifficultyLevel, ExamSession, UserProgress
+
+GRADING_CONCURRENCY = int(os.getenv("GRADING_CONCURRENCY", "6"))
+GRADING_TIMEOUT_SECONDS = float(os.getenv("GRADING_TIMEOUT_SECONDS", "45"))
+PASS_THRESHOLD = 50
+
+TheoryGrader = Callable[[str, str, str], Awaitable[Dict]]
+
+
+async def grade_theory_batch(
+    items: List[Dict],
+    grader: TheoryGrader = ExpertEngine.grade_theory_response,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Dict[int, Dict]:
+    """
+    Grades theory answers concurrently.
+    items: [{"question_id", "question_text", "reference", "answer"}]
+    Returns {question_id: grading}, where grading["graded"] is False on timeout/error.
+    """
+    semaphore = asyncio.Semaphore(concurrency or GRADING_CONCURRENCY)
+    timeout = timeout or GRADING_TIMEOUT_SECONDS
+
+    async def _grade_one(item: Dict) -> Dict:
+        async with semaphore:
+            try:
+                grading = await asyncio.wait_for(
+                    grader(item["question_text"], item["reference"], item["answer"]),
+                    timeout=timeout
+                )
+                return {**grading, "graded": True}
+            except asyncio.TimeoutError:
+                print(f"GRADING WARNING: Question {item['question_id']} timed out after {timeout}s")
+                return {"score": 0, "feedback": "Grading timed out. Request a detailed analysis to review this answer.", "graded": False}
+            except Exception as e:
+                print(f"GRADING WARNING: Question {item['question_id']} failed: {e}")
+                return {"score": 0, "feedback": "Grading is temporarily unavailable for this answer.", "graded": False}
+
+    results = await asyncio.gather(*[_grade_one(item) for item in items])
+    return {item["question_id"]: result for item, result in zip(items, results)}
+
+
+async def grade_submission(
+    db: Session,
+    session: ExamSession,
+    answers: Dict,
+    grader: TheoryGrader = ExpertEngine.grade_theory_response,
+) -> Dict:
+    """
+    Grades a simulation, logs UserProgress rows (and their topic_stats rollup) and fills session.score/results_json.
+    The caller commits.
+    """
+    parsed_answers = {}
+    for q_id, response in answers.items():
+        try:
+            parsed_answers[int(q_id)] = response
+        except (TypeError, ValueError):
+            continue
+
+    questions = await asyncio.to_thread(question_loader.load_questions, db, question_ids=list(parsed_answers.keys()))
+
+    theory_items = [
+        {
+            "question_id": q["id"],
+            "question_text": q["text"],
+            "reference": q["explanation"] or "",
+            "answer": parsed_answers[q["id"]],
+        }
+        for q in questions if not q["choices"]
+    ]
+    gradings = await grade_theory_batch(theory_items, grader=grader) if theory_items else {}
+
+    return await asyncio.to_thread(record_submission, db, session, len(answers), parsed_answers, questions, gradings)
+
+
+def record_submission(
+    db: Session,
+    session: ExamSession,
+    total_count: int,
+    parsed_answers: Dict[int, object],
+    questions: List[Dict],
+    gradings: Dict[int, Dict],
+) -> Dict:
+    """Marks the answers, adds the progress rows and fills the session's score (blocking; see grade_submission)."""
+    correct_count = 0
+    topics_stats = {}  # {topic: {correct, total}}
+    ungraded = []
+    attempts = []  # rollup deltas for topic_stats
+
+    for q in questions:
+        response = parsed_answers[q["id"]]
+        if not q["choices"]:
+            # EXPERT GRADING FOR THEORY
+            grading = gradings[q["id"]]
+            if not grading["graded"]:
+                ungraded.append(q["id"])
+            is_correct = grading.get("score", 0) >= PASS_THRESHOLD
+            score_contribution = grading.get("score", 0) / 100.0
+        else:
+            # MCQ GRADING
+            correct_choice = next((c for c in q["choices"] if c["is_correct"]), None)
+            is_correct = bool(correct_choice and correct_choice["label"] == response)
+            score_contribution = 1.0 if is_correct else 0.0
+
+        if is_correct:
+            correct_count += score_contribution
+
+        # Topic tracking
+        topic = q["topic"] or "General"
+        if topic not in topics_stats:
+            topics_stats[topic] = {"correct": 0, "total": 0}
+        topics_stats[topic]["total"] += 1
+        topics_stats[topic]["correct"] += score_contribution
+
+        # Log to user progress
+        difficulty = DifficultyLevel(q["difficulty"]) if q["difficulty"] else None
+        db.add(UserProgress(
+            user_id=session.user_id,
+            question_id=q["id"],
+            topic=topic,
+            difficulty=difficulty,
+            is_correct=is_correct
+        ))
+        attempts.append({
+            "user_id": session.user_id,
+            "subject_id": q["subject_id"],
+            "topic": topic,
+            "difficulty": difficulty,
+            "is_correct": is_correct,
+        })
+
+    topic_stats.record_attempts(db, attempts)
+
+    session.end_time = session.end_time or datetime.utcnow()
+    session.score = (correct_count / total_count * 100) if total_count > 0 else 0
+    session.results_json = {
+        "correct": correct_count,
+        "total": total_count,
+        "topics": topics_stats,
+        "duration_seconds": (session.end_time - session.start_time).total_seconds()
+    }
+    if ungraded:
+        session.results_json["ungraded"] = ungraded
+    return session.results_json
+
+
+def build_analysis_input(db: Session, session: ExamSession) -> Dict:
+    """Enriches stored results with question text and correct answers for expert evaluation context."""
+    full_results = session.results_json.copy()
+    answers = full_results.get("answers", {})
+    questions = question_loader.load_questions(db, question_ids=[int(q_id) for q_id in answers.keys()])
+
+    enriched_answers = []
+    for q in questions:
+        correct_choice = next((c for c in q["choices"] if c["is_correct"]), None)
+        enriched_answers.append({
+            "question_id": q["id"],
+            "text": q["text"],
+            "topic": q["topic"],
+            "user_answer": answers.get(str(q["id"]), answers.get(q["id"])),
+            "correct_answer": correct_choice["text"] if correct_choice else q["explanation"], # Use explanation for theory
+            "type": "MCQ" if correct_choice else "Theory"
+        })
+
+    full_results["detailed_breakdown"] = enriched_answers
+    return full_results
+
+
+# --- Local stubs (GRADER_BACKEND=stub) for tests and offline development ---
+
+async def stub_theory_grader(question_text: str, reference_solution: str, user_answer: str) -> Dict:
+    """Scores a theory answer by word overlap with the reference solution. No network access."""
+    reference_words = {w for w in reference_solution.lower().split() if len(w) > 3}
+    answer_words = {w for w in str(user_answer).lower().split() if len(w) > 3}
+    score = round(100 * len(reference_words & answer_words) / len(reference_words)) if reference_words else 0
+    return {
+        "score": score,
+        "key_points_matched": sorted(reference_words & answer_words),
+        "missing_points": sorted(reference_words - answer_words),
+        "feedback": "Graded locally by keyword overlap.",
+        "grade": "Pass" if score >= PASS_THRESHOLD else "Fail"
+    }
+
+
+async def stub_exam_analyzer(results: Dict) -> Dict:
+    """Summarises topic accuracy without calling the expert engine."""
+    topics = results.get("topics", {})
+    accuracy = {t: (v["correct"] / v["total"] if v["total"] else 0) for t, v in topics.items()}
+    return {
+        "overall_assessment": f"Scored {results.get('correct', 0)} of {results.get('total', 0)}.",
+        "strong_topics": [t for t, a in accuracy.items() if a >= 0.5],
+        "critical_gaps": [t for t, a in accuracy.items() if a < 0.5],
+        "theory_grading": [],
+        "action_plan": [f"Revise {t}" for t, a in accuracy.items() if a < 0.5],
+        "encouragement": "Keep practicing!"
+    }
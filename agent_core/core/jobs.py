@@ -0,0 +1,218 @@
+"""
+Grading Job Queue
+=================
+Runs long simulation gradings outside the request.
+
+Routes persist a GradingJob row and return 202 with its id. A pool of
+asyncio worker tasks (started with the app) claims and processes the jobs;
+clients poll /api/jobs/{id} or subscribe on /ws/jobs/{id} for pushes.
+
+Workers only await the grader/analyzer on the event loop: every database
+phase (claim, loading the session and questions, the final commit) runs in
+a worker thread, so a job waiting on a locked database never stalls the
+requests served by the same process.
+
+On start, jobs left "queued" by a previous process are re-enqueued, and
+jobs left "running" for longer than JOB_STALE_SECONDS (their process died
+mid-job) are reset to "queued" first.
+
+Set GRADER_BACKEND=stub to grade with the local stubs in grading.py
+instead of OpenAI.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from agent_core.database import SessionLocal
+from agent_core.core import grading
+from agent_core.core.expert_engine import ExpertEngine
+from agent_core.models.main_models import ExamSession, GradingJob
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "900"))
+GRADER_BACKEND = os.getenv("GRADER_BACKEND", "openai")
+
+SIMULATION_SUBMIT = "simulation_submit"
+SIMULATION_ANALYZE = "simulation_analyze"
+
+TERMINAL_STATUSES = ("done", "failed")
+REUSABLE_STATUSES = ("queued", "running", "done")
+
+
+def serialize_job(job: GradingJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.strftime("%Y-%m-%d %H:%M:%S") if job.created_at else None,
+        "finished_at": job.finished_at.strftime("%Y-%m-%d %H:%M:%S") if job.finished_at else None,
+    }
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        theory_grader: Optional[grading.TheoryGrader] = None,
+        exam_analyzer: Optional[Callable[[Dict], Awaitable[Dict]]] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        stub = GRADER_BACKEND == "stub"
+        self.workers = workers
+        self.theory_grader = theory_grader or (grading.stub_theory_grader if stub else ExpertEngine.grade_theory_response)
+        self.exam_analyzer = exam_analyzer or (grading.stub_exam_analyzer if stub else ExpertEngine.analyze_exam_result)
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._listeners: Dict[int, Set[asyncio.Queue]] = {}
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        for job_id in await asyncio.to_thread(self._recover):
+            self._queue.put_nowait(job_id)
+
+    def _recover(self) -> list:
+        """Requeues jobs whose process died while running them; returns every queued job id."""
+        db = self.session_factory()
+        try:
+            stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+            requeued = db.query(GradingJob).filter(
+                GradingJob.status == "running",
+                GradingJob.started_at.is_(None) | (GradingJob.started_at < stale_before),
+            ).update({"status": "queued", "started_at": None}, synchronize_session=False)
+            db.commit()
+            if requeued:
+                print(f"JOB WARNING: Requeued {requeued} job(s) left running by a previous process")
+            return [job_id for (job_id,) in
+                    db.query(GradingJob.id).filter(GradingJob.status == "queued").order_by(GradingJob.id)]
+        finally:
+            db.close()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        """Waits until every enqueued job has been processed (used by tests/scripts)."""
+        await self._queue.join()
+
+    # --- Producer side ---
+
+    def submit(self, db: Session, user_id: int, session_id: int, kind: str, payload: Optional[Dict] = None) -> GradingJob:
+        """Persists a job row and schedules it. The job is committed before it is enqueued."""
+        job = GradingJob(user_id=user_id, session_id=session_id, kind=kind, status="queued", payload=payload or {})
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if self._queue is not None:
+            self._queue.put_nowait(job.id)
+        return job
+
+    def submit_once(self, db: Session, user_id: int, session_id: int, kind: str) -> GradingJob:
+        """Like submit(), but returns the session's latest queued, running or done job of this kind if there is one."""
+        existing = db.query(GradingJob).filter(
+            GradingJob.session_id == session_id, GradingJob.kind == kind, GradingJob.status.in_(REUSABLE_STATUSES)
+        ).order_by(GradingJob.id.desc()).first()
+        if existing is not None:
+            return existing
+        return self.submit(db, user_id, session_id, kind)
+
+    # --- Push channel ---
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        listener = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(listener)
+        return listener
+
+    def unsubscribe(self, job_id: int, listener: asyncio.Queue):
+        listeners = self._listeners.get(job_id)
+        if listeners:
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[job_id]
+
+    def _publish(self, event: Dict):
+        for listener in self._listeners.get(event["job_id"], ()):
+            listener.put_nowait(event)
+
+    # --- Consumer side ---
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"JOB ERROR: Job {job_id} crashed the worker loop: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _claim(self, db: Session, job_id: int) -> Optional[GradingJob]:
+        # Atomic claim so several app workers recovering the same backlog never double-process
+        claimed = db.query(GradingJob).filter(
+            GradingJob.id == job_id, GradingJob.status == "queued"
+        ).update({"status": "running", "started_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        if not claimed:
+            return None
+        return db.query(GradingJob).get(job_id)
+
+    def _load_session(self, db: Session, job: GradingJob) -> ExamSession:
+        session = db.query(ExamSession).get(job.session_id)
+        if session is None:
+            raise ValueError("Session not found")
+        return session
+
+    def _finish(self, db: Session, job_id: int, result: Optional[Dict], error: Optional[Exception]) -> Dict:
+        """Stores the outcome and commits; returns the job's final event."""
+        if error is not None:
+            db.rollback()
+        job = db.query(GradingJob).get(job_id)
+        if error is None:
+            job.result = result
+            job.status = "done"
+        else:
+            job.status = "failed"
+            job.error = str(error)
+            print(f"JOB ERROR: Job {job_id} ({job.kind}) failed: {error}")
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        return serialize_job(job)
+
+    async def _run(self, job_id: int):
+        db = self.session_factory()
+        try:
+            job = await asyncio.to_thread(self._claim, db, job_id)
+            if job is None:
+                return
+            self._publish(serialize_job(job))
+
+            result, error = None, None
+            try:
+                session = await asyncio.to_thread(self._load_session, db, job)
+                if job.kind == SIMULATION_SUBMIT:
+                    result = await grading.grade_submission(db, session, job.payload.get("answers", {}), grader=self.theory_grader)
+                elif job.kind == SIMULATION_ANALYZE:
+                    result = await self.exam_analyzer(await asyncio.to_thread(grading.build_analysis_input, db, session))
+                else:
+                    raise ValueError(f"Unknown job kind '{job.kind}'")
+            except Exception as e:
+                error = e
+
+            self._publish(await asyncio.to_thread(self._finish, db, job_id, result, error))
+        finally:
+            await asyncio.to_thread(db.close)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,213 @@
+"""
+LLM Response Cache
+==================
+Content-addressed cache for ExpertEngine completions.
+
+Keys are a SHA-256 of (method, model, whitespace-normalised prompt), so the
+same ICAN answer graded against the same marking guide is only sent to
+OpenAI once. Two tiers:
+  - an in-process LRU (LLM_CACHE_MEMORY_ITEMS entries)
+  - a persistent table (llm_cache) with a TTL and a total-size cap, evicted
+    least-recently-used first
+Counters are exposed through stats() for the admin API.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from agent_core.database import SessionLocal
+from agent_core.models.main_models import LLMCacheEntry
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+EVICTION_INTERVAL_WRITES = 100
+
+
+def normalise_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def make_key(method: str, model: str, prompt: str) -> str:
+    raw = json.dumps([method, model, normalise_prompt(prompt)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        memory_items: int = LLM_CACHE_MEMORY_ITEMS,
+        ttl_seconds: int = LLM_CACHE_TTL_SECONDS,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.session_factory = session_factory
+        self.memory_items = memory_items
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, response)
+        self._lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    # --- Memory tier ---
+
+    def _memory_get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            expires_at, response = item
+            if expires_at < datetime.utcnow():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return response
+
+    def _memory_set(self, key: str, response: Dict, expires_at: datetime):
+        with self._lock:
+            self._memory[key] = (expires_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    # --- Persistent tier ---
+
+    def _persistent_get(self, key: str) -> Optional[Dict]:
+        db = self.session_factory()
+        try:
+            entry = db.query(LLMCacheEntry).get(key)
+            if entry is None:
+                return None
+            now = datetime.utcnow()
+            if entry.created_at + self.ttl < now:
+                db.delete(entry)
+                db.commit()
+                return None
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_accessed_at = now
+            db.commit()
+            self._memory_set(key, entry.response, entry.created_at + self.ttl)
+            self._count("persistent_hits")
+            return entry.response
+        finally:
+            db.close()
+
+    def _persistent_set(self, key: str, method: str, model: str, response: Dict):
+        db = self.session_factory()
+        try:
+            size = len(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+            now = datetime.utcnow()
+            entry = db.query(LLMCacheEntry).get(key)
+            if entry is None:
+                entry = LLMCacheEntry(key=key, method=method, model=model)
+                db.add(entry)
+            entry.response = response
+            entry.size_bytes = size
+            entry.created_at = now
+            entry.last_accessed_at = now
+            db.commit()
+
+            with self._lock:
+                self._writes_since_eviction += 1
+                due = self._writes_since_eviction >= EVICTION_INTERVAL_WRITES
+                if due:
+                    self._writes_since_eviction = 0
+            if due:
+                self._evict(db)
+        finally:
+            db.close()
+
+    def _evict(self, db: Session):
+        """Drops expired entries, then least-recently-used ones until under the size cap."""
+        removed = db.query(LLMCacheEntry).filter(
+            LLMCacheEntry.created_at < datetime.utcnow() - self.ttl
+        ).delete(synchronize_session=False)
+
+        total = db.query(func.coalesce(func.sum(LLMCacheEntry.size_bytes), 0)).scalar()
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            victims = []
+            for key, size in db.query(LLMCacheEntry.key, LLMCacheEntry.size_bytes)\
+                    .order_by(LLMCacheEntry.last_accessed_at).all():
+                victims.append(key)
+                excess -= size or 0
+                if excess <= 0:
+                    break
+            for i in range(0, len(victims), 500):
+                removed += db.query(LLMCacheEntry).filter(
+                    LLMCacheEntry.key.in_(victims[i:i + 500])
+                ).delete(synchronize_session=False)
+        db.commit()
+        self._count("evictions", removed)
+
+    # --- Public API ---
+
+    def get(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        response = self._memory_get(key)
+        if response is not None:
+            return response
+        try:
+            response = self._persistent_get(key)
+        except Exception as e:
+            self._count("errors")
+            print(f"LLM CACHE WARNING: Read failed: {e}")
+            response = None
+        if response is None:
+            self._count("misses")
+        return response
+
+    def set(self, key: str, method: str, model: str, response: Dict):
+        if not self.enabled:
+            return
+        self._memory_set(key, response, datetime.utcnow() + self.ttl)
+        self._count("writes")
+        try:
+            self._persistent_set(key, method, model, response)
+        except Exception as e:
+            self._count("errors")
+            print(f"LLM CACHE WARNING: Write failed: {e}")
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        """Async variant: the memory tier is checked inline, the database tier in a thread."""
+        if not self.enabled:
+            return None
+        response = self._memory_get(key)
+        if response is not None:
+            return response
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, method: str, model: str, response: Dict):
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self.set, key, method, model, response)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_items"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["persistent_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+llm_cache = LLMResponseCache()
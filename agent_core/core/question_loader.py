@@ -0,0 +1,93 @@
+"""
+Batched Question Loader
+=======================
+Fetches questions together with their choices in a single round trip.
+
+Questions and choices are selected as plain column tuples through one
+LEFT OUTER JOIN (no hydrated ORM objects, no per-question Choice query),
+and the JSON-ready payloads are built directly from those rows.
+"""
+
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from agent_core.models.main_models import Question, Choice
+
+# Column order matters: rows are unpacked positionally in _build_payloads
+_QUESTION_COLUMNS = (
+    Question.id, Question.text, Question.topic, Question.year,
+    Question.explanation, Question.subject_id, Question.section, Question.difficulty,
+)
+_CHOICE_COLUMNS = (Choice.id, Choice.label, Choice.text, Choice.is_correct)
+
+
+def _build_payloads(rows, include_answers: bool) -> List[Dict]:
+    payloads = []
+    for _, group in groupby(rows, key=lambda r: r[0]):
+        choices = []
+        for row in group:
+            q_id, text, topic, year, explanation, subject_id, section, difficulty, c_id, label, c_text, is_correct = row
+            if c_id is None:
+                continue
+            choice = {"id": c_id, "label": label, "text": c_text}
+            if include_answers:
+                choice["is_correct"] = is_correct
+            choices.append(choice)
+        payloads.append({
+            "id": q_id,
+            "text": text,
+            "topic": topic,
+            "year": year,
+            "explanation": explanation,
+            "subject_id": subject_id,
+            "section": section,
+            "difficulty": difficulty.value if hasattr(difficulty, "value") else difficulty,
+            "choices": choices,
+        })
+    return payloads
+
+
+def load_questions(
+    db: Session,
+    subject_id: Optional[int] = None,
+    question_ids: Optional[Iterable[int]] = None,
+    limit: Optional[int] = None,
+    include_answers: bool = True,
+) -> List[Dict]:
+    """
+    Loads questions (by subject and/or explicit ids) with their choices in one query.
+    When question_ids is given, results follow the order of question_ids.
+    """
+    id_query = db.query(Question.id)
+    if subject_id is not None:
+        id_query = id_query.filter(Question.subject_id == subject_id)
+    if question_ids is not None:
+        question_ids = list(question_ids)
+        if not question_ids:
+            return []
+        id_query = id_query.filter(Question.id.in_(question_ids))
+    id_query = id_query.order_by(Question.id)
+    if limit is not None:
+        id_query = id_query.limit(limit)
+    selected = id_query.subquery()
+
+    rows = db.query(*_QUESTION_COLUMNS, *_CHOICE_COLUMNS)\
+        .select_from(Question)\
+        .join(selected, selected.c.id == Question.id)\
+        .outerjoin(Choice, Choice.question_id == Question.id)\
+        .order_by(Question.id, Choice.id)\
+        .all()
+
+    payloads = _build_payloads(rows, include_answers)
+    if question_ids is not None:
+        position = {q_id: i for i, q_id in enumerate(question_ids)}
+        payloads.sort(key=lambda p: position[p["id"]])
+    return payloads
+
+
+def load_question(db: Session, question_id: int, include_answers: bool = True) -> Optional[Dict]:
+    """Loads a single question with its choices (one query)."""
+    payloads = load_questions(db, question_ids=[question_id], include_answers=include_answers)
+    return payloads[0] if payloads else None
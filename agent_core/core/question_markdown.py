@@ -0,0 +1,214 @@
+"""
+Markdown Question Tokenizer
+===========================
+One streaming parser for the question format used across data/:
+
+    # Exam Subject (Year)
+    **1.** Question text
+       A) Choice A
+       B) Choice B
+       **Answer: A**
+       *Explanation: ...*
+
+It reads a file in line-aligned chunks and yields each question as soon as
+the next one starts, so memory is bounded by the chunk size plus the largest
+question rather than the file. One precompiled, line-anchored pattern finds
+the structural lines; everything between them is continuation text, sliced
+out of the chunk without a Python-level pass over each line:
+
+  - question start  `**N.** text` or `N. text` at column 0
+  - choice          `A) text` / `A. text` (A-E), continuation lines append
+  - answer          `**Answer: X**` / `Answer: X` (the first one counts)
+  - explanation     `*Explanation: ...`, runs until the next question
+
+A small state machine decides what each structural line means where it
+appears: a choice-looking line after the answer, for instance, is just text.
+Choices, answers and explanations are only recognised at the start of a
+line, so letters followed by ")" or "." inside question or explanation
+text (e.g. "(OPEC) is", "option C. Electrons") are never taken as choices.
+
+Used by scripts/import_data.py and scripts/build_waec_catalogue.py.
+"""
+
+import os
+import re
+from typing import Iterator, List, Optional, TextIO
+
+CHUNK_SIZE = int(os.getenv("QUESTION_MARKDOWN_CHUNK_SIZE", str(64 * 1024)))
+
+# Whitespace that does not end the line
+_WS = r"[^\S\n]"
+
+# Every alternative starts right after a newline: the literal "\n" prefix lets the regex
+# engine skip from line to line instead of attempting a match at every character.
+# The alternatives are mutually exclusive, so their order does not matter.
+LINE_RE = re.compile(
+    r"\n(?:"
+    rf"(?:\*\*)?(?P<number>\d+)\.(?:\*\*)?(?:{_WS}+(?P<text>.*))?$"
+    rf"|{_WS}*(?P<label>[A-E])[).]{_WS}+(?P<choice>.*)$"
+    rf"|(?:{_WS}|\*)*Answer:{_WS}*(?P<answer>[A-E]).*$"
+    rf"|{_WS}*\*?Explanation:{_WS}*(?P<explanation>.*)$"
+    rf"|#{_WS}+(?P<title>.+)$"
+    rf"|(?P<theory>(?i:## Theory .*Section)){_WS}*$"
+    r")",
+    re.MULTILINE,
+)
+
+# LINE_RE alternatives, by the name of their last capturing group (Match.lastgroup)
+_QUESTION, _CHOICE, _ANSWER, _EXPLANATION_START, _TITLE, _THEORY = range(6)
+_LINE_KINDS = {
+    "number": _QUESTION, "text": _QUESTION, "choice": _CHOICE, "answer": _ANSWER,
+    "explanation": _EXPLANATION_START, "title": _TITLE, "theory": _THEORY,
+}
+
+# Tokenizer states
+_PREAMBLE, _TEXT, _CHOICES, _ANSWERED, _EXPLANATION = range(5)
+
+
+def join_lines(lines: List[str]) -> str:
+    """A multi-line field as one line (inner indentation is kept, as the importer always has)."""
+    if len(lines) == 1 and "\n" not in lines[0]:
+        return lines[0].strip()
+    return "\n".join(lines).strip().replace("\n", " ")
+
+
+class MarkdownQuestion:
+    """One tokenized question; fields hold the raw source lines."""
+    __slots__ = ("number", "text_lines", "choices", "answer", "explanation_lines")
+
+    def __init__(self, number: int, first_line: Optional[str]):
+        self.number = number
+        self.text_lines = [first_line] if first_line else []
+        self.choices: List[list] = []  # [label, lines]
+        self.answer: Optional[str] = None
+        self.explanation_lines: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return join_lines(self.text_lines)
+
+    @property
+    def problem(self) -> Optional[str]:
+        """Why the question cannot be asked as an MCQ, or None if it can."""
+        if not self.text:
+            return "no question text"
+        if not self.choices:
+            return "no choices"
+        if not self.answer:
+            return "no answer"
+        labels = [label for label, _ in self.choices]
+        if self.answer not in labels:
+            return f"answer {self.answer} is not one of the choices ({', '.join(labels)})"
+        return None
+
+    @property
+    def answerable(self) -> bool:
+        """Has a stem, choices, and an answer that names one of them."""
+        return self.problem is None
+
+    def choice_items(self) -> List[tuple]:
+        """(label, text) pairs in source order."""
+        return [(label, join_lines(lines)) for label, lines in self.choices]
+
+    @property
+    def explanation(self) -> Optional[str]:
+        explanation = join_lines(self.explanation_lines).rstrip("*").strip()
+        return explanation or None
+
+
+class QuestionTokenizer:
+    """
+    Iterating yields MarkdownQuestion records in file order. The document
+    title (first `# ` heading) and the text under a `## Theory ... Section`
+    heading are collected on the way and complete once iteration ends.
+    """
+
+    def __init__(self, source: TextIO, chunk_size: int = CHUNK_SIZE):
+        self._source = source
+        self._chunk_size = chunk_size
+        self.title: Optional[str] = None
+        self._theory_parts: Optional[List[str]] = None
+
+    @property
+    def theory_text(self) -> Optional[str]:
+        if self._theory_parts is None:
+            return None
+        return "".join(self._theory_parts).strip() or None
+
+    def _chunks(self) -> Iterator[str]:
+        """Whole lines, each chunk as "\n" + its lines joined by "\n" (so every line follows a newline)."""
+        read, readline = self._source.read, self._source.readline
+        while True:
+            chunk = read(self._chunk_size)
+            if not chunk:
+                return
+            if not chunk.endswith("\n"):
+                chunk += readline()
+            yield "\n" + (chunk[:-1] if chunk.endswith("\n") else chunk)
+
+    def __iter__(self) -> Iterator[MarkdownQuestion]:
+        state = _PREAMBLE
+        current: Optional[MarkdownQuestion] = None
+        carry = ""  # unconsumed text of earlier chunks
+
+        def attach(gap: str):
+            # gap is "\nline\nline..." (the lines between two consumed structural lines) or ""
+            if not gap:
+                return
+            if state == _TEXT:
+                current.text_lines.append(gap[1:])
+            elif state == _CHOICES:
+                current.choices[-1][1].append(gap[1:])
+            elif state == _EXPLANATION:
+                current.explanation_lines.append(gap[1:])
+
+        for chunk in self._chunks():
+            theory = self._theory_parts
+            if theory is not None:
+                theory.append(chunk)
+            consumed = 0
+
+            for match in LINE_RE.finditer(chunk):
+                # Structural lines that mean nothing in the current state stay in the text
+                kind = _LINE_KINDS[match.lastgroup]
+                if kind == _CHOICE:
+                    if state != _TEXT and state != _CHOICES:
+                        continue
+                elif kind == _ANSWER:
+                    if current is None or current.answer is not None:
+                        continue
+                elif kind == _EXPLANATION_START:
+                    if state == _PREAMBLE or state == _EXPLANATION:
+                        continue
+                elif kind == _TITLE:
+                    if self.title is None:
+                        self.title = match.group("title").strip()
+                    continue
+                elif kind == _THEORY and theory is not None:
+                    continue
+
+                attach(carry + chunk[consumed:match.start()])
+                carry, consumed = "", match.end()
+
+                if kind == _QUESTION:
+                    if current is not None:
+                        yield current
+                    current = MarkdownQuestion(int(match.group("number")), match.group("text"))
+                    state = _TEXT
+                elif kind == _CHOICE:
+                    current.choices.append([match.group("label"), [match.group("choice")]])
+                    state = _CHOICES
+                elif kind == _ANSWER:
+                    current.answer = match.group("answer")
+                    state = _ANSWERED
+                elif kind == _EXPLANATION_START:
+                    current.explanation_lines.append(match.group("explanation"))
+                    state = _EXPLANATION
+                else:
+                    theory = self._theory_parts = [chunk[match.end():]]
+
+            carry += chunk[consumed:]
+
+        attach(carry)
+        if current is not None:
+            yield current
@@ -0,0 +1,151 @@
+"""
+Question Selection Engine
+=========================
+Picks simulation questions without pulling the candidate pool into Python.
+
+Every filter (subject scope, topic, year, section, MCQ/theory split) is
+expressed as SQL criteria. Sampling counts the filtered pool and then draws
+k random row offsets, resolved in one query through ROW_NUMBER() over the
+primary key. Only the sampled ids ever leave the database, so memory and
+latency scale with the requested question count rather than the pool size.
+"""
+
+import random
+from typing import List, Optional
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from agent_core.models.main_models import Question, Subject
+
+# Official ICAN "full exam" layouts
+ICAN_FOUNDATION_MCQ = 20
+ICAN_FOUNDATION_THEORY = 5
+ICAN_SKILLS_TOTAL = 6
+
+
+def scope_criteria(exam_id: int, subject_id: Optional[int] = None) -> list:
+    """Restricts questions to one subject, or to every subject of the exam."""
+    if subject_id:
+        return [Question.subject_id == subject_id]
+    exam_subjects = select(Subject.id).where(Subject.exam_id == exam_id)
+    return [Question.subject_id.in_(exam_subjects)]
+
+
+def topic_criteria(topics: Optional[List[str]]) -> list:
+    if not topics:
+        return []
+    return [or_(*[Question.topic.ilike(f"%{t}%") for t in topics])]
+
+
+def section_criteria(section: str) -> list:
+    return [func.lower(Question.section).contains(section.lower(), autoescape=True)]
+
+
+def mcq_criteria() -> list:
+    """MCQs are questions with at least one choice (most reliable for mixed imports)."""
+    return [Question.choices.any()]
+
+
+def theory_criteria() -> list:
+    return [~Question.choices.any()]
+
+
+def count_pool(db: Session, criteria: list) -> int:
+    return db.query(func.count(Question.id)).filter(*criteria).scalar() or 0
+
+
+def sample_ids(db: Session, criteria: list, k: int, pool_size: Optional[int] = None) -> List[int]:
+    """
+    Draws up to k random question ids matching criteria.
+    Uses random row offsets over the id index instead of ORDER BY random().
+    """
+    if k <= 0:
+        return []
+    if pool_size is None:
+        pool_size = count_pool(db, criteria)
+    if pool_size == 0:
+        return []
+
+    if pool_size <= k:
+        ids = [row[0] for row in db.query(Question.id).filter(*criteria).all()]
+    else:
+        offsets = random.sample(range(1, pool_size + 1), k)
+        ranked = select(
+            Question.id.label("id"),
+            # Any stable order works; (subject_id, id) follows ix_questions_subject_year, so no table scan or sort
+            func.row_number().over(order_by=(Question.subject_id, Question.id)).label("rn")
+        ).where(*criteria).subquery()
+        ids = [row[0] for row in db.execute(select(ranked.c.id).where(ranked.c.rn.in_(offsets))).all()]
+
+    random.shuffle(ids)
+    return ids
+
+
+def _narrow(db: Session, base: list, extra: list):
+    """Applies extra criteria only if the narrowed pool is non-empty."""
+    narrowed = base + extra
+    size = count_pool(db, narrowed)
+    if size:
+        return narrowed, size
+    return base, None
+
+
+def select_question_ids(
+    db: Session,
+    exam_id: int,
+    count: int,
+    subject_id: Optional[int] = None,
+    topics: Optional[List[str]] = None,
+    year: Optional[int] = None,
+    section: Optional[str] = None,
+) -> List[int]:
+    """
+    Standard simulation selection.
+    - If the year filter leaves nothing, the full pool is used.
+    - If the section filter leaves nothing, it is ignored.
+    - If the topic-filtered pool is empty, falls back to the whole subject scope.
+    """
+    scope = scope_criteria(exam_id, subject_id)
+    criteria = scope + topic_criteria(topics)
+    size = None
+
+    if year:
+        criteria, size = _narrow(db, criteria, [Question.year == year])
+    if section and section.lower() != "full exam":
+        criteria, size = _narrow(db, criteria, section_criteria(section))
+
+    if size is None:
+        size = count_pool(db, criteria)
+    if size == 0:
+        criteria, size = scope, None
+
+    return sample_ids(db, criteria, count, pool_size=size)
+
+
+def select_ican_full_exam_ids(
+    db: Session,
+    exam_id: int,
+    level: Optional[str],
+    subject_id: Optional[int] = None,
+    topics: Optional[List[str]] = None,
+    year: Optional[int] = None,
+) -> List[int]:
+    """
+    ICAN "Full Exam" structure.
+    Foundation: 20 MCQs + 5 theory. Skills & Professional: 6 theory, topped up with MCQs.
+    """
+    criteria = scope_criteria(exam_id, subject_id) + topic_criteria(topics)
+    if year:
+        criteria, _ = _narrow(db, criteria, [Question.year == year])
+
+    if level == "Foundation":
+        return (
+            sample_ids(db, criteria + mcq_criteria(), ICAN_FOUNDATION_MCQ)
+            + sample_ids(db, criteria + theory_criteria(), ICAN_FOUNDATION_THEORY)
+        )
+
+    selected = sample_ids(db, criteria + theory_criteria(), ICAN_SKILLS_TOTAL)
+    if len(selected) < ICAN_SKILLS_TOTAL:
+        selected += sample_ids(db, criteria + mcq_criteria(), ICAN_SKILLS_TOTAL - len(selected))
+    return selected
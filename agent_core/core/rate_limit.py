@@ -0,0 +1,169 @@
+"""
+Rate Limiter
+============
+Sliding-window request limiter with fixed memory per client.
+
+Each key keeps only two counters (this window and the previous one); the
+request rate is estimated by weighting the previous window by how much of it
+still overlaps the sliding window. Checking a request is O(1) regardless of
+the limit.
+
+Backends (RATE_LIMIT_BACKEND):
+  - "memory": in-process, sharded dicts with per-shard locks; idle keys are
+    evicted and each shard is capped at RATE_LIMIT_MAX_KEYS / shards entries.
+  - "sqlite": a shared SQLite file (RATE_LIMIT_SQLITE_PATH) so the limit holds
+    across several uvicorn workers on one host. Each check takes the file's
+    write lock (waiting up to 1s under contention), so async callers use
+    hit_async(), which runs it in a worker thread instead of on the event loop.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Tuple
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "reharz_rate_limit.sqlite3"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SHARDS = 16
+EVICTION_INTERVAL_HITS = 1000
+
+
+def _estimate(previous: int, current: int, window_start: float, window: float, now: float) -> float:
+    overlap = max(0.0, 1.0 - (now - window_start) / window)
+    return previous * overlap + current
+
+
+def _roll(window_index: int, previous: int, current: int, now_index: int) -> Tuple[int, int]:
+    """Shifts the counters of a key forward to the current window."""
+    if window_index == now_index:
+        return previous, current
+    if window_index == now_index - 1:
+        return current, 0
+    return 0, 0
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, shards: int = RATE_LIMIT_SHARDS):
+        self._shards = [OrderedDict() for _ in range(shards)]  # key -> [window_index, previous, current]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._hits = [0] * shards
+        self.max_keys_per_shard = max(1, max_keys // shards)
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        shard_id = zlib.crc32(key.encode("utf-8")) % len(self._shards)
+        shard = self._shards[shard_id]
+        now_index = int(now // window)
+        with self._locks[shard_id]:
+            counters = shard.get(key)
+            if counters is None:
+                counters = [now_index, 0, 0]
+                shard[key] = counters
+            else:
+                shard.move_to_end(key)
+            counters[1], counters[2] = _roll(counters[0], counters[1], counters[2], now_index)
+            counters[0] = now_index
+
+            allowed = _estimate(counters[1], counters[2], now_index * window, window, now) < limit
+            if allowed:
+                counters[2] += 1
+
+            self._hits[shard_id] += 1
+            if self._hits[shard_id] >= EVICTION_INTERVAL_HITS or len(shard) > self.max_keys_per_shard:
+                self._hits[shard_id] = 0
+                self._evict(shard, now_index)
+        return allowed, 0.0 if allowed else (now_index + 1) * window - now
+
+    def _evict(self, shard: OrderedDict, now_index: int):
+        # Least-recently-seen keys sit at the front; anything older than the previous window is idle
+        while shard:
+            key, counters = next(iter(shard.items()))
+            if counters[0] < now_index - 1 or len(shard) > self.max_keys_per_shard:
+                shard.popitem(last=False)
+            else:
+                break
+
+    def size(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+class SQLiteBackend:
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, previous INTEGER NOT NULL, current INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_window ON rate_limits (window_index)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        conn = self._conn()
+        now_index = int(now // window)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT window_index, previous, current FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            previous, current = _roll(*row, now_index) if row else (0, 0)
+            allowed = _estimate(previous, current, now_index * window, window, now) < limit
+            if allowed:
+                current += 1
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_index, previous, current) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET window_index = excluded.window_index, "
+                "previous = excluded.previous, current = excluded.current",
+                (key, now_index, previous, current)
+            )
+            self._hits += 1
+            if self._hits >= EVICTION_INTERVAL_HITS:
+                self._hits = 0
+                conn.execute("DELETE FROM rate_limits WHERE window_index < ?", (now_index - 1,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0.0 if allowed else (now_index + 1) * window - now
+
+    def size(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    def __init__(self, limit: int, window_seconds: float, backend=None):
+        self.limit = limit
+        self.window = window_seconds
+        self.backend = backend or (SQLiteBackend() if RATE_LIMIT_BACKEND == "sqlite" else MemoryBackend())
+
+    def hit(self, key: str) -> Tuple[bool, float]:
+        """Counts a request for key. Returns (allowed, retry_after_seconds)."""
+        try:
+            return self.backend.hit(key, self.limit, self.window, time.time())
+        except Exception as e:
+            # Fail open: a broken limiter store must not take the API down
+            print(f"RATE LIMIT WARNING: Backend error, allowing request: {e}")
+            return True, 0.0
+
+    async def hit_async(self, key: str) -> Tuple[bool, float]:
+        """hit() for the event loop: blocking backends run in a worker thread."""
+        if getattr(self.backend, "blocking", True):
+            return await asyncio.to_thread(self.hit, key)
+        return self.hit(key)
@@ -0,0 +1,174 @@
+"""
+Subject Profile Store
+=====================
+Persists the expert "DNA" profile of each subject so it is not regenerated
+with GPT-4o on every request.
+
+A profile is keyed on subject id plus a fingerprint of its content: question
+count/id range and the path and content hash of every matched data file.
+Requests are served from the store; when the fingerprint has moved on, a
+regeneration is scheduled in the background and the previous profile keeps
+being served until it lands. The per-user performance overlay is always
+read live from the user_topic_stats rollup.
+"""
+
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from agent_core.database import SessionLocal
+from agent_core.core.expert_engine import ExpertEngine
+from agent_core.core.corpus_index import get_corpus_index
+from agent_core.core import topic_stats
+from agent_core.models.main_models import Subject, Question, SubjectProfile
+
+SAMPLE_QUESTIONS = 30
+
+_refreshing: Set[int] = set()
+
+
+def find_subject_files(subject_name: str, exam_name: Optional[str]) -> List[Dict]:
+    """Markdown files indexed under the subject name for its exam (see corpus_index.py)."""
+    if not exam_name:
+        return []
+    return get_corpus_index().lookup_subject(subject_name, exam=exam_name, fmt="md")
+
+
+def subject_files(subject: Subject) -> List[Dict]:
+    return find_subject_files(subject.name, subject.exam.name if subject.exam else None)
+
+
+def compute_fingerprint(db: Session, subject: Subject, files: List[Dict]) -> str:
+    count, min_id, max_id = db.query(
+        func.count(Question.id), func.min(Question.id), func.max(Question.id)
+    ).filter(Question.subject_id == subject.id).one()
+
+    parts = [subject.name, str(count), str(min_id), str(max_id)]
+    parts.extend(f"{entry['path']}:{entry['sha256']}" for entry in files)
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def generate_profile(db: Session, subject: Subject, files: List[Dict]) -> Dict:
+    """Runs the (slow, sync) expert analysis for a subject."""
+    questions = db.query(Question.text, Question.topic)\
+        .filter(Question.subject_id == subject.id).limit(SAMPLE_QUESTIONS).all()
+    q_data = [{"text": text, "topic": topic} for text, topic in questions]
+
+    index = get_corpus_index()
+    extra_content = ""
+    for entry in files:
+        try:
+            with open(index.abspath(entry), "r", encoding="utf-8") as f:
+                extra_content += f.read() + "\n\n"
+        except:
+            pass
+
+    return ExpertEngine.analyze_syllabus_sync(subject.name, q_data, extra_content)
+
+
+def refresh_profile(db: Session, subject: Subject) -> Dict:
+    """Regenerates and stores a subject profile if its fingerprint changed."""
+    files = subject_files(subject)
+    fingerprint = compute_fingerprint(db, subject, files)
+    stored = db.query(SubjectProfile).get(subject.id)
+    if stored and stored.fingerprint == fingerprint:
+        return stored.profile
+
+    profile = generate_profile(db, subject, files)
+    if stored is None:
+        stored = SubjectProfile(subject_id=subject.id)
+        db.add(stored)
+    stored.fingerprint = fingerprint
+    stored.profile = profile
+    stored.updated_at = datetime.utcnow()
+    db.commit()
+    return profile
+
+
+def _refresh_in_own_session(subject_id: int):
+    db = SessionLocal()
+    try:
+        subject = db.query(Subject).get(subject_id)
+        if subject:
+            refresh_profile(db, subject)
+    except Exception as e:
+        print(f"PROFILE WARNING: Could not regenerate profile for subject {subject_id}: {e}")
+    finally:
+        db.close()
+        _refreshing.discard(subject_id)
+
+
+def schedule_refresh(subject_id: int):
+    """Regenerates a profile in a worker thread, at most once at a time per subject."""
+    if subject_id in _refreshing:
+        return
+    _refreshing.add(subject_id)
+    asyncio.get_running_loop().run_in_executor(None, _refresh_in_own_session, subject_id)
+
+
+def performance_overlay(db: Session, subject_id: int, user_id: int) -> Dict:
+    topics = topic_stats.topic_accuracy(db, user_id, subject_id=subject_id)
+    return {t: round(acc * 100, 1) for t, acc in topics}
+
+
+def get_profile_sync(db: Session, subject_id: int, user_id: int) -> Optional[Dict]:
+    """Blocking lookup: regenerates inline when the stored profile is missing or stale."""
+    subject = db.query(Subject).get(subject_id)
+    if not subject:
+        return None
+    profile = dict(refresh_profile(db, subject))
+    profile["performance"] = performance_overlay(db, subject_id, user_id)
+    return profile
+
+
+def _stored_profile_state(subject_id: int):
+    """Returns (exists, stored_profile, is_fresh) using a short-lived session."""
+    db = SessionLocal()
+    try:
+        subject = db.query(Subject).get(subject_id)
+        if not subject:
+            return False, None, False
+        stored = db.query(SubjectProfile).get(subject_id)
+        if stored is None:
+            return True, None, False
+        fresh = stored.fingerprint == compute_fingerprint(db, subject, subject_files(subject))
+        return True, stored.profile, fresh
+    finally:
+        db.close()
+
+
+async def get_profile(subject_id: int, user_id: int) -> Optional[Dict]:
+    """
+    Non-blocking lookup for the API.
+    Serves the stored profile (scheduling a background refresh if stale) and only
+    waits for generation when no profile has ever been stored.
+    """
+    loop = asyncio.get_running_loop()
+    exists, profile, fresh = await loop.run_in_executor(None, _stored_profile_state, subject_id)
+    if not exists:
+        return None
+
+    if profile is None:
+        if subject_id not in _refreshing:
+            _refreshing.add(subject_id)
+            await loop.run_in_executor(None, _refresh_in_own_session, subject_id)
+        exists, profile, fresh = await loop.run_in_executor(None, _stored_profile_state, subject_id)
+        if profile is None:
+            raise RuntimeError("Subject profile is being generated. Please try again shortly.")
+    elif not fresh:
+        schedule_refresh(subject_id)
+
+    def _overlay():
+        db = SessionLocal()
+        try:
+            return performance_overlay(db, subject_id, user_id)
+        finally:
+            db.close()
+
+    profile = dict(profile)
+    profile["performance"] = await loop.run_in_executor(None, _overlay)
+    return profile
@@ -0,0 +1,90 @@
+"""
+Subscription Tier Projection
+============================
+Keeps User.effective_tier / User.tier_expires_at in step with the
+subscriptions table so tier gating never has to load a user's subscription
+history.
+
+The projection is the best active subscription: highest tier first, then the
+latest expiry. It is recomputed in the same transaction as a purchase, and a
+periodic sweeper (TIER_SWEEP_INTERVAL_SECONDS) recomputes users whose
+projected tier has lapsed, falling back to any other subscription still
+active. Until the sweeper gets to a lapsed user, User.current_tier resolves
+the fallback itself on read. The first sweep also backfills users created
+before the projection existed.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from agent_core.database import SessionLocal
+from agent_core.models.main_models import Subscription, SubscriptionTier, User
+
+TIER_SWEEP_INTERVAL_SECONDS = int(os.getenv("TIER_SWEEP_INTERVAL_SECONDS", "300"))
+TIER_POWER = {SubscriptionTier.FREE: 0, SubscriptionTier.PREMIUM: 1, SubscriptionTier.ELITE: 2}
+
+
+def resolve_tier(db: Session, user_id: int, now: Optional[datetime] = None) -> Tuple[SubscriptionTier, Optional[datetime]]:
+    """Best active subscription of a user as (tier, expiry); (FREE, None) when there is none."""
+    now = now or datetime.utcnow()
+    active = db.query(Subscription.tier, Subscription.expiry_date).filter(
+        Subscription.user_id == user_id,
+        Subscription.is_active == True,
+        Subscription.expiry_date > now
+    ).all()
+    if not active:
+        return SubscriptionTier.FREE, None
+    tier, expiry = max(active, key=lambda s: (TIER_POWER.get(s.tier, 0), s.expiry_date))
+    return tier, expiry
+
+
+def refresh_user_tier(db: Session, user: User, now: Optional[datetime] = None):
+    """Recomputes the projection of one user. The caller commits."""
+    user.effective_tier, user.tier_expires_at = resolve_tier(db, user.id, now)
+
+
+def record_purchase(db: Session, user_id: int, subscription: Subscription) -> User:
+    """Adds a subscription and updates the user's projection in the same transaction. The caller commits."""
+    user = db.query(User).filter(User.id == user_id).with_for_update().one()
+    db.add(subscription)
+    db.flush()
+    refresh_user_tier(db, user)
+    return user
+
+
+def sweep_expired(db: Session, now: Optional[datetime] = None) -> int:
+    """Recomputes lapsed projections and backfills missing ones. Returns the number of users updated."""
+    now = now or datetime.utcnow()
+    lapsed = db.query(User).filter(User.tier_expires_at <= now).all()
+    missing = db.query(User).filter(
+        User.effective_tier.is_(None),
+        User.subscriptions.any((Subscription.is_active == True) & (Subscription.expiry_date > now))
+    ).all()
+    for user in lapsed + missing:
+        refresh_user_tier(db, user, now)
+    db.commit()
+    return len(lapsed) + len(missing)
+
+
+def _sweep_in_own_session() -> int:
+    db = SessionLocal()
+    try:
+        return sweep_expired(db)
+    finally:
+        db.close()
+
+
+async def run_sweeper(interval: int = TIER_SWEEP_INTERVAL_SECONDS):
+    """Background task started with the app."""
+    while True:
+        try:
+            updated = await asyncio.to_thread(_sweep_in_own_session)
+            if updated:
+                print(f"SUBSCRIPTIONS: Recomputed tier for {updated} user(s)")
+        except Exception as e:
+            print(f"SUBSCRIPTIONS WARNING: Tier sweep failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,54 @@
+"""
+Agent Tool Executor
+===================
+Runs ExamAgent tools off the event loop.
+
+Sync tools (SQLAlchemy queries, sync ExpertEngine calls) run in a bounded
+thread pool (TOOL_WORKERS threads); tools with a native async variant are
+awaited directly. All tool calls returned by the model in one turn run
+concurrently, each with a timeout, and a failing tool yields an error string
+for the model instead of failing the whole chat turn.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "120"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="agent-tool")
+
+
+async def run_sync(func: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking callable in the tool thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_tool_calls(
+    calls: List[Tuple[str, Dict]],
+    dispatch: Callable[[str, Dict], Awaitable[Any]],
+    timeout: float = TOOL_TIMEOUT_SECONDS,
+) -> List[Any]:
+    """
+    Executes [(function_name, function_args)] concurrently through dispatch.
+    Results are returned in call order; errors and timeouts become error strings.
+    """
+    async def _run_one(function_name: str, function_args: Dict) -> Any:
+        try:
+            return await asyncio.wait_for(dispatch(function_name, function_args), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"TOOL WARNING: {function_name} timed out after {timeout}s")
+            return f"Error: {function_name} timed out. Please try again."
+        except Exception as e:
+            print(f"TOOL WARNING: {function_name} failed: {e}")
+            return f"Error: {function_name} failed: {e}"
+
+    return await asyncio.gather(*[_run_one(name, args) for name, args in calls])
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
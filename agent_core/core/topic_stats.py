@@ -0,0 +1,139 @@
+"""
+Topic Stats Rollup
+==================
+Per-user performance aggregates, keyed (user_id, subject_id, topic).
+
+Every place that logs a UserProgress row also calls record_attempts() in the
+same transaction, which upserts the matching rollup rows with relative
+increments (attempts, correct, per-difficulty attempts, last_seen). Weakness
+detection and the profile performance overlay then read a handful of rollup
+rows instead of aggregating the user's whole answer history.
+
+Backfill (rebuilds the table from user_progress); migration v0004 runs it
+once on existing databases:
+    python -m agent_core.core.topic_stats
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.orm import Session
+
+from agent_core.models.main_models import DifficultyLevel, Question, UserProgress, UserTopicStat
+
+DEFAULT_TOPIC = "General"
+UNKNOWN_SUBJECT = 0
+
+DIFFICULTY_COLUMNS = {
+    DifficultyLevel.EASY: "easy_attempts",
+    DifficultyLevel.MEDIUM: "medium_attempts",
+    DifficultyLevel.HARD: "hard_attempts",
+}
+COUNTER_COLUMNS = ("attempts", "correct", "easy_attempts", "medium_attempts", "hard_attempts")
+
+
+def record_attempts(db: Session, attempts: Iterable[Dict]):
+    """
+    Adds attempts to the rollup. The caller commits (together with its UserProgress rows).
+    attempts: [{"user_id", "subject_id", "topic", "difficulty", "is_correct", "attempt_date"}]
+    """
+    deltas = defaultdict(lambda: {**{c: 0 for c in COUNTER_COLUMNS}, "last_seen": None})
+    for a in attempts:
+        key = (a["user_id"], a.get("subject_id") or UNKNOWN_SUBJECT, a.get("topic") or DEFAULT_TOPIC)
+        delta = deltas[key]
+        delta["attempts"] += 1
+        delta["correct"] += 1 if a.get("is_correct") else 0
+        column = DIFFICULTY_COLUMNS.get(a.get("difficulty"))
+        if column:
+            delta[column] += 1
+        seen = a.get("attempt_date") or datetime.utcnow()
+        delta["last_seen"] = max(delta["last_seen"] or seen, seen)
+
+    if not deltas:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        table = UserTopicStat.__table__
+        for (user_id, subject_id, topic), delta in deltas.items():
+            stmt = insert(table).values(user_id=user_id, subject_id=subject_id, topic=topic, **delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "subject_id", "topic"],
+                set_={
+                    **{c: table.c[c] + stmt.excluded[c] for c in COUNTER_COLUMNS},
+                    "last_seen": func.coalesce(
+                        case((table.c.last_seen > stmt.excluded.last_seen, table.c.last_seen), else_=stmt.excluded.last_seen),
+                        stmt.excluded.last_seen
+                    ),
+                }
+            )
+            db.execute(stmt)
+        return
+
+    # Portable fallback: read-modify-write
+    for (user_id, subject_id, topic), delta in deltas.items():
+        row = db.query(UserTopicStat).get((user_id, subject_id, topic))
+        if row is None:
+            db.add(UserTopicStat(user_id=user_id, subject_id=subject_id, topic=topic, **delta))
+            continue
+        for c in COUNTER_COLUMNS:
+            setattr(row, c, (getattr(row, c) or 0) + delta[c])
+        row.last_seen = max(row.last_seen or delta["last_seen"], delta["last_seen"])
+
+
+def topic_accuracy(db: Session, user_id: int, subject_id: Optional[int] = None) -> List[Tuple[str, float]]:
+    """[(topic, accuracy 0..1)] for a user, optionally within one subject."""
+    query = db.query(
+        UserTopicStat.topic,
+        func.sum(UserTopicStat.correct),
+        func.sum(UserTopicStat.attempts),
+    ).filter(UserTopicStat.user_id == user_id)
+    if subject_id is not None:
+        query = query.filter(UserTopicStat.subject_id == subject_id)
+    rows = query.group_by(UserTopicStat.topic).all()
+    return [(topic, correct / attempts) for topic, correct, attempts in rows if attempts]
+
+
+def rebuild(db):
+    """Replaces the rollup with an aggregate of user_progress (INSERT ... SELECT). db: a Session or Connection; no commit."""
+    subject_id = func.coalesce(Question.subject_id, UNKNOWN_SUBJECT)
+    topic = func.coalesce(UserProgress.topic, DEFAULT_TOPIC)
+    aggregate = select(
+        UserProgress.user_id,
+        subject_id,
+        topic,
+        func.count(UserProgress.id),
+        func.sum(case((UserProgress.is_correct == True, 1), else_=0)),
+        *[func.sum(case((UserProgress.difficulty == level, 1), else_=0)) for level in DIFFICULTY_COLUMNS],
+        func.max(UserProgress.attempt_date),
+    ).outerjoin(Question, Question.id == UserProgress.question_id)\
+     .where(UserProgress.user_id != None)\
+     .group_by(UserProgress.user_id, subject_id, topic)
+
+    db.execute(delete(UserTopicStat.__table__))
+    db.execute(UserTopicStat.__table__.insert().from_select(
+        ["user_id", "subject_id", "topic", *COUNTER_COLUMNS, "last_seen"],
+        aggregate
+    ))
+
+
+def backfill(db: Session) -> int:
+    """Rebuilds the rollup from user_progress and commits. Returns the number of rows."""
+    rebuild(db)
+    db.commit()
+    return db.query(func.count()).select_from(UserTopicStat).scalar()
+
+
+if __name__ == "__main__":
+    from agent_core.database import SessionLocal
+    db = SessionLocal()
+    try:
+        print(f"[OK] Rebuilt user_topic_stats: {backfill(db)} row(s)")
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+"""
+WAEC Catalogue
+==============
+Serves the files written by scripts/build_waec_catalogue.py:
+
+    data/waec_catalogue/index.json                   subjects, their years and question counts
+    data/waec_catalogue/<subject-slug>/<year>.json   one paper's questions
+    data/waec_catalogue.json                         everything in one document (legacy /api/waec)
+
+The files are already serialised JSON, so they are served as the bytes on
+disk: nothing is parsed or re-encoded per request. Each file is read once
+and kept in memory with a strong ETag (sha256 of the body) until its mtime
+or size changes, so a cached request costs a single os.stat and a rebuilt
+catalogue is picked up without a restart.
+"""
+
+import hashlib
+import os
+import re
+from collections import namedtuple
+from typing import Dict, Optional
+
+from agent_core.core.corpus_index import DATA_ROOT
+
+CATALOGUE_DIR = os.getenv("WAEC_CATALOGUE_DIR", os.path.join(DATA_ROOT, "waec_catalogue"))
+INDEX_NAME = "index.json"
+LEGACY_FILE = os.path.join(DATA_ROOT, "waec_catalogue.json")
+
+CachedFile = namedtuple("CachedFile", ["body", "etag"])
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(subject: str) -> str:
+    """Shard directory name for a subject: "Business Management" -> "business-management"."""
+    return _SLUG_RE.sub("-", subject.lower()).strip("-")
+
+
+def index_path(catalogue_dir: str = CATALOGUE_DIR) -> str:
+    return os.path.join(catalogue_dir, INDEX_NAME)
+
+
+def shard_path(subject: str, year: int, catalogue_dir: str = CATALOGUE_DIR) -> str:
+    return os.path.join(catalogue_dir, slugify(subject), f"{int(year)}.json")
+
+
+class FileCache:
+    """File bodies and their ETags, re-read only when the file's mtime or size changes."""
+
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}  # path -> ((mtime_ns, size), CachedFile)
+
+    def get(self, path: str) -> Optional[CachedFile]:
+        """The file's current body, or None if it does not exist."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self._entries.pop(path, None)
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        cached = CachedFile(body, f'"{hashlib.sha256(body).hexdigest()}"')
+        self._entries[path] = (version, cached)
+        return cached
+
+
+file_cache = FileCache()
+
+
+def get_index() -> Optional[CachedFile]:
+    return file_cache.get(index_path())
+
+
+def get_shard(subject: str, year: int) -> Optional[CachedFile]:
+    # Only existing shard files are ever cached, so arbitrary subject/year requests cannot grow the cache
+    if not slugify(subject):
+        return None
+    return file_cache.get(shard_path(subject, year))
+
+
+def get_legacy_catalogue() -> Optional[CachedFile]:
+    return file_cache.get(LEGACY_FILE)
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -10,12 +11,76 @@ load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file_
 # Using SQLite for a purely local, single-file performance by default
 DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./agent_local_data.db"
 
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(DATABASE_URL)
+# --- Engine profiles ---
+# Server databases (Postgres): a bounded pool per worker process, checked before use and
+# recycled before server/proxy idle timeouts silently drop connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite: WAL lets readers run alongside the single writer, synchronous=NORMAL is durable under
+# WAL except for the last commits on power loss, and busy_timeout makes concurrent writers wait
+# for the lock instead of failing with "database is locked".
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str) -> dict:
+    """create_engine() keyword arguments for the backend of `url`."""
+    if _is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def sqlite_pragmas(url: str) -> list:
+    """PRAGMA statements run on every new SQLite connection."""
+    pragmas = [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    database = make_url(url).database
+    if database and database != ":memory:":
+        # The journal mode is a property of the database file; WAL is not available in memory
+        pragmas.insert(0, f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    return pragmas
+
+
+def _install_sqlite_pragmas(sync_engine, url: str):
+    pragmas = sqlite_pragmas(url)
+
+    @event.listens_for(sync_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_configured_engine(url: str):
+    configured = create_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        _install_sqlite_pragmas(configured, url)
+    return configured
+
+
+engine = create_configured_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -28,3 +93,55 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# --- Async path (FastAPI async routes) ---
+# Same database, reached through asyncpg / aiosqlite so DB waits yield to the event loop.
+# Built on first use: scripts only need the sync engine and its drivers.
+# Other code on the loop that uses SessionLocal (the grading job workers in core/jobs.py)
+# must run its database phases in a worker thread instead.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+_async_engine = None
+_async_session_factory = None
+
+
+def async_database_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        options = engine_options(DATABASE_URL)
+        if _is_sqlite(DATABASE_URL):
+            # aiosqlite runs each connection on its own thread; check_same_thread does not apply
+            options = {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        _async_engine = create_async_engine(async_database_url(DATABASE_URL), **options)
+        if _is_sqlite(DATABASE_URL):
+            _install_sqlite_pragmas(_async_engine.sync_engine, DATABASE_URL)
+
+        # expire_on_commit=False: attribute access after commit must not trigger implicit (sync) IO
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
@@ -1,12 +1,14 @@
+import asyncio
 import time
 import httpx
-from collections import defaultdict
 from datetime import datetime, timedelta
 import random
-from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 import os
 import sys
 import json
@@ -18,12 +20,15 @@ print(f"DATABASE: Using {os.getenv('DATABASE_URL')}")
 # Ensure agent_core is in path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from agent_core.database import get_db, engine, Base
+from agent_core.database import get_db, get_async_db, engine, Base, AsyncSessionLocal, dispose_async_engine
+from agent_core import migrations
 from agent_core.models import main_models
 from agent_core.schemas import main_schemas
 from agent_core.core.agent import ExamAgent
 from agent_core.core.expert_engine import ExpertEngine
+from agent_core.core.llm_cache import llm_cache
 from agent_core.core import auth
+from agent_core.core import question_loader, question_selector, blueprints, grading, jobs, subject_profiles, tool_executor, rate_limit, auth_context, subscriptions, topic_stats, waec_catalogue, catalogue_cache
 from typing import List, Optional
 from pydantic import BaseModel, Field, validator
 from datetime import datetime, timedelta
@@ -39,76 +44,44 @@ from jose import JWTError, jwt
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
-# --- AUTO-MIGRATION: Adds missing columns to existing tables on startup ---
-def safe_migrate():
-    from sqlalchemy import inspect, text
-    from sqlalchemy import Integer, String, Boolean, Float, DateTime, JSON
-    inspector = inspect(engine)
-    existing_tables = inspector.get_table_names()
-
-    # First, create any brand-new tables
-    Base.metadata.create_all(bind=engine)
-
-    # Then, for each table defined in models, add any missing columns
-    type_map = {
-        'INTEGER': 'INTEGER',
-        'VARCHAR': 'VARCHAR',
-        'BOOLEAN': 'BOOLEAN',
-        'FLOAT': 'FLOAT DEFAULT 0.0',
-        'DATETIME': 'TIMESTAMP',
-        'JSON': 'JSON',
-    }
-
-    with engine.connect() as conn:
-        for table in Base.metadata.sorted_tables:
-            if table.name not in existing_tables:
-                continue  # Already handled by create_all above
-            existing_cols = {col['name'] for col in inspector.get_columns(table.name)}
-            for col in table.columns:
-                if col.name not in existing_cols:
-                    col_type = str(col.type).upper().split('(')[0].strip()
-                    sql_type = type_map.get(col_type, 'VARCHAR')
-                    default = ''
-                    if col.default is not None and hasattr(col.default, 'arg'):
-                        arg = col.default.arg
-                        if isinstance(arg, bool):
-                            default = f" DEFAULT {'TRUE' if arg else 'FALSE'}"
-                        elif isinstance(arg, (int, float)):
-                            default = f" DEFAULT {arg}"
-                        elif isinstance(arg, str):
-                            default = f" DEFAULT '{arg}'"
-                    elif col.nullable is False and col_type == 'BOOLEAN':
-                        default = ' DEFAULT FALSE'
-                    try:
-                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS "{col.name}" {sql_type}{default}'))
-                        conn.commit()
-                        print(f"AUTO-MIGRATE: Added column '{col.name}' to table '{table.name}'")
-                    except Exception as e:
-                        print(f"AUTO-MIGRATE WARNING: Could not add '{col.name}' to '{table.name}': {e}")
-
-safe_migrate()
-
 app = FastAPI(title="Reharz Exam Simulation Engine", debug=False) # Turned off debug for error hiding
 
+@app.on_event("startup")
+async def start_job_workers():
+    # Schema changes are applied by the deploy step (python -m agent_core.migrations), never at import
+    outstanding = migrations.pending(engine)
+    if outstanding:
+        print(f"DATABASE WARNING: {len(outstanding)} pending migration(s); run 'python -m agent_core.migrations'")
+    await jobs.job_queue.start()
+    app.state.tier_sweeper = asyncio.create_task(subscriptions.run_sweeper())
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await jobs.job_queue.stop()
+    app.state.tier_sweeper.cancel()
+    tool_executor.shutdown()
+    auth.shutdown_password_executor()
+    await dispose_async_engine()
+
 # --- SECURITY MIDDLEWARES & HELPERS ---
 
-# 1. Simple Rate Limiter (Memory-based)
+# 1. Rate Limiter (sliding window, see core/rate_limit.py; RATE_LIMIT_BACKEND=sqlite to share across workers)
 RATE_LIMIT_DURATION = 60 # 1 minute
-MAX_REQUESTS = 1000 # per minute
-request_counts = defaultdict(list)
+MAX_REQUESTS = int(os.getenv("RATE_LIMIT_MAX_REQUESTS", "1000")) # per minute
+rate_limiter = rate_limit.RateLimiter(MAX_REQUESTS, RATE_LIMIT_DURATION)
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
     client_ip = request.client.host
-    now = time.time()
+    allowed, retry_after = await rate_limiter.hit_async(client_ip)
     
-    # Filter out requests older than the duration
-    request_counts[client_ip] = [t for t in request_counts[client_ip] if now - t < RATE_LIMIT_DURATION]
-    
-    if len(request_counts[client_ip]) >= MAX_REQUESTS:
-        return JSONResponse(status_code=429, content={"detail": "Too many requests. Please try again later."})
+    if not allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Too many requests. Please try again later."},
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
     
-    request_counts[client_ip].append(now)
     return await call_next(request)
 
 # 2. Global Exception Handler (Hide stack traces)
@@ -136,7 +109,8 @@ async def auth_middleware(request: Request, call_next):
         
         try:
             raw_token = token.split(" ")[1]
-            jwt.decode(raw_token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+            # Verified once here; get_current_user reuses the claims from request.state
+            request.state.claims = auth_context.auth_cache.verify(raw_token)
         except JWTError:
             return JSONResponse(status_code=401, content={"detail": "Invalid or expired session token."})
             
@@ -165,45 +139,73 @@ app.add_middleware(
 def read_root():
     return {"message": "Reharz Exam Backend is running"}
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> auth_context.UserSnapshot:
+    """
+    Resolves the caller as a UserSnapshot (id, username, is_admin, current_tier).
+    Served from the auth cache; the User row is only read on a cache miss.
+    """
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    try:
-        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        username: str = payload.get("sub")
-        user_id: int = payload.get("user_id")
-        if username is None or user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if getattr(request.state, "claims", None) is None:
+        try:
+            request.state.claims = auth_context.auth_cache.verify(token)
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Could not validate credentials")
     
-    user = db.query(main_models.User).filter(main_models.User.id == user_id).first()
+    snapshot = auth_context.auth_cache.get_user(token)
+    if snapshot is not None:
+        return snapshot
+    
+    user = db.query(main_models.User).filter(main_models.User.id == request.state.claims["user_id"]).first()
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    snapshot = auth_context.snapshot_user(user)
+    auth_context.auth_cache.set_user(token, snapshot)
+    return snapshot
 
-def get_admin(current_user: main_models.User = Depends(get_current_user)):
+def get_admin(current_user: auth_context.UserSnapshot = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions (Admin required)")
     return current_user
 
+# --- CATALOGUE RESPONSES ---
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Pre-serialised JSON with a strong ETag; 304 without a body when the client already has it."""
+    # private: responses sit behind authentication; no-cache: browsers revalidate every time (a 304 is cheap)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# The category enum only changes with a deploy
+CATEGORIES_RESPONSE = catalogue_cache.build_response([c.value for c in main_models.ExamCategory])
+
 @app.get("/api/categories")
-def get_categories(current_user: main_models.User = Depends(get_current_user)):
-    return [c.value for c in main_models.ExamCategory]
+def get_categories(request: Request, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    return cached_json_response(request, CATEGORIES_RESPONSE.body, CATEGORIES_RESPONSE.etag)
 
 # --- AUTH ENDPOINTS ---
 
 @app.post("/api/auth/register")
-def register(user_data: main_schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: main_schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Validate username (Alphanumeric and underscores only to prevent injections)
     if not re.match(r"^[a-zA-Z0-9_.-]{3,30}$", user_data.username):
         raise HTTPException(status_code=400, detail="Username must be 3-30 characters long and contain only letters, numbers, underscores, dots, or dashes.")
         
     # Check if user exists
-    existing_user = db.query(main_models.User).filter(
+    existing_user = (await db.execute(select(main_models.User).where(
         (main_models.User.username == user_data.username) | 
         (main_models.User.email == user_data.email)
-    ).first()
+    ))).scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or Email already registered")
 
@@ -216,12 +218,12 @@ def register(user_data: main_schemas.UserCreate, db: Session = Depends(get_db)):
     new_user = main_models.User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=auth.get_password_hash(user_data.password),
+        hashed_password=await auth.hash_password_async(user_data.password),
         is_admin=is_admin_user
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Create token
     access_token = auth.create_access_token(data={"sub": new_user.username, "user_id": new_user.id})
@@ -237,21 +239,28 @@ def register(user_data: main_schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 @app.post("/api/auth/login")
-def login(login_data: dict, db: Session = Depends(get_db)):
+async def login(login_data: dict, db: AsyncSession = Depends(get_async_db)):
     username = login_data.get("username")
     password = login_data.get("password")
     
-    user = db.query(main_models.User).filter(main_models.User.username == username).first()
-    if not user or not auth.verify_password(password, user.hashed_password):
+    user = (await db.execute(select(main_models.User).where(main_models.User.username == username))).scalars().first()
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    is_valid, new_hash = await auth.verify_and_update_async(password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(status_code=401, detail="Invalid username or password")
+    if new_hash:
+        # Cost parameters changed since this hash was made; upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
 
     # Sync admin status on every login — if email is in ADMIN_EMAILS, promote automatically
     admin_emails = [e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
     should_be_admin = user.email in admin_emails
     if should_be_admin and not user.is_admin:
         user.is_admin = True
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
     access_token = auth.create_access_token(data={"sub": user.username, "user_id": user.id})
     return {
@@ -266,7 +275,7 @@ def login(login_data: dict, db: Session = Depends(get_db)):
     }
 
 @app.get("/api/user/{user_id}/stats")
-def get_user_stats(user_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_user_stats(user_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not permitted to access this user's stats")
     sessions = db.query(main_models.ExamSession).filter(
@@ -305,75 +314,60 @@ def get_user_stats(user_id: int, current_user: main_models.User = Depends(get_cu
     }
 
 @app.get("/api/exams", response_model=List[main_schemas.Exam])
-def get_exams(category: str = None, sub_category: str = None, name: str = None, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    query = db.query(main_models.Exam)
-    if name:
-        query = query.filter(main_models.Exam.name.ilike(f"%{name}%"))
-    if category and category.lower() != 'any':
-        query = query.filter(main_models.Exam.category == category)
-    if sub_category:
-        query = query.filter(main_models.Exam.sub_category == sub_category)
-    return query.all()
+def get_exams(request: Request, category: str = None, sub_category: str = None, name: str = None, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    if category and category.lower() == 'any':
+        category = None
+
+    def build():
+        # Subjects for every exam in one extra query instead of a lazy load per exam
+        query = db.query(main_models.Exam).options(selectinload(main_models.Exam.subjects))
+        if name:
+            query = query.filter(main_models.Exam.name.ilike(f"%{name}%"))
+        if category:
+            query = query.filter(main_models.Exam.category == category)
+        if sub_category:
+            query = query.filter(main_models.Exam.sub_category == sub_category)
+        return [main_schemas.Exam.model_validate(exam).model_dump(mode="json") for exam in query.all()]
+
+    cached = catalogue_cache.catalogue_cache.get(db, ("exams", category, sub_category, name or None), build)
+    return cached_json_response(request, cached.body, cached.etag)
 
 @app.get("/api/exams/{exam_id}/subjects")
-def get_subjects(exam_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    subjects = db.query(main_models.Subject).filter(
-        main_models.Subject.exam_id == exam_id
-    ).all()
-    exam = db.query(main_models.Exam).get(exam_id)
-    exam_name = exam.name if exam else "Unknown Exam"
-    return [{"id": s.id, "name": s.name, "exam_id": s.exam_id, "exam_name": exam_name} for s in subjects]
+def get_subjects(exam_id: int, request: Request, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    def build():
+        subjects = db.query(main_models.Subject).filter(
+            main_models.Subject.exam_id == exam_id
+        ).all()
+        exam = db.query(main_models.Exam).get(exam_id)
+        exam_name = exam.name if exam else "Unknown Exam"
+        return [{"id": s.id, "name": s.name, "exam_id": s.exam_id, "exam_name": exam_name} for s in subjects]
+
+    cached = catalogue_cache.catalogue_cache.get(db, ("subjects", exam_id), build)
+    return cached_json_response(request, cached.body, cached.etag)
 
 @app.get("/api/subjects/{subject_id}/profile")
-def get_subject_profile(subject_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    agent = ExamAgent(db=db)
-    return json.loads(agent.get_subject_profile(subject_id, user_id=current_user.id))
+async def get_subject_profile(subject_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    try:
+        profile = await subject_profiles.get_profile(subject_id, user_id=current_user.id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if profile is None:
+        return {"error": "Subject not found"}
+    return profile
 
 @app.get("/api/subjects/{subject_id}/questions")
-def get_questions(subject_id: int, limit: int = 20, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    questions = db.query(main_models.Question).filter(
-        main_models.Question.subject_id == subject_id
-    ).limit(limit).all()
+def get_questions(subject_id: int, limit: int = 20, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    questions = question_loader.load_questions(db, subject_id=subject_id, limit=limit)
     if not questions:
         raise HTTPException(status_code=404, detail="No questions found for this subject")
-    
-    result = []
-    for q in questions:
-        choices = db.query(main_models.Choice).filter(
-            main_models.Choice.question_id == q.id
-        ).all()
-        result.append({
-            "id": q.id,
-            "text": q.text,
-            "topic": q.topic,
-            "year": q.year,
-            "explanation": q.explanation,
-            "choices": [
-                {"id": c.id, "label": c.label, "text": c.text, "is_correct": c.is_correct}
-                for c in choices
-            ]
-        })
-    return result
+    return questions
 
 @app.get("/api/questions/{question_id}")
-def get_question(question_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    question = db.query(main_models.Question).filter(main_models.Question.id == question_id).first()
+def get_question(question_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    question = question_loader.load_question(db, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
-    
-    choices = db.query(main_models.Choice).filter(main_models.Choice.question_id == question.id).all()
-    return {
-        "id": question.id,
-        "text": question.text,
-        "topic": question.topic,
-        "year": question.year,
-        "explanation": question.explanation,
-        "subject_id": question.subject_id,
-        "choices": [
-            {"id": c.id, "label": c.label, "text": c.text, "is_correct": c.is_correct}
-            for c in choices
-        ]
-    }
+    return question
 
 class SubmitPayload(BaseModel):
     user_id: int
@@ -384,7 +378,7 @@ class SubmitPayload(BaseModel):
     difficulty: str = "medium"
 
 @app.post("/api/submit")
-def submit_answer(payload: SubmitPayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def submit_answer(payload: SubmitPayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if payload.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot submit for another user")
     diff_map = {
@@ -402,6 +396,14 @@ def submit_answer(payload: SubmitPayload, current_user: main_models.User = Depen
         attempt_date=datetime.utcnow()
     )
     db.add(progress)
+    topic_stats.record_attempts(db, [{
+        "user_id": progress.user_id,
+        "subject_id": db.query(main_models.Question.subject_id).filter(main_models.Question.id == payload.question_id).scalar(),
+        "topic": progress.topic,
+        "difficulty": progress.difficulty,
+        "is_correct": progress.is_correct,
+        "attempt_date": progress.attempt_date,
+    }])
     db.commit()
     return {"status": "ok", "is_correct": payload.is_correct}
 
@@ -411,7 +413,7 @@ class EssayPayload(BaseModel):
     criteria: str = "IELTS"
 
 @app.post("/api/grade-essay")
-async def grade_essay(payload: EssayPayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def grade_essay(payload: EssayPayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if payload.userId != current_user.id:
         raise HTTPException(status_code=403, detail="User ID mismatch in request payload")
     
@@ -434,7 +436,7 @@ async def grade_essay(payload: EssayPayload, current_user: main_models.User = De
             analysis_json=result
         )
         db.add(analysis)
-        db.commit()
+        await db.commit()
         
         return result
     except Exception as e:
@@ -446,7 +448,7 @@ class InterviewPayload(BaseModel):
     answer: str
 
 @app.post("/api/interview-evaluate")
-async def interview_evaluate(payload: InterviewPayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def interview_evaluate(payload: InterviewPayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     if payload.userId != current_user.id:
         raise HTTPException(status_code=403, detail="User ID mismatch in request payload")
     
@@ -469,7 +471,7 @@ async def interview_evaluate(payload: InterviewPayload, current_user: main_model
             analysis_json=result
         )
         db.add(analysis)
-        db.commit()
+        await db.commit()
         
         return result
     except Exception as e:
@@ -480,18 +482,15 @@ class ChatPayload(BaseModel):
     history: list = []
 
 @app.get("/api/user/stats/{user_id}")
-def get_user_stats_detailed(user_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_user_stats_detailed(user_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied")
     agent = ExamAgent(db=db)
     stats_text = agent.get_weak_topics(user_id)
     return {"stats_raw": stats_text}
 
-@app.post("/api/chat/{user_id}")
-async def chat_with_agent(user_id: int, request: dict, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    if user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Cannot chat as another user")
-    
+def sanitize_chat_request(request: dict):
+    """Validates and escapes a chat payload. Returns (message, history, subject_context)."""
     message = request.get("message", "")
     safe_message = html.escape(message.strip())
     
@@ -519,13 +518,85 @@ async def chat_with_agent(user_id: int, request: dict, current_user: main_models
             })
     
     safe_subject_context = html.escape(request.get("subject_context", "")) if request.get("subject_context") else None
+    return safe_message, safe_history, safe_subject_context
+
+@app.post("/api/chat/{user_id}")
+async def chat_with_agent(user_id: int, request: dict, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    if user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Cannot chat as another user")
     
-    agent = ExamAgent(db=db)
-    response = await agent.chat(user_id=user_id, message=safe_message, history=safe_history, subject_context=safe_subject_context)
+    safe_message, safe_history, safe_subject_context = sanitize_chat_request(request)
+    
+    # Tools run in worker threads with their own sessions; nothing here touches the DB on the event loop
+    agent = ExamAgent()
+    try:
+        response = await agent.chat(user_id=user_id, message=safe_message, history=safe_history, subject_context=safe_subject_context)
+    finally:
+        agent.close()
     return {"response": response}
 
+@app.post("/api/chat/{user_id}/stream")
+async def stream_chat_with_agent(user_id: int, request: dict, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    """Server-Sent Events variant of /api/chat: action, tool, token and done events (see ExamAgent.chat_stream)."""
+    if user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Cannot chat as another user")
+    
+    safe_message, safe_history, safe_subject_context = sanitize_chat_request(request)
+    agent = ExamAgent()
+    
+    async def event_source():
+        try:
+            async for event in agent.chat_stream(user_id=user_id, message=safe_message, history=safe_history, subject_context=safe_subject_context):
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            print(f"CHAT ERROR: Stream failed for User {user_id}: {e}")
+            yield f"event: error\ndata: {json.dumps({'type': 'error', 'detail': 'The assistant is temporarily unavailable.'})}\n\n"
+        finally:
+            agent.close()
+    
+    # X-Accel-Buffering stops nginx from holding back events until the response ends
+    return StreamingResponse(event_source(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/ws/chat/{user_id}")
+async def chat_socket(websocket: WebSocket, user_id: int, token: str = None):
+    """
+    WebSocket chat: the client sends {"message", "history", "subject_context"} per turn
+    and receives the same events as the SSE endpoint.
+    """
+    try:
+        claims = auth_context.auth_cache.verify(token or "")
+    except JWTError:
+        await websocket.close(code=4401)
+        return
+    if claims.get("user_id") != user_id:
+        await websocket.close(code=4403)
+        return
+    
+    await websocket.accept()
+    agent = ExamAgent()
+    try:
+        while True:
+            request = await websocket.receive_json()
+            try:
+                safe_message, safe_history, safe_subject_context = sanitize_chat_request(request)
+            except HTTPException as e:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+                continue
+            try:
+                async for event in agent.chat_stream(user_id=user_id, message=safe_message, history=safe_history, subject_context=safe_subject_context):
+                    await websocket.send_json(event)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                print(f"CHAT ERROR: Stream failed for User {user_id}: {e}")
+                await websocket.send_json({"type": "error", "detail": "The assistant is temporarily unavailable."})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        agent.close()
+
 @app.get("/api/history/{user_id}")
-def get_history(user_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_history(user_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied to history")
     history = db.query(main_models.UserProgress).filter(
@@ -543,12 +614,27 @@ def get_history(user_id: int, current_user: main_models.User = Depends(get_curre
     ]
 
 @app.get("/api/waec")
-def get_waec_catalogue(current_user: main_models.User = Depends(get_current_user)):
-    catalogue_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "waec_catalogue.json")
-    if not os.path.exists(catalogue_path):
+def get_waec_catalogue(request: Request, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    # Every subject and year in one document; prefer /api/waec/subjects + /api/waec/{subject}/{year}
+    cached = waec_catalogue.get_legacy_catalogue()
+    if cached is None:
         raise HTTPException(status_code=404, detail="WAEC catalogue not generated")
-    with open(catalogue_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return cached_json_response(request, cached.body, cached.etag)
+
+@app.get("/api/waec/subjects")
+def get_waec_subjects(request: Request, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    cached = waec_catalogue.get_index()
+    if cached is None:
+        raise HTTPException(status_code=404, detail="WAEC catalogue not generated")
+    return cached_json_response(request, cached.body, cached.etag)
+
+@app.get("/api/waec/{subject}/{year}")
+def get_waec_paper(subject: str, year: int, request: Request, current_user: auth_context.UserSnapshot = Depends(get_current_user)):
+    # subject may be the display name or its slug (both resolve to the same shard)
+    cached = waec_catalogue.get_shard(subject, year)
+    if cached is None:
+        raise HTTPException(status_code=404, detail=f"No WAEC {subject} paper for {year}")
+    return cached_json_response(request, cached.body, cached.etag)
 
 # --- NEW SIMULATION ENDPOINTS ---
 
@@ -563,7 +649,7 @@ class SimulationStartPayload(BaseModel):
     year: Optional[int] = None
 
 @app.post("/api/simulation/start")
-def start_simulation(payload: SimulationStartPayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def start_simulation(payload: SimulationStartPayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if payload.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Cannot start simulation for another user")
     
@@ -579,7 +665,7 @@ def start_simulation(payload: SimulationStartPayload, current_user: main_models.
         main_models.SubscriptionTier.ELITE: 2
     }
     
-    # Fetch user's current tier (derived from subscriptions in model property)
+    # Fetch user's current tier (from the tier projection, via the auth snapshot)
     if tier_power[current_user.current_tier] < tier_power[exam.required_tier]:
         # User is not at the required level
         raise HTTPException(
@@ -588,8 +674,7 @@ def start_simulation(payload: SimulationStartPayload, current_user: main_models.
         )
     # --- END GATING ---
 
-    # 1. Select questions
-    query = db.query(main_models.Question)
+    # 1. Select questions (filtering and sampling happen in SQL)
     is_ican = exam and "ICAN" in exam.name.upper()
     level = exam.sub_category if exam else None
 
@@ -603,82 +688,30 @@ def start_simulation(payload: SimulationStartPayload, current_user: main_models.
         if not payload.question_count or payload.question_count == 50: # If default
              target_count = 20
 
-    if payload.subject_id:
-        query = query.filter(main_models.Question.subject_id == payload.subject_id)
-    else:
-        # All subjects for this exam
-        subjects = db.query(main_models.Subject).filter(main_models.Subject.exam_id == payload.exam_id).all()
-        sub_ids = [s.id for s in subjects]
-        query = query.filter(main_models.Question.subject_id.in_(sub_ids))
-    
-    # Topic filter
-    if payload.topics:
-        from sqlalchemy import or_
-        topic_filters = [main_models.Question.topic.ilike(f"%{t}%") for t in payload.topics]
-        query = query.filter(or_(*topic_filters))
-    
-    all_questions = query.all()
-    
-    # Year filter (apply before section structure logic)
-    if payload.year:
-        year_filtered = [q for q in all_questions if q.year == payload.year]
-        if year_filtered:
-            all_questions = year_filtered
-
     # ICAN-specific "Full Exam" structure
     if is_ican and payload.section == 'full exam':
-        all_qs = all_questions # Already year-filtered
-        
-        # Categorize by presence of choices (most reliable for mixed imports)
-        mcq_qs = [q for q in all_qs if len(q.choices) > 0]
-        theory_qs = [q for q in all_qs if len(q.choices) == 0]
-        
-        # Fallback to section labels if choices detection yields nothing for a known structured paper
-        if not mcq_qs and not theory_qs:
-            mcq_qs = [q for q in all_qs if q.section and 'Multiple Choice' in q.section]
-            theory_qs = [q for q in all_qs if q.section and 'Theory' in q.section]
-
-        if level == "Foundation":
-            # Foundation: 20 MCQs + 5 Theory (Standard ICAN structure)
-            sampled_mcq = random.sample(mcq_qs, k=min(20, len(mcq_qs)))
-            sampled_theory = random.sample(theory_qs, k=min(5, len(theory_qs)))
-            selected = sampled_mcq + sampled_theory
-        else:
-            # Skills & Professional: Purely Theory/Computational (usually 5-6 questions)
-            # We sample up to 6 total theory questions
-            selected = random.sample(theory_qs, k=min(6, len(theory_qs)))
-            
-            # If we have less than 6 theory questions, fill the gap with MCQs if available
-            if len(selected) < 6 and mcq_qs:
-                gap = 6 - len(selected)
-                extra = random.sample(mcq_qs, k=min(gap, len(mcq_qs)))
-                selected += extra
-        
-        selected.sort(key=lambda x: x.section if x.section else "")
-    else:
-        # Standard filter 
-        if payload.section and payload.section.lower() != 'full exam':
-            filtered = [q for q in all_questions if q.section and payload.section.lower() in q.section.lower()]
-            if filtered:
-                all_questions = filtered
-        
-        from sqlalchemy import func
-        if not all_questions:
-            # Fallback to general subjects if filtered pool is empty
-            query = db.query(main_models.Question)
+        selected_ids = None
+        if not payload.topics:
+            # Precomputed MCQ/theory pools; no per-question choice loading
             if payload.subject_id:
-                query = query.filter(main_models.Question.subject_id == payload.subject_id)
+                sub_ids = [payload.subject_id]
             else:
-                subjects = db.query(main_models.Subject).filter(main_models.Subject.exam_id == payload.exam_id).all()
-                query = query.filter(main_models.Question.subject_id.in_([s.id for s in subjects]))
-            
-            all_questions = query.order_by(func.random()).limit(target_count).all()
-        else:
-            # If we already have a filtered pool, shuffle it well
-            random.shuffle(all_questions)
-            all_questions = all_questions[:target_count]
-        
-        selected = all_questions
+                sub_ids = [row[0] for row in db.query(main_models.Subject.id).filter(main_models.Subject.exam_id == payload.exam_id).all()]
+            selected_ids = blueprints.sample_ican_full_exam_ids(db, sub_ids, level, year=payload.year)
+        if selected_ids is None:
+            selected_ids = question_selector.select_ican_full_exam_ids(
+                db, payload.exam_id, level,
+                subject_id=payload.subject_id, topics=payload.topics, year=payload.year
+            )
+    else:
+        selected_ids = question_selector.select_question_ids(
+            db, payload.exam_id, target_count,
+            subject_id=payload.subject_id, topics=payload.topics,
+            year=payload.year, section=payload.section
+        )
+    selected = question_loader.load_questions(db, question_ids=selected_ids, include_answers=False)
+    if is_ican and payload.section == 'full exam':
+        selected.sort(key=lambda x: x["section"] if x["section"] else "")
     
     # 2. Create Session
     session = main_models.ExamSession(
@@ -691,17 +724,17 @@ def start_simulation(payload: SimulationStartPayload, current_user: main_models.
     db.refresh(session)
     
     # 3. Format response
-    result_questions = []
-    for q in selected:
-        choices = db.query(main_models.Choice).filter(main_models.Choice.question_id == q.id).all()
-        result_questions.append({
-            "id": q.id,
-            "text": q.text,
-            "topic": q.topic,
-            "section": q.section if q.section else ("Section A: Multiple Choice" if (q.choices and len(q.choices) > 0) else "Section B: Theory"),
-            "difficulty": str(q.difficulty.value),
-            "choices": [{"id": c.id, "label": c.label, "text": c.text} for c in q.choices] if q.choices else []
-        })
+    result_questions = [
+        {
+            "id": q["id"],
+            "text": q["text"],
+            "topic": q["topic"],
+            "section": q["section"] if q["section"] else ("Section A: Multiple Choice" if q["choices"] else "Section B: Theory"),
+            "difficulty": str(q["difficulty"]),
+            "choices": q["choices"]
+        }
+        for q in selected
+    ]
     
     return {
         "session_id": session.id,
@@ -715,8 +748,8 @@ class SimulationSubmitPayload(BaseModel):
     answers: dict  # {question_id: selected_label}
 
 @app.post("/api/simulation/submit")
-async def submit_simulation(payload: SimulationSubmitPayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    session = db.query(main_models.ExamSession).get(payload.session_id)
+async def submit_simulation(payload: SimulationSubmitPayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    session = await db.get(main_models.ExamSession, payload.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -724,63 +757,14 @@ async def submit_simulation(payload: SimulationSubmitPayload, current_user: main
         raise HTTPException(status_code=403, detail="Session ownership mismatch")
     
     session.end_time = datetime.utcnow()
+    await db.commit()
     
-    # Calculate score
-    correct_count = 0
-    total_count = len(payload.answers)
-    topics_stats = {} # {topic: {correct, total}}
-    
-    for q_id, response in payload.answers.items():
-        q = db.query(main_models.Question).get(int(q_id))
-        if not q: continue
-        
-        is_theory = not (q.choices and len(q.choices) > 0)
-        
-        if is_theory:
-            # EXPERT GRADING FOR THEORY
-            grading = await ExpertEngine.grade_theory_response(q.text, q.explanation or "", response)
-            is_correct = grading.get("score", 0) >= 50 # Pass threshold
-            feedback = grading.get("feedback", "")
-            score_contribution = grading.get("score", 0) / 100.0
-        else:
-            # MCQ GRADING
-            correct_choice = next((c for c in q.choices if c.is_correct), None)
-            is_correct = (correct_choice and correct_choice.label == response)
-            score_contribution = 1.0 if is_correct else 0.0
-            feedback = q.explanation if not is_correct else ""
-
-        if is_correct: correct_count += score_contribution
-        
-        # Topic tracking
-        topic = q.topic or "General"
-        if topic not in topics_stats:
-            topics_stats[topic] = {"correct": 0, "total": 0}
-        topics_stats[topic]["total"] += 1
-        topics_stats[topic]["correct"] += score_contribution
-        
-        # Log to user progress
-        progress = main_models.UserProgress(
-            user_id=session.user_id,
-            question_id=q.id,
-            topic=topic,
-            difficulty=q.difficulty,
-            is_correct=is_correct
-        )
-        db.add(progress)
-
-    session.score = (correct_count / total_count * 100) if total_count > 0 else 0
-    session.results_json = {
-        "correct": correct_count,
-        "total": total_count,
-        "topics": topics_stats,
-        "duration_seconds": (session.end_time - session.start_time).total_seconds()
-    }
-    
-    db.commit()
-    return session.results_json
+    # Grading (theory answers go to the expert engine) runs in the job worker pool
+    job = await db.run_sync(jobs.job_queue.submit, session.user_id, session.id, jobs.SIMULATION_SUBMIT, {"answers": payload.answers})
+    return JSONResponse(status_code=202, content=jobs.serialize_job(job))
 
 @app.get("/api/simulation/sessions/{user_id}")
-def get_user_sessions(user_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_user_sessions(user_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied to sessions")
     sessions = db.query(main_models.ExamSession).filter(
@@ -797,9 +781,9 @@ def get_user_sessions(user_id: int, current_user: main_models.User = Depends(get
         } for s in sessions
     ]
 
-@app.get("/api/simulation/{session_id}/analyze")
-async def analyze_simulation(session_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    session = db.query(main_models.ExamSession).get(session_id)
+@app.post("/api/simulation/{session_id}/analyze")
+async def analyze_simulation(session_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    session = await db.get(main_models.ExamSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     if session.user_id != current_user.id and not current_user.is_admin:
@@ -807,38 +791,59 @@ async def analyze_simulation(session_id: int, current_user: main_models.User = D
     if not session.results_json:
         raise HTTPException(status_code=400, detail="Session is not completed yet")
     
-    # Enrich results with question text and correct answers for expert evaluation context
-    full_results = session.results_json.copy()
-    enriched_answers = []
-    
-    for q_id, user_answer in full_results.get("answers", {}).items():
-        q = db.query(main_models.Question).get(int(q_id))
-        if q:
-            correct_choice = db.query(main_models.Choice).filter(
-                main_models.Choice.question_id == q.id,
-                main_models.Choice.is_correct == True
-            ).first()
-            
-            enriched_answers.append({
-                "question_id": q.id,
-                "text": q.text,
-                "topic": q.topic,
-                "user_answer": user_answer,
-                "correct_answer": correct_choice.text if correct_choice else q.explanation, # Use explanation for theory
-                "type": "MCQ" if correct_choice else "Theory"
-            })
-    
-    full_results["detailed_breakdown"] = enriched_answers
-    
+    # Repeated requests (double clicks, re-opened results) share the session's pending or finished analysis
+    job = await db.run_sync(jobs.job_queue.submit_once, current_user.id, session.id, jobs.SIMULATION_ANALYZE)
+    return JSONResponse(status_code=202, content=jobs.serialize_job(job))
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    job = db.query(main_models.GradingJob).get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not permitted to view this job")
+    return jobs.serialize_job(job)
+
+@app.websocket("/ws/jobs/{job_id}")
+async def job_updates(websocket: WebSocket, job_id: int, token: str = None):
+    # /ws/ is outside the /api auth middleware, so the token travels as a query parameter
     try:
-        from agent_core.core.ai import AIEngine
-        analysis = await AIEngine.analyze_exam_result(full_results)
-        return analysis
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        claims = auth_context.auth_cache.verify(token or "")
+    except JWTError:
+        await websocket.close(code=4401)
+        return
+    
+    async with AsyncSessionLocal() as db:
+        job = await db.get(main_models.GradingJob, job_id)
+        # Ends the read transaction so the pooled connection is not held while we wait for pushes
+        await db.commit()
+        if not job or job.user_id != claims.get("user_id"):
+            await websocket.close(code=4404)
+            return
+        
+        await websocket.accept()
+        listener = jobs.job_queue.subscribe(job_id)
+        try:
+            event = jobs.serialize_job(job)
+            await websocket.send_json(event)
+            while event["status"] not in jobs.TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(listener.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    # The job may be running in another app worker; re-read it
+                    event = jobs.serialize_job(await db.get(main_models.GradingJob, job_id, populate_existing=True))
+                    await db.commit()
+                    if event["status"] not in jobs.TERMINAL_STATUSES:
+                        continue
+                await websocket.send_json(event)
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            jobs.job_queue.unsubscribe(job_id, listener)
 
 @app.get("/api/user/expert-feedback/{user_id}")
-def get_user_expert_feedback(user_id: int, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_user_expert_feedback(user_id: int, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Access denied to expert feedback")
     feedback = db.query(main_models.AIFeedback).filter(
@@ -858,7 +863,7 @@ def get_user_expert_feedback(user_id: int, current_user: main_models.User = Depe
 # --- ADMIN ENDPOINTS ---
 
 @app.get("/api/admin/users")
-def get_all_users(db: Session = Depends(get_db), admin: main_models.User = Depends(get_admin)):
+def get_all_users(db: Session = Depends(get_db), admin: auth_context.UserSnapshot = Depends(get_admin)):
     users = db.query(main_models.User).all()
     return [
         {
@@ -871,17 +876,18 @@ def get_all_users(db: Session = Depends(get_db), admin: main_models.User = Depen
     ]
 
 @app.post("/api/admin/user/{user_id}/toggle_admin")
-def toggle_admin(user_id: int, db: Session = Depends(get_db), admin: main_models.User = Depends(get_admin)):
+def toggle_admin(user_id: int, db: Session = Depends(get_db), admin: auth_context.UserSnapshot = Depends(get_admin)):
     user = db.query(main_models.User).get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     # Prevent taking away your own admin rights if there's only one? (Optional)
     user.is_admin = not user.is_admin
     db.commit()
+    auth_context.auth_cache.invalidate_user(user.id)
     return {"id": user.id, "username": user.username, "is_admin": user.is_admin}
 
 @app.get("/api/admin/system_stats")
-def get_system_stats(db: Session = Depends(get_db), admin: main_models.User = Depends(get_admin)):
+def get_system_stats(db: Session = Depends(get_db), admin: auth_context.UserSnapshot = Depends(get_admin)):
     total_users = db.query(main_models.User).count()
     total_sessions = db.query(main_models.ExamSession).count()
     total_exams = db.query(main_models.Exam).count()
@@ -897,7 +903,7 @@ def get_system_stats(db: Session = Depends(get_db), admin: main_models.User = De
     }
 
 @app.get("/api/admin/diagnostics")
-def run_diagnostics(db: Session = Depends(get_db), admin: main_models.User = Depends(get_admin)):
+def run_diagnostics(db: Session = Depends(get_db), admin: auth_context.UserSnapshot = Depends(get_admin)):
     issues = []
     
     # 1. Exams without subjects
@@ -922,16 +928,20 @@ def run_diagnostics(db: Session = Depends(get_db), admin: main_models.User = Dep
         "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     }
 
+@app.get("/api/admin/llm_cache")
+def get_llm_cache_stats(admin: auth_context.UserSnapshot = Depends(get_admin)):
+    return llm_cache.stats()
+
 # --- SUBSCRIPTION ENDPOINTS ---
 
 @app.get("/api/subscription/status")
-def get_subscription_status(current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    # Calculate days left for the best active subscription
+def get_subscription_status(current_user: auth_context.UserSnapshot = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Served from the tier projection on the user (see core/subscriptions.py)
     now = datetime.utcnow()
-    # Find all active subscriptions that haven't expired
-    active_subs = [s for s in current_user.subscriptions if s.is_active and s.expiry_date > now]
+    user = db.query(main_models.User).get(current_user.id)
+    tier = user.current_tier
     
-    if not active_subs:
+    if tier == main_models.SubscriptionTier.FREE:
         return {
             "tier": "FREE",
             "is_premium": False,
@@ -939,16 +949,11 @@ def get_subscription_status(current_user: main_models.User = Depends(get_current
             "days_left": 0
         }
     
-    # Sort to find the highest tier or longest expiry
-    # tier_power: ELITE (2) > PREMIUM (1) > FREE (0)
-    tier_map = {"FREE": 0, "PREMIUM": 1, "ELITE": 2}
-    latest_sub = max(active_subs, key=lambda x: (tier_map.get(x.tier.value, 0), x.expiry_date))
-    
-    days_left = (latest_sub.expiry_date - now).days
+    days_left = (user.tier_expires_at - now).days
     return {
-        "tier": latest_sub.tier.value if hasattr(latest_sub.tier, 'value') else str(latest_sub.tier),
-        "is_premium": latest_sub.tier != main_models.SubscriptionTier.FREE,
-        "expiry_date": latest_sub.expiry_date.strftime("%Y-%m-%d"),
+        "tier": tier.value,
+        "is_premium": True,
+        "expiry_date": user.tier_expires_at.strftime("%Y-%m-%d"),
         "days_left": max(0, days_left)
     }
 
@@ -958,7 +963,7 @@ class PurchasePayload(BaseModel):
     duration: int = 30 # days
 
 @app.post("/api/subscription/purchase")
-async def purchase_subscription(payload: PurchasePayload, current_user: main_models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def purchase_subscription(payload: PurchasePayload, current_user: auth_context.UserSnapshot = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     try:
         tier_str = payload.tier.upper()
         # Handle cases where tier might be transmitted as "PREMIUM PLAN" etc
@@ -1007,9 +1012,10 @@ async def purchase_subscription(payload: PurchasePayload, current_user: main_mod
         is_active=True,
         transaction_id=payload.reference
     )
-    db.add(new_sub)
-    db.commit()
-    db.refresh(new_sub)
+    await db.run_sync(subscriptions.record_purchase, current_user.id, new_sub)
+    await db.commit()
+    await db.refresh(new_sub)
+    auth_context.auth_cache.invalidate_user(current_user.id)
     
     return {
         "message": f"Successfully upgraded to {tier_enum.value}!",
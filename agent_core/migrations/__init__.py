@@ -0,0 +1,145 @@
+"""
+Schema Migrations
+=================
+Versioned, run-once schema changes. Replaces the old import-time
+safe_migrate(): the app no longer issues any DDL when it is imported, and
+nothing at boot depends on how many tables there are.
+
+Migrations live in agent_core/migrations/versions/ as vNNNN_<name>.py modules,
+each exposing upgrade(conn). Applied versions are recorded in the
+schema_version table. The runner holds a lock for the whole run so that
+several deploy hooks or replicas starting together never apply DDL
+concurrently:
+  - PostgreSQL: session advisory lock (pg_advisory_lock)
+  - SQLite:     every migration runs in its own BEGIN IMMEDIATE transaction
+                and re-checks schema_version after taking the write lock
+
+The baseline (v0001) builds fresh databases from the current models, so
+later migrations must go through the existence-checking helpers in ops.py.
+
+Run as a deploy step (the Docker image does this before starting uvicorn):
+    python -m agent_core.migrations            # apply pending migrations
+    python -m agent_core.migrations --status   # list applied / pending versions
+"""
+
+import importlib
+import os
+import pkgutil
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.engine import Connection, Engine
+
+MIGRATION_LOCK_ID = int(os.getenv("MIGRATION_LOCK_ID", "72010017"))
+MIGRATION_LOCK_TIMEOUT_SECONDS = int(os.getenv("MIGRATION_LOCK_TIMEOUT_SECONDS", "300"))
+
+Migration = namedtuple("Migration", ["version", "name", "upgrade"])
+
+# Kept out of Base.metadata so model-level create_all/drop_all never touch it
+version_metadata = MetaData()
+version_table = Table(
+    "schema_version", version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+_VERSION_MODULE = re.compile(r"^v(\d{4})_(\w+)$")
+
+
+def discover() -> List[Migration]:
+    """All migrations in versions/, in version order."""
+    from agent_core.migrations import versions
+    found = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        match = _VERSION_MODULE.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        found.append(Migration(int(match.group(1)), match.group(2), module.upgrade))
+    found.sort(key=lambda m: m.version)
+    versions_seen = [m.version for m in found]
+    if len(versions_seen) != len(set(versions_seen)):
+        raise RuntimeError(f"Duplicate migration versions in {versions.__path__}")
+    return found
+
+
+def applied_versions(conn: Connection) -> set:
+    if not conn.dialect.has_table(conn, version_table.name):
+        return set()
+    return set(conn.execute(select(version_table.c.version)).scalars())
+
+
+def pending(engine: Engine) -> List[Migration]:
+    """Migrations not yet applied. One SELECT; cheap enough for a startup check."""
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    return [m for m in discover() if m.version not in done]
+
+
+@contextmanager
+def _migration_lock(conn: Connection):
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT_SECONDS}s'")
+        conn.exec_driver_sql(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
+        conn.commit()
+        try:
+            yield
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+            conn.commit()
+    elif conn.dialect.name == "sqlite":
+        # Waits for a concurrent runner's write transaction instead of failing with "database is locked"
+        previous = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT_SECONDS * 1000}")
+        conn.commit()
+        try:
+            yield
+        finally:
+            # The connection goes back to the app's pool afterwards
+            conn.rollback()
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {previous}")
+            conn.commit()
+    else:
+        print(f"MIGRATE WARNING: No migration lock for dialect '{conn.dialect.name}'; run a single migrator at a time")
+        yield
+
+
+def _begin(conn: Connection):
+    """Starts the transaction a migration runs in (takes SQLite's write lock up front)."""
+    conn.commit()
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def migrate(engine: Engine) -> int:
+    """Applies every pending migration, each in its own transaction. Returns how many were applied."""
+    applied = 0
+    with engine.connect() as conn, _migration_lock(conn):
+        _begin(conn)
+        version_metadata.create_all(bind=conn)
+        conn.commit()
+
+        for migration in discover():
+            _begin(conn)
+            # Re-checked under the lock: a concurrent runner may have applied it meanwhile
+            if migration.version in applied_versions(conn):
+                conn.rollback()
+                continue
+            print(f"MIGRATE: Applying {migration.version:04d}_{migration.name}")
+            try:
+                migration.upgrade(conn)
+                conn.execute(version_table.insert().values(
+                    version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                ))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied += 1
+    return applied
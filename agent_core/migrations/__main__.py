@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agent_core.database import engine
+from agent_core import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reharz schema migrations")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations without applying them")
+    args = parser.parse_args()
+
+    if args.status:
+        with engine.connect() as conn:
+            done = migrations.applied_versions(conn)
+        for migration in migrations.discover():
+            state = "applied" if migration.version in done else "pending"
+            print(f"  {migration.version:04d}_{migration.name}: {state}")
+        return
+
+    try:
+        applied = migrations.migrate(engine)
+    except Exception as e:
+        print(f"MIGRATE ERROR: {e}")
+        sys.exit(1)
+    print(f"MIGRATE: {applied} migration(s) applied; schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
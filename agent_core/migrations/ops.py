@@ -0,0 +1,53 @@
+"""
+Migration helpers. Each checks the live schema first, so a migration can be
+applied to databases that were previously kept in shape by safe_migrate()
+as well as to fresh ones.
+"""
+
+from sqlalchemy import Table, inspect, text
+from sqlalchemy.engine import Connection
+
+
+def create_table(conn: Connection, table: Table):
+    """Creates a table with its indexes if it does not exist yet."""
+    table.create(bind=conn, checkfirst=True)
+
+
+def add_missing_columns(conn: Connection, table: Table):
+    """Adds columns declared on the model that the existing table lacks."""
+    existing_cols = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    for col in table.columns:
+        if col.name in existing_cols:
+            continue
+        sql_type = col.type.compile(dialect=conn.dialect)
+        default = ""
+        if col.default is not None and hasattr(col.default, "arg"):
+            arg = col.default.arg
+            if isinstance(arg, bool):
+                default = f" DEFAULT {'TRUE' if arg else 'FALSE'}"
+            elif isinstance(arg, (int, float)):
+                default = f" DEFAULT {arg}"
+            elif isinstance(arg, str):
+                default = f" DEFAULT '{arg}'"
+        elif col.nullable is False and sql_type == "BOOLEAN":
+            default = " DEFAULT FALSE"
+        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{col.name}" {sql_type}{default}'))
+        print(f"MIGRATE: Added column '{col.name}' to table '{table.name}'")
+
+
+def create_missing_indexes(conn: Connection, table: Table):
+    """Creates indexes declared on the model that the existing table lacks."""
+    existing_indexes = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in existing_indexes:
+            index.create(bind=conn)
+            print(f"MIGRATE: Created index '{index.name}' on table '{table.name}'")
+
+
+def sync_table(conn: Connection, table: Table):
+    """Brings one table in line with its model: creates it, or adds its missing columns and indexes."""
+    if not inspect(conn).has_table(table.name):
+        create_table(conn, table)
+        return
+    add_missing_columns(conn, table)
+    create_missing_indexes(conn, table)
@@ -0,0 +1,16 @@
+"""
+Baseline: the schema as of the switch to versioned migrations.
+
+Fresh databases get every table. Databases that were maintained by the old
+import-time safe_migrate() get whatever columns and indexes they are still
+missing (tier projection, topic stats rollup, hot-path indexes).
+"""
+
+from agent_core.database import Base
+from agent_core.migrations import ops
+from agent_core.models import main_models  # noqa: F401  (registers the tables on Base.metadata)
+
+
+def upgrade(conn):
+    for table in Base.metadata.sorted_tables:
+        ops.sync_table(conn, table)
@@ -0,0 +1,11 @@
+"""
+Import manifest: per-file content hashes and produced question ids, used by
+scripts/import_data.py to skip unchanged data files and replace changed ones.
+"""
+
+from agent_core.migrations import ops
+from agent_core.models.main_models import ImportManifest
+
+
+def upgrade(conn):
+    ops.create_table(conn, ImportManifest.__table__)
@@ -0,0 +1,19 @@
+"""
+Catalogue generation: one counter row that the data import and generated
+content bump, used by core/catalogue_cache.py to invalidate cached
+/api/exams, /api/exams/{id}/subjects and /api/categories responses.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from agent_core.migrations import ops
+from agent_core.models.main_models import CatalogueGeneration
+
+
+def upgrade(conn):
+    table = CatalogueGeneration.__table__
+    ops.create_table(conn, table)
+    if conn.execute(select(table.c.id).where(table.c.id == 1)).first() is None:
+        conn.execute(table.insert().values(id=1, generation=0, updated_at=datetime.utcnow()))
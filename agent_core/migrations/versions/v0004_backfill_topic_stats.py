@@ -0,0 +1,12 @@
+"""
+Topic stats backfill: fills user_topic_stats from the existing user_progress
+history. The rollup is only maintained for attempts logged since it was
+added, so without this, users with older history would have no rollup rows
+(e.g. "No performance history" in weakness analysis) after deploying it.
+"""
+
+from agent_core.core import topic_stats
+
+
+def upgrade(conn):
+    topic_stats.rebuild(conn)
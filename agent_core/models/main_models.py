@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Float, Boolean, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Float, Boolean, UniqueConstraint, Index, Enum as SQLEnum
+from sqlalchemy.orm import object_session, relationship
 from datetime import datetime
 import enum
 from agent_core.database import Base
@@ -35,6 +35,10 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Projection of the best active subscription, maintained by core/subscriptions.py
+    # (stored as VARCHAR so a migration can add it to existing databases with a plain ALTER TABLE)
+    effective_tier = Column(SQLEnum(SubscriptionTier, native_enum=False), nullable=True)
+    tier_expires_at = Column(DateTime, nullable=True, index=True)
     
     sessions = relationship("ExamSession", back_populates="user")
     ai_analysis = relationship("ExpertAnalysis", back_populates="user")
@@ -42,10 +46,17 @@ class User(Base):
 
     @property
     def current_tier(self):
-        # Logic to find latest active subscription
-        for sub in sorted(self.subscriptions, key=lambda x: x.start_date, reverse=True):
-            if sub.expiry_date > datetime.utcnow() and sub.is_active:
-                return sub.tier
+        # O(1): reads the projection. Once the projected tier lapses, it is re-resolved here from
+        # the user's other subscriptions (not committed; the sweeper stores it), so a lapsed top
+        # subscription does not read as FREE while another paid one is still active.
+        now = datetime.utcnow()
+        if self.tier_expires_at and self.tier_expires_at <= now:
+            db = object_session(self)
+            if db is not None:
+                from agent_core.core.subscriptions import refresh_user_tier
+                refresh_user_tier(db, self, now)
+        if self.effective_tier and self.tier_expires_at and self.tier_expires_at > now:
+            return self.effective_tier
         return SubscriptionTier.FREE
 
 class Exam(Base):
@@ -65,15 +76,24 @@ class Subject(Base):
     __tablename__ = "subjects"
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    exam_id = Column(Integer, ForeignKey("exams.id"))
+    exam_id = Column(Integer, ForeignKey("exams.id"), index=True)
     
     exam = relationship("Exam", back_populates="subjects")
     questions = relationship("Question", back_populates="subject")
     papers = relationship("QuestionPaper", back_populates="subject")
 
+class SubjectProfile(Base):
+    """Stored expert profile of a subject, valid while its content fingerprint is unchanged."""
+    __tablename__ = "subject_profiles"
+    subject_id = Column(Integer, ForeignKey("subjects.id"), primary_key=True)
+    fingerprint = Column(String)
+    profile = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class QuestionPaper(Base):
     """Represents a specific year's paper (e.g., 2022 Mathematics Paper 1)."""
     __tablename__ = "question_papers"
+    __table_args__ = (Index("ix_question_papers_subject_year_paper", "subject_id", "year", "paper_number"),)
     id = Column(Integer, primary_key=True)
     subject_id = Column(Integer, ForeignKey("subjects.id"))
     year = Column(Integer)
@@ -97,6 +117,8 @@ class QuestionContext(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    # Also serves subject_id-only filters (leftmost prefix)
+    __table_args__ = (Index("ix_questions_subject_year", "subject_id", "year"),)
     id = Column(Integer, primary_key=True)
     subject_id = Column(Integer, ForeignKey("subjects.id"))
     paper_id = Column(Integer, ForeignKey("question_papers.id"), nullable=True)
@@ -119,7 +141,7 @@ class Question(Base):
 class Choice(Base):
     __tablename__ = "choices"
     id = Column(Integer, primary_key=True)
-    question_id = Column(Integer, ForeignKey("questions.id"))
+    question_id = Column(Integer, ForeignKey("questions.id"), index=True)
     label = Column(String) # "A", "B", "C", "D"
     text = Column(String, nullable=False)
     image_url = Column(String) # Some choices are images
@@ -127,8 +149,36 @@ class Choice(Base):
     
     question = relationship("Question", back_populates="choices")
 
+class ExamBlueprint(Base):
+    """Precomputed question-id pools per paper and section kind ("mcq" / "theory")."""
+    __tablename__ = "exam_blueprints"
+    __table_args__ = (UniqueConstraint("subject_id", "year", "section_kind"),)
+    id = Column(Integer, primary_key=True)
+    subject_id = Column(Integer, ForeignKey("subjects.id"), index=True)
+    year = Column(Integer, nullable=True)
+    section_kind = Column(String)
+    question_ids = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class ImportManifest(Base):
+    """What the data import last took from each data/ file, so unchanged files can be skipped."""
+    __tablename__ = "import_manifest"
+    path = Column(String, primary_key=True)  # relative to the project root, "/"-separated
+    content_hash = Column(String, nullable=False)
+    parser_version = Column(Integer, nullable=False)
+    question_ids = Column(JSON)  # questions this file contained on its last import (shared ones included)
+    imported_at = Column(DateTime, default=datetime.utcnow)
+
+class CatalogueGeneration(Base):
+    """Single row (id=1) counting catalogue changes: bumped whenever exams, subjects or questions change."""
+    __tablename__ = "catalogue_generation"
+    id = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class ExamSession(Base):
     __tablename__ = "exam_sessions"
+    __table_args__ = (Index("ix_exam_sessions_user_start", "user_id", "start_time"),)
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     exam_id = Column(Integer, ForeignKey("exams.id"))
@@ -140,6 +190,21 @@ class ExamSession(Base):
     user = relationship("User", back_populates="sessions")
     exam = relationship("Exam", back_populates="sessions")
 
+class GradingJob(Base):
+    """Background grading work (simulation submit / analysis) polled by the client."""
+    __tablename__ = "grading_jobs"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    session_id = Column(Integer, ForeignKey("exam_sessions.id"))
+    kind = Column(String)  # "simulation_submit", "simulation_analyze"
+    status = Column(String, default="queued")  # queued, running, done, failed
+    payload = Column(JSON)
+    result = Column(JSON)
+    error = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
 class ExpertAnalysis(Base):
     __tablename__ = "expert_analysis"
     id = Column(Integer, primary_key=True)
@@ -151,8 +216,21 @@ class ExpertAnalysis(Base):
     
     user = relationship("User", back_populates="ai_analysis")
 
+class LLMCacheEntry(Base):
+    """Persistent tier of the ExpertEngine response cache (keyed by hash of method, model and prompt)."""
+    __tablename__ = "llm_cache"
+    key = Column(String, primary_key=True)
+    method = Column(String)
+    model = Column(String)
+    response = Column(JSON)
+    size_bytes = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (Index("ix_user_progress_user_attempt", "user_id", "attempt_date"),)
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     question_id = Column(Integer, ForeignKey("questions.id"))
@@ -164,8 +242,22 @@ class UserProgress(Base):
     user = relationship("User")
     question = relationship("Question")
 
+class UserTopicStat(Base):
+    """Rollup of UserProgress per (user, subject, topic), maintained by core/topic_stats.py."""
+    __tablename__ = "user_topic_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    subject_id = Column(Integer, primary_key=True)  # 0 when the question is unknown
+    topic = Column(String, primary_key=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    correct = Column(Integer, default=0, nullable=False)
+    easy_attempts = Column(Integer, default=0, nullable=False)
+    medium_attempts = Column(Integer, default=0, nullable=False)
+    hard_attempts = Column(Integer, default=0, nullable=False)
+    last_seen = Column(DateTime)
+
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (Index("ix_subscriptions_user_expiry", "user_id", "expiry_date"),)
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     tier = Column(SQLEnum(SubscriptionTier), default=SubscriptionTier.FREE)
@@ -1,7 +1,11 @@
 """
 Build WAEC Catalogue
-Scans all WAEC .md files in data/, parses questions, and outputs
-data/waec_catalogue.json for the API to serve.
+Looks up all WAEC .md files in the data/ corpus index, parses questions, and outputs
+for the API to serve (see core/waec_catalogue.py):
+  - data/waec_catalogue/index.json: subjects with their years and question counts
+  - data/waec_catalogue/<subject-slug>/<year>.json: one shard per paper
+  - data/waec_catalogue.json: the whole catalogue in one file, for the legacy /api/waec
+Files are replaced atomically, so a running API never serves a half-written one.
 """
 
 import os
@@ -9,6 +13,12 @@ import json
 import re
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from agent_core.core import waec_catalogue
+from agent_core.core.corpus_index import CorpusIndex
+from agent_core.core.question_markdown import QuestionTokenizer
+
 # Canonical WAEC data directory (deduplicated — use Academic/Secondary/WAEC as the source of truth)
 WAEC_DIRS = [
     os.path.join("data", "Academic", "Secondary", "WAEC"),
@@ -17,7 +27,8 @@ WAEC_DIRS = [
     os.path.join("data", "Academics", "NECO"),
 ]
 
-OUTPUT_FILE = os.path.join("data", "waec_catalogue.json")
+OUTPUT_FILE = waec_catalogue.LEGACY_FILE
+OUTPUT_DIR = waec_catalogue.CATALOGUE_DIR
 
 
 def extract_year_subject(filename):
@@ -36,91 +47,84 @@ def parse_questions_from_md(filepath):
     """Parse MCQ questions from markdown file."""
     questions = []
     with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-        content = f.read()
+        for question in QuestionTokenizer(f):
+            if question.answerable:
+                questions.append({
+                    "number": question.number,
+                    "text": question.text,
+                    "choices": dict(question.choice_items()),
+                    "answer": question.answer,
+                    "explanation": question.explanation or "",
+                })
 
-    # Split on question numbers: **1.** **2.** etc.
-    blocks = re.split(r"\n\*\*(\d+)\.\*\*", content)
+    return questions
 
-    for i in range(1, len(blocks), 2):
-        q_num = int(blocks[i])
-        body = blocks[i + 1].strip() if i + 1 < len(blocks) else ""
 
-        lines = [l.strip() for l in body.split("\n") if l.strip()]
-        if not lines:
-            continue
+def write_json(path, data, **dump_options):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, **dump_options)
+    os.replace(tmp_path, path)
 
-        # First line is question text
-        q_text = re.sub(r"^\*\*|\*\*$", "", lines[0]).strip()
-
-        choices = {}
-        answer = None
-        explanation = ""
-
-        for line in lines[1:]:
-            # Choice lines: A) ... or A) ...
-            choice_match = re.match(r"^([A-Da-d])\)\s+(.+)", line)
-            if choice_match:
-                choices[choice_match.group(1).upper()] = choice_match.group(2).strip()
-                continue
-
-            # Answer line: **Answer: B** or Answer: B
-            ans_match = re.search(r"\*?Answer:\s*([A-Da-d])\*?", line, re.IGNORECASE)
-            if ans_match:
-                answer = ans_match.group(1).upper()
-                continue
-
-            # Explanation line: *Explanation: ...*
-            exp_match = re.match(r"\*?Explanation:\s*(.+?)\*?$", line, re.IGNORECASE)
-            if exp_match:
-                explanation = exp_match.group(1).strip()
-
-        if q_text and choices and answer:
-            questions.append({
-                "number": q_num,
-                "text": q_text,
-                "choices": choices,
-                "answer": answer,
-                "explanation": explanation,
-            })
 
-    return questions
+def write_shards(sorted_catalogue, summary):
+    """Writes the index and one compact shard per subject/year; removes shards of papers no longer present."""
+    written = {waec_catalogue.index_path(OUTPUT_DIR)}
+    for subject, years in sorted_catalogue.items():
+        for year, paper in years.items():
+            path = waec_catalogue.shard_path(subject, year, OUTPUT_DIR)
+            write_json(path, paper, separators=(",", ":"))
+            written.add(path)
+    write_json(waec_catalogue.index_path(OUTPUT_DIR), {"subjects": summary}, separators=(",", ":"))
+
+    for root, dirs, files in os.walk(OUTPUT_DIR, topdown=False):
+        for file in files:
+            path = os.path.join(root, file)
+            if path not in written:
+                os.remove(path)
+        if root != OUTPUT_DIR and not os.listdir(root):
+            os.rmdir(root)
 
 
 def build_catalogue():
     catalogue = {}  # { subject: { year: [questions] } }
     seen_files = set()  # Avoid duplicating same file from multiple dirs
 
-    for root_dir in WAEC_DIRS:
-        if not os.path.exists(root_dir):
+    index = CorpusIndex(data_root=os.path.abspath("data")).refresh(force=True)
+    dir_prefixes = [os.path.relpath(d, "data").replace(os.sep, "/") + "/" for d in WAEC_DIRS]
+
+    def dir_rank(entry):
+        return next((i for i, prefix in enumerate(dir_prefixes) if entry["path"].startswith(prefix)), None)
+
+    candidates = [e for e in index.lookup(exam="WAEC", fmt="md") if dir_rank(e) is not None]
+    for entry in sorted(candidates, key=lambda e: (dir_rank(e), e["path"])):
+        fname = os.path.basename(entry["path"])
+        if not fname.startswith("WAEC_"):
+            continue
+
+        # Deduplicate by filename
+        if fname in seen_files:
+            continue
+        seen_files.add(fname)
+
+        subject, year = extract_year_subject(fname)
+        if not subject or not year:
             continue
-        for dirpath, _, filenames in os.walk(root_dir):
-            for fname in sorted(filenames):
-                if not fname.startswith("WAEC_") or not fname.endswith(".md"):
-                    continue
-
-                full_path = os.path.join(dirpath, fname)
-                # Deduplicate by filename
-                if fname in seen_files:
-                    continue
-                seen_files.add(fname)
-
-                subject, year = extract_year_subject(fname)
-                if not subject or not year:
-                    continue
-
-                questions = parse_questions_from_md(full_path)
-                if not questions:
-                    # Still include file as empty slot
-                    questions = []
-
-                if subject not in catalogue:
-                    catalogue[subject] = {}
-                catalogue[subject][str(year)] = {
-                    "year": year,
-                    "subject": subject,
-                    "question_count": len(questions),
-                    "questions": questions,
-                }
+
+        questions = parse_questions_from_md(index.abspath(entry))
+        if not questions:
+            # Still include file as empty slot
+            questions = []
+
+        if subject not in catalogue:
+            catalogue[subject] = {}
+        catalogue[subject][str(year)] = {
+            "year": year,
+            "subject": subject,
+            "question_count": len(questions),
+            "questions": questions,
+        }
 
     # Sort subjects and years
     sorted_catalogue = {}
@@ -135,6 +139,7 @@ def build_catalogue():
         total_q = sum(y["question_count"] for y in years.values())
         summary.append({
             "subject": subject,
+            "slug": waec_catalogue.slugify(subject),
             "years": sorted([int(y) for y in years.keys()]),
             "total_questions": total_q,
         })
@@ -144,11 +149,10 @@ def build_catalogue():
         "data": sorted_catalogue,
     }
 
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    write_json(OUTPUT_FILE, output, indent=2)
+    write_shards(sorted_catalogue, summary)
 
-    print(f"[OK] WAEC catalogue built: {OUTPUT_FILE}")
+    print(f"[OK] WAEC catalogue built: {OUTPUT_DIR} (+ {OUTPUT_FILE})")
     print(f"   Subjects: {len(sorted_catalogue)}")
     for s in summary:
         print(f"   - {s['subject']}: {len(s['years'])} years, {s['total_questions']} questions")
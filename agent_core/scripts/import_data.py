@@ -9,22 +9,53 @@ Supports:
          B) Option B
          **Answer: A**
 
+Each file is parsed into a column-wise batch (ParsedFile) without touching the
+database; a single BulkWriter then dedupes and inserts every batch set-based
+and commits the whole run at once (see BulkWriter).
+
+Parsing is CPU-bound, so it runs in a pool of IMPORT_WORKERS processes. Parsed
+files reach the writer through a bounded queue (IMPORT_QUEUE_SIZE), in file
+order, so imports are deterministic and memory stays flat. A file that fails
+to parse is reported and skipped; it does not stop the run.
+
+Runs are incremental. The import_manifest table records, per data/ file, its
+content hash, the PARSER_VERSION that read it and the question ids it contains:
+  - unchanged files are not parsed at all
+  - a new or changed file replaces the questions it produced last time
+  - a deleted file takes its questions with it
+A question found in several files is inserted once and claimed by each of them;
+it is only removed once no remaining file claims it.
+Questions that user history points at are never deleted; if the new version of
+the file still has them they are kept and re-attributed to it. Questions already
+in the database without a manifest entry (imports from before the manifest) are
+adopted by the first file that contains them instead of being inserted twice.
+
 Run with:
-  python agent_core/scripts/import_data.py             # import everything
-  python agent_core/scripts/import_data.py --changed   # only git-changed files in data/
+  python agent_core/scripts/import_data.py             # sync data/ (new, changed and deleted files)
+  python agent_core/scripts/import_data.py --rebuild-blueprints   # backfill exam blueprints
 """
 
+import hashlib
 import json
 import os
+import queue
 import re
 import sys
 import argparse
 import io
+import threading
+import time
+from datetime import datetime
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 # Ensure UTF-8 output on Windows
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+from sqlalchemy import delete, func, insert, select
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
@@ -34,13 +65,24 @@ sys.path.insert(0, project_root)
 
 load_dotenv(os.path.join(project_root, ".env"))
 
-from agent_core.database import SessionLocal, engine, Base
+from agent_core.database import Base, SessionLocal, engine
+from agent_core import migrations
 from agent_core.models.main_models import (
-    Exam, Subject, Question, Choice, QuestionPaper, QuestionContext,
+    Exam, Subject, Question, Choice, QuestionPaper, QuestionContext, ImportManifest,
     ExamCategory, DifficultyLevel, SubscriptionTier
 )
+from agent_core.core.blueprints import rebuild_blueprints, rebuild_all_blueprints
+from agent_core.core.catalogue_cache import bump_generation
+from agent_core.core.corpus_index import GENERATED_DIRS, file_hash
+from agent_core.core.question_markdown import QuestionTokenizer
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", str(os.cpu_count() or 1)))
+IMPORT_QUEUE_SIZE = int(os.getenv("IMPORT_QUEUE_SIZE", "16"))
 
-Base.metadata.create_all(bind=engine)
+# Bump when a parser change should re-import files whose content did not change
+# (3: manifest entries also claim the duplicates a file shares with other files)
+PARSER_VERSION = 3
 
 # ─── Category Mapping ────────────────────────────────────────────────────────
 EXAM_MAP = {
@@ -100,8 +142,7 @@ def get_or_create_exam(db: Session, exam_name: str, file_path: str, sub_category
             price=price
         )
         db.add(exam)
-        db.commit()
-        db.refresh(exam)
+        db.flush()
         cat_val = exam.category.value if exam.category else "None"
         print(f"  [+] Created Exam: {exam.name} ({cat_val})")
     else:
@@ -122,8 +163,7 @@ def get_or_create_exam(db: Session, exam_name: str, file_path: str, sub_category
             exam.required_tier = tier
             exam.price = price
 
-        db.commit()
-        db.refresh(exam)
+        db.flush()
             
     return exam
 
@@ -135,116 +175,109 @@ def get_or_create_subject(db: Session, subject_name: str, exam_id: int) -> Subje
     if not subject:
         subject = Subject(name=subject_name, exam_id=exam_id)
         db.add(subject)
-        db.commit()
-        db.refresh(subject)
+        db.flush()
         print(f"  [+] Created Subject: {subject_name}")
     return subject
 
-# ─── JSON Importer ───────────────────────────────────────────────────────────
-def import_json_file(file_path: str, db: Session):
+# ─── Parsed Batches ──────────────────────────────────────────────────────────
+class SkipFile(Exception):
+    """Raised by a parser when a file has nothing importable; the message says why."""
+
+
+@dataclass
+class ParsedFile:
+    """
+    One source file, parsed and normalised, with no database access.
+    Question fields are stored column-wise (one list per field, same length);
+    choices[i] is a list of (label, text, image_url, is_correct) tuples.
+    """
+    file_path: str
+    exam_name: str
+    subject_name: str
+    year: Optional[int]
+    sub_category: Optional[str] = None
+    term: str = "Standard"
+    paper_number: str = "1"
+    instructions: Optional[str] = None
+    match_paper_number: bool = False  # JSON papers are keyed by number too; markdown/ALOC by (subject, year)
+    dedupe: bool = True               # ALOC items are all kept (sections and images make text matches unreliable)
+    numbers: List[Optional[int]] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    sections: List[Optional[str]] = field(default_factory=list)
+    topics: List[Optional[str]] = field(default_factory=list)
+    difficulties: List[DifficultyLevel] = field(default_factory=list)
+    explanations: List[Optional[str]] = field(default_factory=list)
+    contexts: List[Optional[dict]] = field(default_factory=list)
+    choices: List[List[Tuple]] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)  # source questions left out, with why (see report_skipped)
+
+    def add(self, number, text, section=None, topic=None, difficulty=DifficultyLevel.MEDIUM,
+            explanation=None, context=None, choices=()):
+        self.numbers.append(number)
+        self.texts.append(text)
+        self.sections.append(section)
+        self.topics.append(topic)
+        self.difficulties.append(difficulty)
+        self.explanations.append(explanation)
+        self.contexts.append(context)
+        self.choices.append(list(choices))
+
+    def __len__(self):
+        return len(self.texts)
+
+
+def normalize_question_text(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+def question_hash(text: str) -> bytes:
+    """Dedupe key: case- and whitespace-insensitive digest of the question text."""
+    return hashlib.blake2b(normalize_question_text(text).encode("utf-8"), digest_size=16).digest()
+
+# ─── JSON Parser ─────────────────────────────────────────────────────────────
+def parse_json_file(file_path: str) -> ParsedFile:
     with open(file_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
 
     exam_name = data.get("exam_name", "").upper()
     subject_name = data.get("subject_name")
     year = data.get("year")
-    questions_list = data.get("questions", [])
 
     if not all([exam_name, subject_name, year]):
-        print(f"  ⚠ Skipping {file_path}: Missing exam_name/subject_name/year.")
-        return 0, 0
-
-    exam = get_or_create_exam(db, exam_name, file_path, data.get("sub_category"))
-    subject = get_or_create_subject(db, subject_name, exam.id)
-
-    term = data.get("term", "Standard")
-    paper_number = str(data.get("paper_number", "1"))
-    paper = db.query(QuestionPaper).filter(
-        QuestionPaper.subject_id == subject.id,
-        QuestionPaper.year == year,
-        QuestionPaper.paper_number == paper_number
-    ).first()
-    if not paper:
-        paper = QuestionPaper(
-            subject_id=subject.id, year=year, term=term,
-            paper_number=paper_number, instructions=data.get("instructions")
-        )
-        db.add(paper)
-        db.commit()
-        db.refresh(paper)
-
-    added, skipped = 0, 0
-    for q_data in questions_list:
-        existing = db.query(Question).filter(
-            Question.text == q_data['text'],
-            Question.subject_id == subject.id
-        ).first()
-        if existing:
-            skipped += 1
-            continue
-
-        context_id = None
-        if q_data.get('context'):
-            ctx_data = q_data['context']
-            ctx = db.query(QuestionContext).filter(QuestionContext.content == ctx_data.get('content')).first()
-            if not ctx:
-                ctx = QuestionContext(
-                    title=ctx_data.get('title'),
-                    content=ctx_data.get('content'),
-                    image_url=ctx_data.get('image_url')
-                )
-                db.add(ctx)
-                db.commit()
-                db.refresh(ctx)
-            context_id = ctx.id
+        raise SkipFile("Missing exam_name/subject_name/year.")
 
+    parsed = ParsedFile(
+        file_path=file_path, exam_name=exam_name, subject_name=subject_name, year=year,
+        sub_category=data.get("sub_category"), term=data.get("term", "Standard"),
+        paper_number=str(data.get("paper_number", "1")), instructions=data.get("instructions"),
+        match_paper_number=True
+    )
+    for q_data in data.get("questions", []):
         diff_raw = q_data.get('difficulty', 'MEDIUM').upper()
-        difficulty = DIFFICULTY_MAP.get(diff_raw, DifficultyLevel.MEDIUM)
-
-        new_q = Question(
-            subject_id=subject.id, paper_id=paper.id,
-            context_id=context_id,
-            question_num=q_data.get('number'),
-            section=q_data.get('section'),
+        parsed.add(
+            number=q_data.get('number'),
             text=q_data['text'],
+            section=q_data.get('section'),
             topic=q_data.get('topic'),
-            difficulty=difficulty,
+            difficulty=DIFFICULTY_MAP.get(diff_raw, DifficultyLevel.MEDIUM),
             explanation=q_data.get('explanation'),
-            year=year, is_ai_generated=False
+            context=q_data.get('context') or None,
+            choices=[(c.get('label'), c['text'], c.get('image_url'), c['is_correct']) for c in q_data.get('choices', [])]
         )
-        db.add(new_q)
-        db.flush()
-
-        for choice_data in q_data.get('choices', []):
-            choice = Choice(
-                question_id=new_q.id,
-                label=choice_data.get('label'),
-                text=choice_data['text'],
-                image_url=choice_data.get('image_url'),
-                is_correct=choice_data['is_correct']
-            )
-            db.add(choice)
-        added += 1
-
-    db.commit()
-    return added, skipped
+    return parsed
 
-# ─── Markdown Importer ───────────────────────────────────────────────────────
+# ─── Markdown Parser ─────────────────────────────────────────────────────────
 def parse_markdown_file(file_path: str) -> dict | None:
     """
-    Parses markdown files in this format:
+    Parses markdown files in this format (see core/question_markdown.py):
     # Exam Subject (Year)
     **1.** Question text
        A) Choice A
        B) Choice B
        **Answer: A**
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
     # Derive metadata from filename and path.  e.g: NDA_Past_Questions_2023.md
     filename = os.path.basename(file_path)
-    parts = filename.replace('.md', '').split('_')
 
     # Extract year from filename
     year_match = re.search(r'(\d{4})', filename)
@@ -254,70 +287,43 @@ def parse_markdown_file(file_path: str) -> dict | None:
     folder = os.path.basename(os.path.dirname(file_path))  # e.g. NDA, POLAC, PCN_PEP
     exam_name = folder.replace('_', ' ').split()[0]  # e.g. NDA, POLAC, PCN
 
-    # Subject from folder name or heading
-    heading_match = re.search(r'^#\s+(.+)', content, re.MULTILINE)
-    subject_name = heading_match.group(1).strip() if heading_match else folder
-
-    # Remove year from subject name if present
-    subject_name = re.sub(r'\s*\([^)]*\)$', '', subject_name).strip()
-
-    # Parse questions
-    # Pattern: (**)?N.(**)? question text ... A) ... (**)?Answer: X(**)?
-    question_blocks = re.split(r'\n(?=\**\d+\.\**)', content)
     questions = []
+    skipped = []  # "Q<number>: <reason>" for questions that cannot be imported as MCQs
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tokens = QuestionTokenizer(f)
+        for question in tokens:
+            problem = question.problem
+            if problem:
+                skipped.append(f"Q{question.number}: {problem}")
+                continue
+            questions.append({
+                "number": question.number,
+                "text": question.text,
+                "choices": [
+                    {"label": label, "text": choice_text, "is_correct": label == question.answer}
+                    for label, choice_text in question.choice_items()
+                ],
+                "topic": None,
+                "difficulty": "MEDIUM",
+                "explanation": None
+            })
 
-    for block in question_blocks:
-        # Get question number and text - supports both **N.** and N.
-        q_match = re.match(r'(?:\*\*|)(\d+)\.(?:\*\*|)\s+(.+?)(?=\n\s*[A-D]\))', block, re.DOTALL)
-        if not q_match:
-            continue
-
-        q_num = int(q_match.group(1))
-        q_text = q_match.group(2).strip().replace('\n', ' ')
-
-        # Get choices - patterns like "A) text" or "A. text"
-        choices_raw = re.findall(r'([A-E])[)\.]\s+(.+?)(?=\n\s*[A-E][).]|(?:\*\*|)Answer|(?:\*\*|)Explanation|\Z)', block, re.DOTALL)
-
-        # Get correct answer - supports both **Answer: X** and Answer: X
-        answer_match = re.search(r'(?:\*\*|)Answer:\s*([A-E])(?:\*\*|)', block)
-        correct_label = answer_match.group(1).strip() if answer_match else None
-
-        if not choices_raw or not correct_label:
-            continue
-
-        choices = [
-            {
-                "label": c[0].strip(),
-                "text": c[1].strip().replace('\n', ' '),
-                "is_correct": c[0].strip() == correct_label
-            }
-            for c in choices_raw
-        ]
-
-        questions.append({
-            "number": q_num,
-            "text": q_text,
-            "choices": choices,
-            "topic": None,
-            "difficulty": "MEDIUM",
-            "explanation": None
-        })
+    # Subject from heading or folder name, without a trailing "(Year)"
+    subject_name = re.sub(r'\s*\([^)]*\)$', '', tokens.title or folder).strip()
 
     if not questions:
         # Check for Theory Section fallback
-        theory_match = re.search(r'## Theory .*?Section\n\n(.+)', content, re.DOTALL | re.IGNORECASE)
-        if theory_match:
-            theory_text = theory_match.group(1).strip()
+        if tokens.theory_text:
             questions.append({
                 "number": 1,
-                "text": theory_text,
+                "text": tokens.theory_text,
                 "choices": [],
                 "topic": "Theory",
                 "difficulty": "MEDIUM",
                 "section": "Theory",
                 "explanation": None
             })
-        else:
+        elif not skipped:
             return None
 
     return {
@@ -325,76 +331,38 @@ def parse_markdown_file(file_path: str) -> dict | None:
         "subject_name": subject_name,
         "year": year,
         "questions": questions,
+        "skipped": skipped,
         "file_path": file_path
     }
 
-def import_markdown_file(file_path: str, db: Session):
+def parse_markdown_batch(file_path: str) -> ParsedFile:
     data = parse_markdown_file(file_path)
     if not data:
-        print(f"  [x] No parseable questions in {file_path}")
-        return 0, 0
-
-    exam_name = data['exam_name'].upper()
-    subject_name = data['subject_name']
-    year = data['year']
-
-    if not year:
-        print(f"  ⚠ Skipping {file_path}: Could not detect year.")
-        return 0, 0
-
-    exam = get_or_create_exam(db, exam_name, file_path)
-    subject = get_or_create_subject(db, subject_name, exam.id)
-
-    paper = db.query(QuestionPaper).filter(
-        QuestionPaper.subject_id == subject.id,
-        QuestionPaper.year == year
-    ).first()
-    if not paper:
-        paper = QuestionPaper(subject_id=subject.id, year=year, term="Standard", paper_number="1")
-        db.add(paper)
-        db.commit()
-        db.refresh(paper)
-
-    added, skipped = 0, 0
+        raise SkipFile("No parseable questions.")
+    if not data['questions']:
+        raise SkipFile(f"No parseable questions; {describe_skipped(data['skipped'])}")
+    if not data['year']:
+        raise SkipFile("Could not detect year.")
+
+    parsed = ParsedFile(
+        file_path=file_path, exam_name=data['exam_name'].upper(),
+        subject_name=data['subject_name'], year=data['year'], skipped=data['skipped']
+    )
     for q_data in data['questions']:
-        existing = db.query(Question).filter(
-            Question.text == q_data['text'],
-            Question.subject_id == subject.id
-        ).first()
-        if existing:
-            skipped += 1
-            continue
-
-        new_q = Question(
-            subject_id=subject.id, paper_id=paper.id,
-            question_num=q_data.get('number'),
+        parsed.add(
+            number=q_data.get('number'),
             text=q_data['text'],
+            section=q_data.get('section'),
             topic=q_data.get('topic'),
-            difficulty=DifficultyLevel.MEDIUM,
             explanation=q_data.get('explanation'),
-            year=year, is_ai_generated=False,
-            section=q_data.get('section')
+            choices=[(c.get('label'), c['text'], None, c['is_correct']) for c in q_data.get('choices', [])]
         )
-        db.add(new_q)
-        db.flush()
+    return parsed
 
-        for choice_data in q_data.get('choices', []):
-            choice = Choice(
-                question_id=new_q.id,
-                label=choice_data.get('label'),
-                text=choice_data['text'],
-                is_correct=choice_data['is_correct']
-            )
-            db.add(choice)
-        added += 1
-
-    db.commit()
-    return added, skipped
-
-# ─── ALOC Importer ───────────────────────────────────────────────────────────
-def import_aloc_file(file_path: str, db: Session):
+# ─── ALOC Parser ─────────────────────────────────────────────────────────────
+def parse_aloc_file(file_path: str) -> ParsedFile:
     """
-    Imports raw ALOC JSON data which is a list of question objects.
+    Parses raw ALOC JSON data which is a list of question objects.
     """
     with open(file_path, 'r', encoding='utf-8') as f:
         questions_list = json.load(f)
@@ -404,7 +372,7 @@ def import_aloc_file(file_path: str, db: Session):
         questions_list = [questions_list]
 
     if not questions_list:
-        return 0, 0
+        raise SkipFile("Empty ALOC file.")
 
     # Meta from the first item
     sample = questions_list[0]
@@ -417,125 +385,484 @@ def import_aloc_file(file_path: str, db: Session):
     # Infer subject from filename
     filename = os.path.basename(file_path)
     subject_raw = filename.split('_')[0].capitalize()
-    
-    exam = get_or_create_exam(db, exam_type, file_path)
-    subject = get_or_create_subject(db, subject_raw, exam.id)
 
     # ALOC questions don't strictly have papers in the same way, but we map to paper "1"
-    paper = db.query(QuestionPaper).filter(
-        QuestionPaper.subject_id == subject.id,
-        QuestionPaper.year == year
-    ).first()
-    if not paper:
-        paper = QuestionPaper(subject_id=subject.id, year=year, term="Standard", paper_number="1")
-        db.add(paper)
-        db.commit()
-        db.refresh(paper)
-
-    added, skipped = 0, 0
+    parsed = ParsedFile(file_path=file_path, exam_name=exam_type, subject_name=subject_raw, year=year, dedupe=False)
     for q_data in questions_list:
         text = q_data.get('question', '').strip()
         if not text: continue
 
-        # For ALOC, we just add the question instead of checking exact text 
-        # (ALOC has different sections and images, exact match is tricky)
-        
-        new_q = Question(
-            subject_id=subject.id,
-            paper_id=paper.id,
-            question_num=q_data.get('questionNub'),
-            section=q_data.get('section'),
+        correct_label = q_data.get('answer', '').strip().upper()
+        parsed.add(
+            number=q_data.get('questionNub'),
             text=text,
+            section=q_data.get('section'),
             topic=q_data.get('category'),
-            difficulty=DifficultyLevel.MEDIUM,
             explanation=q_data.get('solution'),
-            year=year,
-            is_ai_generated=False
+            choices=[
+                (label.upper(), val.strip(), None, label.upper() == correct_label)
+                for label, val in q_data.get('option', {}).items() if val and val.strip()
+            ]
         )
-        db.add(new_q)
-        db.flush()
+    return parsed
 
-        # Handle options
-        options = q_data.get('option', {})
-        correct_label = q_data.get('answer', '').strip().upper()
+def parse_file(file_path: str) -> Optional[ParsedFile]:
+    """Dispatches on the file type; None for files the pipeline does not handle."""
+    if file_path.endswith('_aloc.json'):
+        return parse_aloc_file(file_path)
+    if file_path.endswith('.json'):
+        return parse_json_file(file_path)
+    if file_path.endswith('.md') and 'README' not in file_path and 'templates' not in file_path:
+        return parse_markdown_batch(file_path)
+    return None
+
+# ─── Bulk Writer ─────────────────────────────────────────────────────────────
+class BulkWriter:
+    """
+    Writes parsed files set-based, inside one transaction:
+      - subjects and papers are preloaded with one query each; exams and contexts are
+        resolved once per run and cached
+      - duplicates are dropped against a per-subject question_hash() -> ids map, loaded
+        with one SELECT the first time a subject is seen; the current file claims the
+        existing question instead, so it is kept while any file that contains it remains
+      - questions are staged in memory and inserted in batches of `batch_size` with
+        INSERT ... RETURNING; their choices follow as one executemany
+      - retire() releases what a changed or deleted file claimed last time and removes
+        the questions no file claims any more
+    finish() inserts what is still staged, writes the recorded manifest entries,
+    rebuilds the touched blueprints and commits.
+    """
 
-        for label, val in options.items():
-            if not val or not val.strip(): continue
-            choice = Choice(
-                question_id=new_q.id,
-                label=label.upper(),
-                text=val.strip(),
-                is_correct=(label.upper() == correct_label)
+    def __init__(self, db: Session, batch_size: int = IMPORT_BATCH_SIZE, claims: Optional[Counter] = None):
+        self.db = db
+        self.batch_size = batch_size
+        self._exams: Dict[str, Exam] = {}
+        self._subjects: Dict[Tuple[str, int], int] = {}
+        self._papers: Optional[Dict[Tuple, int]] = None  # (subject_id, year, paper_number or None) -> id
+        self._contexts: Dict[str, int] = {}
+        # Staged questions appear as the list of file paths claiming them until flush() gives them an id
+        self._hashes: Dict[int, Dict[bytes, List[Union[int, List[str]]]]] = {}
+        self._staged_questions: List[dict] = []
+        self._staged_choices: List[List[Tuple]] = []
+        self._staged_claimants: List[List[str]] = []
+        self._staged_keys: List[Tuple[int, bytes]] = []  # (subject_id, question_hash)
+        self._manifest: Dict[str, Optional[Tuple[str, str]]] = {}  # key -> (file_path, content hash), None: forget
+        self.claims = claims if claims is not None else Counter()  # question id -> manifest entries claiming it
+        self.produced: Dict[str, set] = defaultdict(set)  # file_path -> question ids it claims
+        self.touched: Dict[int, set] = defaultdict(set)
+        self.inserted = 0
+        self.retired = 0
+
+    # --- Lookups (once per run) ---
+
+    def _exam(self, parsed: ParsedFile) -> Exam:
+        key = parsed.exam_name.upper()
+        if key not in self._exams:
+            self._exams[key] = get_or_create_exam(self.db, parsed.exam_name, parsed.file_path, parsed.sub_category)
+        return self._exams[key]
+
+    def _preload(self):
+        """Every subject and paper in one query each; files then resolve them from memory."""
+        if self._papers is not None:
+            return
+        self._subjects = {(name, exam_id): subject_id for subject_id, name, exam_id in
+                          self.db.query(Subject.id, Subject.name, Subject.exam_id)}
+        self._papers = {}
+        for paper_id, subject_id, year, paper_number in self.db.query(
+            QuestionPaper.id, QuestionPaper.subject_id, QuestionPaper.year, QuestionPaper.paper_number
+        ).order_by(QuestionPaper.id):
+            self._papers.setdefault((subject_id, year, paper_number), paper_id)
+            self._papers.setdefault((subject_id, year, None), paper_id)
+
+    def _subject(self, subject_name: str, exam_id: int) -> int:
+        key = (subject_name, exam_id)
+        if key not in self._subjects:
+            self._subjects[key] = get_or_create_subject(self.db, subject_name, exam_id).id
+        return self._subjects[key]
+
+    def _paper(self, parsed: ParsedFile, subject_id: int) -> int:
+        key = (subject_id, parsed.year, parsed.paper_number if parsed.match_paper_number else None)
+        if key not in self._papers:
+            paper = QuestionPaper(
+                subject_id=subject_id, year=parsed.year, term=parsed.term,
+                paper_number=parsed.paper_number, instructions=parsed.instructions
             )
-            db.add(choice)
-        added += 1
-
-    db.commit()
+            self.db.add(paper)
+            self.db.flush()
+            self._papers.setdefault((subject_id, parsed.year, parsed.paper_number), paper.id)
+            self._papers.setdefault((subject_id, parsed.year, None), paper.id)
+        return self._papers[key]
+
+    def _context(self, ctx_data: dict) -> int:
+        content = ctx_data.get('content')
+        if content not in self._contexts:
+            ctx_id = self.db.query(QuestionContext.id).filter(QuestionContext.content == content).scalar()
+            if ctx_id is None:
+                ctx = QuestionContext(title=ctx_data.get('title'), content=content, image_url=ctx_data.get('image_url'))
+                self.db.add(ctx)
+                self.db.flush()
+                ctx_id = ctx.id
+            self._contexts[content] = ctx_id
+        return self._contexts[content]
+
+    def _known_hashes(self, subject_id: int) -> Dict[bytes, List[Union[int, List[str]]]]:
+        if subject_id not in self._hashes:
+            known = defaultdict(list)
+            for question_id, text in self.db.query(Question.id, Question.text).filter(Question.subject_id == subject_id):
+                known[question_hash(text)].append(question_id)
+            self._hashes[subject_id] = known
+        return self._hashes[subject_id]
+
+    # --- Writing ---
+
+    def add(self, parsed: ParsedFile) -> Tuple[int, int]:
+        """Stages a parsed file. Returns (added, skipped duplicates or adopted questions)."""
+        self._preload()
+        exam = self._exam(parsed)
+        subject_id = self._subject(parsed.subject_name, exam.id)
+        paper_id = self._paper(parsed, subject_id)
+        known = self._known_hashes(subject_id)
+
+        added, skipped = 0, 0
+        for i in range(len(parsed)):
+            digest = question_hash(parsed.texts[i])
+            existing = known.get(digest)
+            if existing:
+                unclaimed = next((q_id for q_id in existing if isinstance(q_id, int) and not self.claims[q_id]), None)
+                if unclaimed is not None:
+                    self._claim(parsed.file_path, unclaimed)
+                    skipped += 1
+                    continue
+                if parsed.dedupe:
+                    self._claim(parsed.file_path, existing[0])
+                    skipped += 1
+                    continue
+            claimants = [parsed.file_path]
+            known[digest].append(claimants)
+            self._staged_questions.append({
+                "subject_id": subject_id,
+                "paper_id": paper_id,
+                "context_id": self._context(parsed.contexts[i]) if parsed.contexts[i] else None,
+                "question_num": parsed.numbers[i],
+                "section": parsed.sections[i],
+                "text": parsed.texts[i],
+                "topic": parsed.topics[i],
+                "difficulty": parsed.difficulties[i],
+                "explanation": parsed.explanations[i],
+                "year": parsed.year,
+            })
+            self._staged_choices.append(parsed.choices[i])
+            self._staged_claimants.append(claimants)
+            self._staged_keys.append((subject_id, digest))
+            added += 1
+
+        if added:
+            self.touched[subject_id].add(parsed.year)
+        if len(self._staged_questions) >= self.batch_size:
+            self.flush()
+        return added, skipped
+
+    def _claim(self, file_path: str, question: Union[int, List[str]]):
+        """Records that `file_path` contains `question` (an id, or the claimants of a staged question)."""
+        if isinstance(question, list):
+            if file_path not in question:
+                question.append(file_path)
+        elif question not in self.produced[file_path]:
+            self.produced[file_path].add(question)
+            self.claims[question] += 1
+
+    def flush(self):
+        """Inserts the staged questions and their choices (no commit)."""
+        if not self._staged_questions:
+            return
+        questions = Question.__table__
+        if self.db.get_bind().dialect.name == "sqlite":
+            # SQLite can only correlate RETURNING rows with their parameters one row at a time.
+            # The rows of one executemany get consecutive rowids while this transaction holds
+            # the write lock, so the ids follow from the last one.
+            self.db.execute(insert(questions), self._staged_questions)
+            last_id = self.db.execute(select(func.max(questions.c.id))).scalar()
+            question_ids = list(range(last_id - len(self._staged_questions) + 1, last_id + 1))
+        else:
+            question_ids = self.db.execute(
+                insert(questions).returning(questions.c.id, sort_by_parameter_order=True),
+                self._staged_questions
+            ).scalars().all()
+        choice_rows = [
+            {"question_id": question_id, "label": label, "text": text, "image_url": image_url, "is_correct": is_correct}
+            for question_id, choices in zip(question_ids, self._staged_choices)
+            for label, text, image_url, is_correct in choices
+        ]
+        if choice_rows:
+            self.db.execute(insert(Choice.__table__), choice_rows)
+        for question_id, claimants, (subject_id, digest) in zip(question_ids, self._staged_claimants, self._staged_keys):
+            known = self._hashes[subject_id][digest]
+            known[next(i for i, q_id in enumerate(known) if q_id is claimants)] = question_id
+            for file_path in claimants:
+                self._claim(file_path, question_id)
+        self.inserted += len(question_ids)
+        self._staged_questions, self._staged_choices = [], []
+        self._staged_claimants, self._staged_keys = [], []
+
+    def retire(self, question_ids: Optional[List[int]]):
+        """
+        Releases the questions a file claimed on its previous import and deletes, with their
+        choices, those no other file claims. Questions that user history references are kept
+        and left unclaimed, so the file's new version can adopt them again.
+        """
+        for question_id in question_ids or ():
+            if self.claims[question_id] > 0:
+                self.claims[question_id] -= 1
+        question_ids = [question_id for question_id in question_ids or () if not self.claims[question_id]]
+        if not question_ids:
+            return
+        questions, choices = Question.__table__, Choice.__table__
+        rows, referenced = [], set()
+        for chunk in _chunks(question_ids):
+            rows += self.db.execute(
+                select(questions.c.id, questions.c.subject_id, questions.c.year, questions.c.text)
+                .where(questions.c.id.in_(chunk))
+            ).all()
+            for column in _question_references():
+                referenced.update(self.db.execute(select(column).where(column.in_(chunk))).scalars())
+        removable = [row.id for row in rows if row.id not in referenced]
+        for chunk in _chunks(removable):
+            self.db.execute(delete(choices).where(choices.c.question_id.in_(chunk)))
+            self.db.execute(delete(questions).where(questions.c.id.in_(chunk)))
+
+        removed = set(removable)
+        for row in rows:
+            if row.id not in removed:
+                continue
+            self.touched[row.subject_id].add(row.year)
+            known = self._hashes.get(row.subject_id)
+            if known is not None and row.id in known.get(question_hash(row.text), ()):
+                known[question_hash(row.text)].remove(row.id)
+        self.retired += len(removable)
+
+    def record(self, file_path: str, content_hash: str):
+        """Marks a file as imported at `content_hash`; written with its produced ids by finish()."""
+        self._manifest[manifest_key(file_path)] = (file_path, content_hash)
+
+    def forget(self, key: str):
+        """Drops the manifest entry of a deleted file (retire() its questions first)."""
+        self._manifest[key] = None
+
+    def _write_manifest(self):
+        if not self._manifest:
+            return
+        manifest = ImportManifest.__table__
+        for chunk in _chunks(list(self._manifest)):
+            self.db.execute(delete(manifest).where(manifest.c.path.in_(chunk)))
+        now = datetime.utcnow()
+        rows = [
+            {"path": key, "content_hash": entry[1], "parser_version": PARSER_VERSION,
+             "question_ids": sorted(self.produced.get(entry[0], ())), "imported_at": now}
+            for key, entry in self._manifest.items() if entry is not None
+        ]
+        if rows:
+            self.db.execute(insert(manifest), rows)
+
+    def finish(self):
+        """Final merge: remaining inserts, manifest entries, blueprint rebuilds for touched subjects, one commit."""
+        self.flush()
+        self._write_manifest()
+        for subject_id, years in self.touched.items():
+            rebuild_blueprints(self.db, subject_id, years=years)
+        if self._exams or self._manifest:
+            # Some file was written or removed: cached catalogue responses are stale once this commits
+            bump_generation(self.db)
+        self.db.commit()
+
+
+def _chunks(items: List, size: int = 500) -> Iterator[List]:
+    """Keeps IN (...) lists under SQLite's bound-parameter limit."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _question_references() -> List:
+    """Columns that point at questions.id from user history (everything but choices)."""
+    return [
+        fk.parent for table in Base.metadata.sorted_tables if table.name != Choice.__tablename__
+        for fk in table.foreign_keys if fk.column is Question.__table__.c.id
+    ]
+
+# ─── Single-file Importers ───────────────────────────────────────────────────
+def _import_one(parsed: ParsedFile, db: Session):
+    writer = BulkWriter(db)
+    added, skipped = writer.add(parsed)
+    writer.finish()
     return added, skipped
 
-# ─── Core Runner ─────────────────────────────────────────────────────────────
-def import_file(file_path: str, db: Session):
-    if file_path.endswith('_aloc.json'):
-        a, s = import_aloc_file(file_path, db)
-    elif file_path.endswith('.json'):
-        a, s = import_json_file(file_path, db)
-    elif file_path.endswith('.md') and 'README' not in file_path and 'templates' not in file_path:
-        a, s = import_markdown_file(file_path, db)
-    else:
-        return
+def import_json_file(file_path: str, db: Session):
+    return _import_one(parse_json_file(file_path), db)
 
-    if a > 0 or s > 0:
-        status = f"[+] Added {a}" + (f", [~] Skipped {s} duplicates" if s > 0 else "")
+def import_markdown_file(file_path: str, db: Session):
+    return _import_one(parse_markdown_batch(file_path), db)
+
+def import_aloc_file(file_path: str, db: Session):
+    return _import_one(parse_aloc_file(file_path), db)
+
+# ─── Core Runner ─────────────────────────────────────────────────────────────
+def report_file(file_path: str, added: int, skipped: int):
+    if added > 0 or skipped > 0:
+        status = f"[+] Added {added}" + (f", [~] Skipped {skipped} duplicates" if skipped > 0 else "")
         print(f"  {status}  <-  {os.path.relpath(file_path, project_root)}")
     else:
         print(f"  [~] No new content  <-  {os.path.relpath(file_path, project_root)}")
 
-def get_changed_data_files() -> list[str]:
-    """Returns list of files in data/ changed in the last git commit."""
-    import subprocess
-    result = subprocess.run(
-        ['git', 'diff', '--name-only', 'HEAD~1', 'HEAD'],
-        cwd=project_root, capture_output=True, text=True
-    )
-    changed = result.stdout.strip().splitlines()
-    data_files = []
-    for f in changed:
-        if f.startswith('data/') and (f.endswith('.json') or f.endswith('.md')):
-            full = os.path.join(project_root, f.replace('/', os.sep))
-            if os.path.exists(full):
-                data_files.append(full)
-    return data_files
-
-def run_import(changed_only: bool = False):
-    db = SessionLocal()
-    total_added = 0
+def describe_skipped(skipped: List[str]) -> str:
+    return f"{len(skipped)} question(s) skipped: " + "; ".join(skipped)
 
-    if changed_only:
-        files = get_changed_data_files()
-        print(f"\n[*] Reharz Data Sync -- {len(files)} changed file(s) detected\n")
-    else:
-        data_dir = os.path.join(project_root, "data")
-        files = []
-        for root, dirs, filenames in os.walk(data_dir):
-            if "templates" in root:
-                continue
-            for file in filenames:
-                if file.endswith('.json') or (file.endswith('.md') and 'README' not in file):
-                    files.append(os.path.join(root, file))
-        print(f"\n[*] Reharz Data Sync -- Full import of {len(files)} file(s)\n")
+def report_skipped(file_path: str, skipped: List[str]):
+    """Source questions the parser could not import (e.g. an answer letter that names no choice), so the data can be fixed."""
+    if skipped:
+        print(f"  ⚠ {describe_skipped(skipped)}  <-  {os.path.relpath(file_path, project_root)}")
+
+def _parse_isolated(file_path: str) -> Tuple[str, Optional[ParsedFile], Optional[str], Optional[str]]:
+    """Parse-stage entry point (runs in a worker process). Never raises: returns (path, parsed, skip reason, error)."""
+    try:
+        return file_path, parse_file(file_path), None, None
+    except SkipFile as e:
+        return file_path, None, str(e), None
+    except Exception as e:
+        return file_path, None, None, f"{type(e).__name__}: {e}"
+
+def parse_files(files: List[str], workers: int = IMPORT_WORKERS, queue_size: int = IMPORT_QUEUE_SIZE) -> Iterator[Tuple]:
+    """
+    Yields _parse_isolated() results in file order. With workers > 1 the files are parsed in a
+    process pool by a feeder thread, at most `queue_size` results ahead of the consumer.
+    """
+    if workers <= 1 or len(files) <= 1:
+        for file_path in files:
+            yield _parse_isolated(file_path)
+        return
 
-    for file_path in files:
+    done = object()
+    results = queue.Queue(maxsize=queue_size)
+
+    def feed():
         try:
-            import_file(file_path, db)
-        except Exception as e:
-            print(f"  [x] Error importing {file_path}: {e}")
-            db.rollback()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                remaining = iter(files)
+                in_flight = deque()
+                for file_path in remaining:
+                    in_flight.append((file_path, pool.submit(_parse_isolated, file_path)))
+                    if len(in_flight) >= queue_size:
+                        break
+                while in_flight:
+                    file_path, future = in_flight.popleft()
+                    try:
+                        result = future.result()
+                    except Exception as e:  # the worker process itself died
+                        result = (file_path, None, None, f"{type(e).__name__}: {e}")
+                    results.put(result)  # blocks while the writer is behind
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        in_flight.append((next_path, pool.submit(_parse_isolated, next_path)))
+        finally:
+            results.put(done)
+
+    feeder = threading.Thread(target=feed, name="import-parse-feeder", daemon=True)
+    feeder.start()
+    while True:
+        result = results.get()
+        if result is done:
+            break
+        yield result
+    feeder.join()
+
+def import_file(file_path: str, db: Session):
+    try:
+        parsed = parse_file(file_path)
+    except SkipFile as e:
+        print(f"  ⚠ Skipping {file_path}: {e}")
+        return
+    if parsed is None:
+        return
+    report_file(file_path, *_import_one(parsed, db))
+    report_skipped(file_path, parsed.skipped)
+
+# ─── Import Manifest ─────────────────────────────────────────────────────────
+def find_data_files() -> List[str]:
+    data_dir = os.path.join(project_root, "data")
+    files = []
+    for root, dirs, filenames in os.walk(data_dir):
+        dirs[:] = [d for d in dirs if d not in GENERATED_DIRS]
+        if "templates" in root:
+            continue
+        for file in filenames:
+            if file.endswith('.json') or (file.endswith('.md') and 'README' not in file):
+                files.append(os.path.join(root, file))
+    return sorted(files)
+
+def manifest_key(file_path: str) -> str:
+    return os.path.relpath(file_path, project_root).replace(os.sep, '/')
 
-    db.close()
-    print(f"\n[+] Reharz Data Sync Complete.\n")
+def run_import(rebuild_all: bool = False, workers: int = IMPORT_WORKERS):
+    # Data syncs can run against a fresh database (CI, first deploy): bring the schema up first
+    migrations.migrate(engine)
+    db = SessionLocal()
+
+    if rebuild_all:
+        count = rebuild_all_blueprints(db)
+        print(f"\n[*] Rebuilt exam blueprints for {count} subject(s)\n")
+        db.close()
+        return
+
+    started = time.perf_counter()
+    manifest = {entry.path: entry for entry in db.query(ImportManifest)}
+    hashes = {file_path: file_hash(file_path) for file_path in find_data_files()}
+    files = [
+        file_path for file_path, content_hash in hashes.items()
+        if (entry := manifest.get(manifest_key(file_path))) is None
+        or entry.content_hash != content_hash or entry.parser_version != PARSER_VERSION
+    ]
+    present = {manifest_key(file_path) for file_path in hashes}
+    deleted = [key for key in manifest if key not in present]
+    print(f"\n[*] Reharz Data Sync -- {len(hashes)} file(s): {len(files)} new/changed, "
+          f"{len(hashes) - len(files)} unchanged, {len(deleted)} deleted\n")
+
+    writer = BulkWriter(db, claims=Counter(q_id for entry in manifest.values() for q_id in entry.question_ids or ()))
+    failed = 0
+    try:
+        for key in deleted:
+            writer.retire(manifest[key].question_ids)
+            writer.forget(key)
+            print(f"  [-] Removed  <-  {key}")
+        for done_count, (file_path, parsed, skip_reason, error) in enumerate(parse_files(files, workers), 1):
+            if done_count % 25 == 0 or done_count == len(files):
+                print(f"  [*] {done_count}/{len(files)} file(s) processed ({time.perf_counter() - started:.1f}s)")
+            if error:
+                # The manifest entry stays as it was, so the file is retried on the next sync
+                failed += 1
+                print(f"  [x] Error importing {file_path}: {error}")
+                continue
+            previous = manifest.get(manifest_key(file_path))
+            if previous is not None:
+                writer.retire(previous.question_ids)
+            writer.record(file_path, hashes[file_path])
+            if skip_reason:
+                print(f"  ⚠ Skipping {file_path}: {skip_reason}")
+                continue
+            if parsed is None:
+                continue
+            report_file(file_path, *writer.add(parsed))
+            report_skipped(file_path, parsed.skipped)
+        writer.finish()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    print(f"\n[+] Reharz Data Sync Complete: {writer.inserted} question(s) added, {writer.retired} removed, "
+          f"{failed} file(s) failed "
+          f"in {time.perf_counter() - started:.1f}s ({max(1, workers)} parse worker(s)).\n")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Reharz Data Import Pipeline")
-    parser.add_argument('--changed', action='store_true', help='Only import files changed in last git commit')
+    parser.add_argument('--rebuild-blueprints', action='store_true', help='Rebuild every exam blueprint from the questions table')
+    parser.add_argument('--workers', type=int, default=IMPORT_WORKERS, help='Parse processes (1 parses in-process)')
     args = parser.parse_args()
-    run_import(changed_only=args.changed)
+    run_import(rebuild_all=args.rebuild_blueprints, workers=args.workers)
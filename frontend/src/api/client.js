@@ -48,6 +48,62 @@ const apiClient = {
             throw new Error(error.detail || 'API request failed');
         }
         return response.json();
+    },
+
+    // Server-Sent Events over POST: calls onEvent(event) for every `data:` frame until the stream ends
+    async stream(endpoint, body, onEvent, options = {}) {
+        const token = localStorage.getItem('token');
+        const response = await fetch(`${API_BASE}${endpoint}`, {
+            method: 'POST',
+            ...options,
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                ...(token ? { 'Authorization': `Bearer ${token}` } : {}),
+                ...options.headers,
+            },
+            body: JSON.stringify(body),
+        });
+        if (!response.ok) {
+            const error = await response.json();
+            if (response.status === 401) {
+                localStorage.removeItem('token');
+                localStorage.removeItem('userId');
+                localStorage.removeItem('user');
+                window.location.href = '/';
+            }
+            throw new Error(error.detail || 'API request failed');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                const data = frame.split('\n').filter(line => line.startsWith('data: ')).map(line => line.slice(6)).join('\n');
+                if (data) onEvent(JSON.parse(data));
+            }
+        }
+    },
+
+    // Background grading jobs: endpoints answer 202 with {job_id, status}; poll until finished
+    async waitForJob(job, { intervalMs = 1500, timeoutMs = 5 * 60 * 1000 } = {}) {
+        if (!job || job.job_id === undefined) return job;
+        const deadline = Date.now() + timeoutMs;
+        let current = job;
+        while (current.status !== 'done' && current.status !== 'failed') {
+            if (Date.now() > deadline) throw new Error('Grading is taking longer than expected. Please check back later.');
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+            current = await this.get(`/jobs/${job.job_id}`);
+        }
+        if (current.status === 'failed') throw new Error(current.error || 'Grading failed');
+        return current.result;
     }
 };
 
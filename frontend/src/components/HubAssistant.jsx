@@ -18,6 +18,25 @@ import { clsx } from 'clsx';
 
 import apiClient from '../api/client';
 
+// A sentence is complete once its punctuation is followed by whitespace (so "3.5" is not split mid-stream)
+const SENTENCE_END = /[.!?]+["')\]]*\s+|\n+/g;
+
+// Index just past the last complete sentence of `text` after `start` (`start` if none has ended yet)
+function completedSentencesEnd(text, start) {
+    SENTENCE_END.lastIndex = start;
+    let end = start;
+    let match;
+    while ((match = SENTENCE_END.exec(text))) end = match.index + match[0].length;
+    return end;
+}
+
+function speak(text) {
+    const cleanText = text.replace(/\[ACTION_TRIGGERED\]/g, "").trim();
+    if (window.speechSynthesis && cleanText) {
+        window.speechSynthesis.speak(new SpeechSynthesisUtterance(cleanText));
+    }
+}
+
 export default function HubAssistant({ userId, subject, onAction }) {
     const [isOpen, setIsOpen] = useState(false);
     const [messages, setMessages] = useState([
@@ -143,45 +162,65 @@ export default function HubAssistant({ userId, subject, onAction }) {
         setIsTyping(true);
 
         try {
-            const data = await apiClient.post(`/chat/${userId}`, {
+            let responseText = '';
+            let spokenUpTo = 0;
+            let streamError = null;
+            let started = false;
+            // Streamed answer: actions run as soon as they arrive, tokens fill the reply in place
+            // and each sentence is spoken as soon as it is complete
+            await apiClient.stream(`/chat/${userId}/stream`, {
                 message: currentInput,
                 history: messages.map(m => ({
                     role: m.role === 'assistant' ? 'model' : 'user',
                     text: m.text
                 })),
                 subject_context: subject?.name
-            });
-            const responseText = data.response || "I'm ready. What's our next objective?";
-            
-            // Speak the response if not in silent mode
-            if (window.speechSynthesis) {
-                const utterance = new SpeechSynthesisUtterance(responseText.replace(/\[ACTIONS: .*?\]/, "").replace(/\[ACTION_TRIGGERED\]/, "").trim());
-                window.speechSynthesis.speak(utterance);
-            }
-
-            // Parse structured actions if they exist
-            const actionMatch = typeof responseText === 'string' ? responseText.match(/\[ACTIONS: ([\s\S]*?)\]/) : null;
-            if (actionMatch) {
-                try {
-                    const actions = JSON.parse(actionMatch[1]);
-                    actions.forEach(action => {
+            }, (event) => {
+                if (event.type === 'action' || event.type === 'tool') {
+                    if (event.type === 'action') {
                         try {
-                            if (onAction) onAction(action);
+                            if (onAction) onAction(event.action);
                         } catch (e) {
                             console.error("Action execution failed:", e);
                         }
-                    });
-                    
-                    let cleanText = responseText.replace(/\[ACTIONS: .*?\]/, "").trim();
-                    cleanText = cleanText.replace(/\[ACTION_TRIGGERED\]/, "").trim();
-                    setMessages(prev => [...prev, { role: 'assistant', text: cleanText || "Executing your request..." }]);
-                } catch (e) {
-                    console.error("Failed to parse actions:", e);
-                    setMessages(prev => [...prev, { role: 'assistant', text: responseText }]);
+                    }
+                    // Text before a tool call is not part of the answer: the model writes the reply after it
+                    if (spokenUpTo > 0) window.speechSynthesis?.cancel();
+                    if (started) {
+                        started = false;
+                        setMessages(prev => prev.slice(0, -1));
+                        setIsTyping(true);
+                    }
+                    responseText = '';
+                    spokenUpTo = 0;
+                } else if (event.type === 'token') {
+                    responseText += event.text;
+                    const end = completedSentencesEnd(responseText, spokenUpTo);
+                    if (end > spokenUpTo) {
+                        speak(responseText.slice(spokenUpTo, end));
+                        spokenUpTo = end;
+                    }
+                    const cleanText = responseText.replace(/\[ACTION_TRIGGERED\]/, "").trim();
+                    if (!started) {
+                        started = true;
+                        setIsTyping(false);
+                        setMessages(prev => [...prev, { role: 'assistant', text: cleanText }]);
+                    } else {
+                        setMessages(prev => [...prev.slice(0, -1), { role: 'assistant', text: cleanText }]);
+                    }
+                } else if (event.type === 'error') {
+                    streamError = event.detail;
                 }
-            } else {
-                setMessages(prev => [...prev, { role: 'assistant', text: responseText }]);
+            });
+            if (streamError && !started) throw new Error(streamError);
+
+            const cleanText = responseText.replace(/\[ACTION_TRIGGERED\]/, "").trim();
+            if (!started) {
+                setMessages(prev => [...prev, { role: 'assistant', text: cleanText || "I'm ready. What's our next objective?" }]);
             }
+
+            // The last sentence has no trailing whitespace to end it
+            speak(responseText.slice(spokenUpTo));
         } catch (err) {
             console.error("Chat Error:", err);
             setMessages(prev => [...prev, {
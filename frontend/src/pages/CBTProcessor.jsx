@@ -116,10 +116,11 @@ export default function CBTProcessor({ userId, examId, examName, subjectId, onEx
     const submitExam = async () => {
         setIsSubmitting(true);
         try {
-            const data = await apiClient.post('/simulation/submit', {
+            const job = await apiClient.post('/simulation/submit', {
                 session_id: sessionData.session_id,
                 answers: answers
             });
+            const data = await apiClient.waitForJob(job);
             setResults(data);
             setStep('result');
         } catch (err) {
@@ -134,7 +135,8 @@ export default function CBTProcessor({ userId, examId, examName, subjectId, onEx
         if (!sessionData?.session_id || isAnalyzing) return;
         setIsAnalyzing(true);
         try {
-            const data = await apiClient.get(`/simulation/${sessionData.session_id}/analyze`);
+            const job = await apiClient.post(`/simulation/${sessionData.session_id}/analyze`, {});
+            const data = await apiClient.waitForJob(job);
             setAnalysis(data);
         } catch (err) {
             console.error("Analysis failed:", err);
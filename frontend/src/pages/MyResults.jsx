@@ -94,7 +94,8 @@ export default function MyResults({ userId, initialSessionId = null }) {
         setAnalyzing(true);
         setExpertAnalysisResult(null);
         try {
-            const data = await apiClient.get(`/simulation/${sessionId}/analyze`);
+            const job = await apiClient.post(`/simulation/${sessionId}/analyze`, {});
+            const data = await apiClient.waitForJob(job);
             setExpertAnalysisResult(data);
         } catch (err) {
             console.error("Analysis failed:", err);
@@ -165,10 +165,11 @@ export default function WAECBrowser({ userId, onExit, examId: propExamId, examNa
         setIsSubmitted(true);
         setView('loading');
         try {
-            const data = await apiClient.post('/simulation/submit', {
+            const job = await apiClient.post('/simulation/submit', {
                 session_id: sessionData.session_id,
                 answers: answers
             });
+            const data = await apiClient.waitForJob(job);
             setSessionData({ ...sessionData, results: data });
             setView('results');
         } catch (err) {
@@ -3,6 +3,8 @@ import os
 import re
 import json
 
+from agent_core.core.corpus_index import CorpusIndex
+
 def count_questions_md(file_path):
     try:
         if not os.path.exists(file_path): return 0
@@ -48,13 +50,17 @@ def get_report():
     
     base_data_dir = os.path.join(os.getcwd(), "data")
     
-    # We also want to check files that might not be in the DB yet
-    # But for simplicity, we'll iterate through the DB results and then find files
+    # One pass over data/ (incremental via the persisted manifest) instead of an os.walk per row.
+    # DB subject names ("ICAN Taxation", "WAEC Music 2023") are not index subject keys, so rows
+    # still match on file names: every word of the subject must appear in a 2023 file's name.
+    index = CorpusIndex(data_root=base_data_dir).refresh(force=True)
+    candidates = [
+        (os.path.basename(entry["path"]).lower(), entry) for entry in index.entries.values()
+        if "2023" in os.path.basename(entry["path"])
+    ]
+    file_counts = {}
     
     for category, exam, subject, year, db_count in db_results:
-        # Try to guess file path
-        # Pattern: data/Academic/JAMB/Biology/2023.md or similar
-        # Or look for any file with '2023' and 'subject' in its name
         found_file_count = 0
         status = "Partial"
         
@@ -62,17 +68,18 @@ def get_report():
         clean_subject = subject.replace("Past Questions", "").replace("Questions", "").strip().lower()
         search_terms = clean_subject.split()
         
-        for root, dirs, files in os.walk(base_data_dir):
-            for file in files:
-                file_lower = file.lower()
-                if "2023" in file_lower:
-                    # Check if all words in clean_subject are in the filename
-                    if all(term in file_lower for term in search_terms):
-                        file_path = os.path.join(root, file)
-                        if file.endswith(".md"):
-                            found_file_count = max(found_file_count, count_questions_md(file_path))
-                        elif file.endswith(".json"):
-                            found_file_count = max(found_file_count, count_questions_json(file_path))
+        for file_lower, entry in candidates:
+            if not all(term in file_lower for term in search_terms):
+                continue
+            file_path = index.abspath(entry)
+            if file_path not in file_counts:
+                if file_lower.endswith(".md"):
+                    file_counts[file_path] = count_questions_md(file_path)
+                elif file_lower.endswith(".json"):
+                    file_counts[file_path] = count_questions_json(file_path)
+                else:
+                    file_counts[file_path] = 0
+            found_file_count = max(found_file_count, file_counts[file_path])
         
         if db_count >= 40 or found_file_count >= 40:
             status = "Complete"
@@ -0,0 +1,86 @@
+"""
+Full data/ import benchmark.
+
+For each parse worker count, runs run_import() twice against a scratch database: once into
+an empty schema, once as a re-sync of the unchanged data (which the import manifest lets
+it skip). For each run it reports wall time,
+the number of SQL statements issued and the resulting row counts. A parse-only pass per
+worker count shows how the parse stage scales with cores.
+
+The scratch database is DROPPED AND RE-CREATED: never point BENCH_IMPORT_DATABASE_URL at real data.
+
+Usage (from the project root):
+    python scripts/bench_import.py [workers ...]          # default: 1 and os.cpu_count()
+    BENCH_IMPORT_DATABASE_URL=postgresql://user:pw@localhost/reharz_bench python scripts/bench_import.py
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+SCRATCH_URL = os.getenv("BENCH_IMPORT_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/bench_import.db"
+os.environ["DATABASE_URL"] = SCRATCH_URL
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+
+from agent_core import migrations
+from agent_core.database import Base, SessionLocal, engine
+from agent_core.models.main_models import Choice, ExamBlueprint, Question, QuestionPaper, Subject
+from agent_core.scripts import import_data
+
+
+def row_counts():
+    db = SessionLocal()
+    try:
+        return {model.__tablename__: db.query(func.count()).select_from(model).scalar()
+                for model in (Subject, QuestionPaper, Question, Choice, ExamBlueprint)}
+    finally:
+        db.close()
+
+
+def timed_parse(workers):
+    files = import_data.find_data_files()
+    start = time.perf_counter()
+    questions = sum(len(parsed) for _, parsed, _, _ in import_data.parse_files(files, workers) if parsed)
+    elapsed = time.perf_counter() - start
+    print(f"{'parse-only':>10}: {elapsed:6.2f}s | {len(files) / elapsed:7.1f} files/s | {questions} questions")
+
+
+def reset_schema():
+    Base.metadata.drop_all(bind=engine)
+    migrations.version_table.drop(bind=engine, checkfirst=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        migrations.migrate(engine)
+
+
+def timed_import(label, workers):
+    statements = [0]
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import_data.run_import(workers=workers)
+    elapsed = time.perf_counter() - start
+    event.remove(engine, "before_cursor_execute", count)
+    print(f"{label:>10}: {elapsed:6.2f}s | {statements[0]:6d} statements | {row_counts()}")
+
+
+def main():
+    worker_counts = [int(w) for w in sys.argv[1:]] or sorted({1, os.cpu_count() or 1})
+    print(f"Importing {os.path.join(import_data.project_root, 'data')} into {engine.dialect.name}, cpus={os.cpu_count()}")
+    for workers in worker_counts:
+        print(f"-- {workers} parse worker(s)")
+        timed_parse(workers)
+        reset_schema()
+        timed_import("fresh", workers)
+        timed_import("re-sync", workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Markdown question parser benchmark.
+
+Runs the shared streaming tokenizer (agent_core/core/question_markdown.py) and the two
+regex parsers it replaced over every .md file in data/Academic and data/Professional,
+through both consumers:
+
+  - import:    import_data.parse_markdown_file        vs the previous regex version
+  - catalogue: build_waec_catalogue.parse_questions_from_md vs the previous regex version
+
+For each it reports throughput (best of --repeat runs), questions found, and output parity
+per question: identical, changed, or found by only one of the parsers. --diff prints every
+difference. A synthetic file with one --block-lines long question block (prose that mentions
+"(C)", "Section B." and the like) shows the per-line cost on large theory-style blocks.
+
+Usage (from the project root):
+    python scripts/bench_markdown_parser.py [--repeat N] [--block-lines N] [--diff]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from agent_core.scripts.build_waec_catalogue import parse_questions_from_md
+from agent_core.scripts.import_data import parse_markdown_file
+
+CORPORA = [os.path.join(PROJECT_ROOT, "data", "Academic"), os.path.join(PROJECT_ROOT, "data", "Professional")]
+
+
+# ─── Previous parsers (parity reference) ─────────────────────────────────────
+def legacy_parse_markdown_file(file_path: str) -> dict | None:
+    """
+    Parses markdown files in this format:
+    # Exam Subject (Year)
+    **1.** Question text
+       A) Choice A
+       B) Choice B
+       **Answer: A**
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    # Derive metadata from filename and path.  e.g: NDA_Past_Questions_2023.md
+    filename = os.path.basename(file_path)
+    parts = filename.replace('.md', '').split('_')
+
+    # Extract year from filename
+    year_match = re.search(r'(\d{4})', filename)
+    year = int(year_match.group(1)) if year_match else None
+
+    # Extract exam name from folder name
+    folder = os.path.basename(os.path.dirname(file_path))  # e.g. NDA, POLAC, PCN_PEP
+    exam_name = folder.replace('_', ' ').split()[0]  # e.g. NDA, POLAC, PCN
+
+    # Subject from folder name or heading
+    heading_match = re.search(r'^#\s+(.+)', content, re.MULTILINE)
+    subject_name = heading_match.group(1).strip() if heading_match else folder
+
+    # Remove year from subject name if present
+    subject_name = re.sub(r'\s*\([^)]*\)$', '', subject_name).strip()
+
+    # Parse questions
+    # Pattern: (**)?N.(**)? question text ... A) ... (**)?Answer: X(**)?
+    question_blocks = re.split(r'\n(?=\**\d+\.\**)', content)
+    questions = []
+
+    for block in question_blocks:
+        # Get question number and text - supports both **N.** and N.
+        q_match = re.match(r'(?:\*\*|)(\d+)\.(?:\*\*|)\s+(.+?)(?=\n\s*[A-D]\))', block, re.DOTALL)
+        if not q_match:
+            continue
+
+        q_num = int(q_match.group(1))
+        q_text = q_match.group(2).strip().replace('\n', ' ')
+
+        # Get choices - patterns like "A) text" or "A. text"
+        choices_raw = re.findall(r'([A-E])[)\.]\s+(.+?)(?=\n\s*[A-E][).]|(?:\*\*|)Answer|(?:\*\*|)Explanation|\Z)', block, re.DOTALL)
+
+        # Get correct answer - supports both **Answer: X** and Answer: X
+        answer_match = re.search(r'(?:\*\*|)Answer:\s*([A-E])(?:\*\*|)', block)
+        correct_label = answer_match.group(1).strip() if answer_match else None
+
+        if not choices_raw or not correct_label:
+            continue
+
+        choices = [
+            {
+                "label": c[0].strip(),
+                "text": c[1].strip().replace('\n', ' '),
+                "is_correct": c[0].strip() == correct_label
+            }
+            for c in choices_raw
+        ]
+
+        questions.append({
+            "number": q_num,
+            "text": q_text,
+            "choices": choices,
+            "topic": None,
+            "difficulty": "MEDIUM",
+            "explanation": None
+        })
+
+    if not questions:
+        # Check for Theory Section fallback
+        theory_match = re.search(r'## Theory .*?Section\n\n(.+)', content, re.DOTALL | re.IGNORECASE)
+        if theory_match:
+            theory_text = theory_match.group(1).strip()
+            questions.append({
+                "number": 1,
+                "text": theory_text,
+                "choices": [],
+                "topic": "Theory",
+                "difficulty": "MEDIUM",
+                "section": "Theory",
+                "explanation": None
+            })
+        else:
+            return None
+
+    return {
+        "exam_name": exam_name,
+        "subject_name": subject_name,
+        "year": year,
+        "questions": questions,
+        "file_path": file_path
+    }
+
+
+def legacy_parse_questions_from_md(filepath):
+    """Parse MCQ questions from markdown file."""
+    questions = []
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        content = f.read()
+
+    # Split on question numbers: **1.** **2.** etc.
+    blocks = re.split(r"\n\*\*(\d+)\.\*\*", content)
+
+    for i in range(1, len(blocks), 2):
+        q_num = int(blocks[i])
+        body = blocks[i + 1].strip() if i + 1 < len(blocks) else ""
+
+        lines = [l.strip() for l in body.split("\n") if l.strip()]
+        if not lines:
+            continue
+
+        # First line is question text
+        q_text = re.sub(r"^\*\*|\*\*$", "", lines[0]).strip()
+
+        choices = {}
+        answer = None
+        explanation = ""
+
+        for line in lines[1:]:
+            # Choice lines: A) ... or A) ...
+            choice_match = re.match(r"^([A-Da-d])\)\s+(.+)", line)
+            if choice_match:
+                choices[choice_match.group(1).upper()] = choice_match.group(2).strip()
+                continue
+
+            # Answer line: **Answer: B** or Answer: B
+            ans_match = re.search(r"\*?Answer:\s*([A-Da-d])\*?", line, re.IGNORECASE)
+            if ans_match:
+                answer = ans_match.group(1).upper()
+                continue
+
+            # Explanation line: *Explanation: ...*
+            exp_match = re.match(r"\*?Explanation:\s*(.+?)\*?$", line, re.IGNORECASE)
+            if exp_match:
+                explanation = exp_match.group(1).strip()
+
+        if q_text and choices and answer:
+            questions.append({
+                "number": q_num,
+                "text": q_text,
+                "choices": choices,
+                "answer": answer,
+                "explanation": explanation,
+            })
+
+    return questions
+
+
+# ─── Comparison ──────────────────────────────────────────────────────────────
+def import_questions(parse, path):
+    data = parse(path)
+    return data["questions"] if data else []
+
+
+def catalogue_questions(parse, path):
+    return parse(path)
+
+
+CONSUMERS = [
+    ("import", import_questions, legacy_parse_markdown_file, parse_markdown_file),
+    ("catalogue", catalogue_questions, legacy_parse_questions_from_md, parse_questions_from_md),
+]
+
+
+def keyed(questions):
+    """Questions keyed by (number, occurrence), so repeated numbers in one file stay distinct."""
+    seen, keys = {}, {}
+    for q in questions:
+        n = seen[q["number"]] = seen.get(q["number"], 0) + 1
+        keys[(q["number"], n)] = q
+    return keys
+
+
+def timed(consumer, parse, files, repeat):
+    best, results = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [consumer(parse, path) for path in files]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def long_block_file(lines):
+    path = os.path.join(tempfile.mkdtemp(), "Synthetic_2020.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("# Synthetic Long Block\n\n**1.** Discuss the following case.\n")
+        for i in range(lines):
+            f.write(f"   Paragraph {i}: see note (C) and Section B. The reviewer noted item E. again.\n")
+        f.write("   A) yes\n   B) no\n   **Answer: A**\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--block-lines", type=int, default=4000)
+    parser.add_argument("--diff", action="store_true", help="print every differing question")
+    args = parser.parse_args()
+
+    files = sorted(f for corpus in CORPORA for f in glob.glob(os.path.join(corpus, "**", "*.md"), recursive=True))
+    size_mb = sum(os.path.getsize(f) for f in files) / 1e6
+    print(f"{len(files)} markdown file(s), {size_mb:.2f} MB, best of {args.repeat}")
+
+    for name, consumer, legacy, current in CONSUMERS:
+        legacy_time, legacy_results = timed(consumer, legacy, files, args.repeat)
+        current_time, current_results = timed(consumer, current, files, args.repeat)
+        identical = changed = legacy_only = current_only = 0
+        for path, old, new in zip(files, legacy_results, current_results):
+            old, new = keyed(old), keyed(new)
+            for key in sorted(set(old) | set(new), key=lambda k: (k[0] or 0, k[1])):
+                if key in old and key in new and old[key] == new[key]:
+                    identical += 1
+                    continue
+                if key not in new:
+                    legacy_only += 1
+                elif key not in old:
+                    current_only += 1
+                else:
+                    changed += 1
+                if args.diff:
+                    print(f"\n--- {name} {os.path.relpath(path, PROJECT_ROOT)} #{key[0]}")
+                    print(f"  previous: {old.get(key)}")
+                    print(f"  current:  {new.get(key)}")
+
+        total = identical + changed + legacy_only
+        print(f"{name:>10}: previous {legacy_time * 1000:7.1f} ms ({size_mb / legacy_time:5.1f} MB/s, "
+              f"{sum(map(len, legacy_results))} q) | tokenizer {current_time * 1000:7.1f} ms "
+              f"({size_mb / current_time:5.1f} MB/s, {sum(map(len, current_results))} q) | "
+              f"{identical}/{total} identical, {changed} changed, {legacy_only} only previous, {current_only} only tokenizer")
+
+    path = long_block_file(args.block_lines)
+    for name, consumer, legacy, current in CONSUMERS:
+        legacy_time, _ = timed(consumer, legacy, [path], args.repeat)
+        current_time, _ = timed(consumer, current, [path], args.repeat)
+        print(f"{name:>10}: {args.block_lines}-line block: previous {legacy_time * 1000:7.1f} ms | "
+              f"tokenizer {current_time * 1000:7.1f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
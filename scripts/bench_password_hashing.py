@@ -0,0 +1,73 @@
+"""
+Login throughput benchmark: bcrypt verification in the request threadpool (old
+sync /api/auth/login) vs the dedicated password process pool (auth.verify_and_update_async).
+
+While a burst of logins is running, a probe keeps submitting trivial "other sync route"
+tasks to the request threadpool and records how long they wait.
+
+Usage (from the project root):
+    JWT_SECRET_KEY=bench python scripts/bench_password_hashing.py [logins] [threadpool_size]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.core import auth
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+THREADPOOL_SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 40  # anyio's default for FastAPI sync routes
+
+
+async def probe(pool, stop, waits):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = time.perf_counter()
+        await loop.run_in_executor(pool, lambda: None)
+        waits.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def run(mode, password, hashed):
+    pool = ThreadPoolExecutor(max_workers=THREADPOOL_SIZE)
+    loop = asyncio.get_running_loop()
+    stop, waits = asyncio.Event(), []
+    probe_task = asyncio.create_task(probe(pool, stop, waits))
+
+    start = time.perf_counter()
+    if mode == "threadpool":
+        results = await asyncio.gather(*[
+            loop.run_in_executor(pool, auth.verify_password, password, hashed) for _ in range(LOGINS)
+        ])
+    else:
+        results = [ok for ok, _ in await asyncio.gather(*[
+            auth.verify_and_update_async(password, hashed) for _ in range(LOGINS)
+        ])]
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+    pool.shutdown()
+    assert all(results)
+    p95 = statistics.quantiles(waits, n=20)[-1] if len(waits) >= 20 else max(waits, default=0)
+    print(f"{mode:>12}: {LOGINS / elapsed:6.1f} logins/sec | other-route wait p95 {p95:7.1f} ms (n={len(waits)})")
+
+
+async def main():
+    password = "correct horse battery staple"
+    hashed = auth.get_password_hash(password)
+    print(f"bcrypt rounds={auth.BCRYPT_ROUNDS}, logins={LOGINS}, threadpool={THREADPOOL_SIZE}, "
+          f"password workers={auth.PASSWORD_WORKERS}, cpus={os.cpu_count()}")
+    await run("threadpool", password, hashed)
+    await auth.verify_and_update_async(password, hashed)  # warm up the process pool
+    await run("processpool", password, hashed)
+    auth.shutdown_password_executor()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+Concurrent write benchmark for POST /api/submit.
+
+Starts the API under uvicorn (several worker processes) against a scratch database, then
+N clients each submit answers back to back. Reports throughput, latency and failed requests
+(e.g. 500s caused by "database is locked") for every backend/profile combination:
+
+  - sqlite   legacy: rollback journal, synchronous=FULL, default driver timeout (pre-tuning engine)
+  - sqlite   tuned:  the profile in agent_core/database.py (WAL, NORMAL, busy_timeout, cache, mmap)
+  - postgres legacy / tuned: SQLAlchemy's default pool sizes vs DB_POOL_SIZE / DB_MAX_OVERFLOW
+                             (only when BENCH_POSTGRES_URL is set)
+
+The scratch databases are DROPPED AND RE-CREATED: never point BENCH_POSTGRES_URL at real data.
+
+Usage (from the project root):
+    python scripts/bench_submit_concurrency.py [clients] [requests_per_client] [workers]
+    BENCH_POSTGRES_URL=postgresql://user:pw@localhost/reharz_bench python scripts/bench_submit_concurrency.py
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("JWT_SECRET_KEY", "bench")
+sys.path.append(PROJECT_ROOT)
+
+import httpx
+from sqlalchemy.orm import Session
+
+from agent_core import migrations
+from agent_core.core import auth
+from agent_core.database import Base, create_configured_engine
+from agent_core.models import main_models as M
+
+CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+REQUESTS_PER_CLIENT = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+WORKERS = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+
+PROFILES = {
+    "sqlite": {
+        "legacy": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL", "SQLITE_BUSY_TIMEOUT_MS": "5000",
+                   "SQLITE_CACHE_SIZE_KB": "2000", "SQLITE_MMAP_SIZE": "0"},
+        "tuned": {},
+    },
+    "postgresql": {
+        "legacy": {"DB_POOL_SIZE": "5", "DB_MAX_OVERFLOW": "10"},
+        "tuned": {},
+    },
+}
+
+
+def prepare(url):
+    """Fresh schema plus one exam, a few questions and one user per client. Returns (question_ids, tokens)."""
+    engine = create_configured_engine(url)
+    Base.metadata.drop_all(bind=engine)
+    migrations.version_table.drop(bind=engine, checkfirst=True)
+    migrations.migrate(engine)
+    with Session(engine) as db:
+        exam = M.Exam(name="JAMB", category=M.ExamCategory.ACADEMICS)
+        db.add(exam)
+        db.flush()
+        subject = M.Subject(name="Mathematics", exam_id=exam.id)
+        db.add(subject)
+        db.flush()
+        questions = [M.Question(subject_id=subject.id, text=f"Question {i}", topic=f"Topic {i % 5}") for i in range(50)]
+        users = [M.User(username=f"bench{i}", email=f"bench{i}@example.com", hashed_password="x") for i in range(CLIENTS)]
+        db.add_all(questions + users)
+        db.commit()
+        question_ids = [q.id for q in questions]
+        tokens = [(u.id, auth.create_access_token({"sub": u.username, "user_id": u.id})) for u in users]
+    engine.dispose()
+    return question_ids, tokens
+
+
+def start_server(url, overrides):
+    env = {**os.environ, **overrides, "DATABASE_URL": url, "ENFORCE_HTTPS": "False",
+           "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-bench", "RATE_LIMIT_MAX_REQUESTS": "100000000"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "agent_core.main:app", "--port", str(PORT), "--workers", str(WORKERS),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{PORT}/").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("uvicorn did not come up within 60s")
+
+
+async def client(http, user_id, token, question_ids, latencies, failures):
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(REQUESTS_PER_CLIENT):
+        body = {"user_id": user_id, "question_id": question_ids[(user_id + i) % len(question_ids)],
+                "selected_label": "A", "is_correct": i % 2 == 0, "topic": f"Topic {i % 5}", "difficulty": "medium"}
+        start = time.perf_counter()
+        try:
+            response = await http.post("/api/submit", json=body, headers=headers)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not ok:
+            failures.append(1)
+
+
+async def hammer(tokens, question_ids):
+    latencies, failures = [], []
+    limits = httpx.Limits(max_connections=CLIENTS)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", limits=limits, timeout=60) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*[client(http, uid, token, question_ids, latencies, failures) for uid, token in tokens])
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, len(failures)
+
+
+def run(backend, url):
+    for profile, overrides in PROFILES[backend].items():
+        question_ids, tokens = prepare(url)
+        server = start_server(url, overrides)
+        try:
+            elapsed, latencies, failures = asyncio.run(hammer(tokens, question_ids))
+        finally:
+            server.terminate()
+            server.wait()
+        total = len(latencies)
+        p50 = statistics.median(latencies)
+        p95 = statistics.quantiles(latencies, n=20)[-1]
+        print(f"{backend:>10} {profile:>6}: {total / elapsed:7.1f} req/s | p50 {p50:7.1f} ms | p95 {p95:7.1f} ms | "
+              f"failed {failures}/{total}")
+
+
+def main():
+    print(f"clients={CLIENTS}, requests/client={REQUESTS_PER_CLIENT}, uvicorn workers={WORKERS}, cpus={os.cpu_count()}")
+    run("sqlite", f"sqlite:///{tempfile.mkdtemp()}/bench_submit.db")
+    postgres_url = os.getenv("BENCH_POSTGRES_URL")
+    if postgres_url:
+        run("postgresql", postgres_url)
+    else:
+        print("  postgresql: skipped (set BENCH_POSTGRES_URL to include it)")
+
+
+if __name__ == "__main__":
+    main()
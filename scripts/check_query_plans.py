@@ -0,0 +1,206 @@
+"""
+Query plan regression check for the hot API paths.
+
+Seeds a scratch database, drives the endpoints below through the app while
+recording every SQL statement they issue, then EXPLAINs each statement and
+fails (exit code 1) if any plan scans questions, choices or user_progress
+sequentially instead of going through an index.
+
+  - SQLite:   EXPLAIN QUERY PLAN, "SCAN <table>" rows are violations
+  - Postgres: EXPLAIN (FORMAT JSON) with enable_seqscan=off, "Seq Scan" nodes are violations
+              (on tiny tables the planner would otherwise seq-scan regardless of indexes)
+
+The scratch database is DROPPED AND RE-CREATED: never point this at real data.
+
+Usage (from the project root):
+    python scripts/check_query_plans.py                                   # temporary SQLite file
+    QUERY_PLAN_DATABASE_URL=postgresql://user:pw@localhost/reharz_plans python scripts/check_query_plans.py
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+SCRATCH_URL = os.getenv("QUERY_PLAN_DATABASE_URL") or f"sqlite:///{tempfile.mkdtemp()}/query_plans.db"
+os.environ["DATABASE_URL"] = SCRATCH_URL
+os.environ.setdefault("JWT_SECRET_KEY", "query-plan-check")
+os.environ.setdefault("OPENAI_API_KEY", "sk-query-plan-check")
+os.environ["ENFORCE_HTTPS"] = "False"
+os.environ["GRADER_BACKEND"] = "stub"
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, text
+
+from agent_core.database import Base, engine, SessionLocal
+from agent_core import migrations
+
+# Start from an empty schema so the check never depends on leftovers
+Base.metadata.drop_all(bind=engine)
+migrations.version_table.drop(bind=engine, checkfirst=True)
+migrations.migrate(engine)
+
+from fastapi.testclient import TestClient
+
+import agent_core.main as main
+from agent_core.core import auth
+from agent_core.core.agent import ExamAgent
+from agent_core.models import main_models as M
+
+WATCHED_TABLES = {"questions", "choices", "user_progress"}
+
+
+def seed(db):
+    # Realistic cardinalities (many exams and subjects) so planners weigh indexes as they would in production
+    exams = [M.Exam(name="JAMB", category=M.ExamCategory.ACADEMICS),
+             M.Exam(name="ICAN", category=M.ExamCategory.PROFESSIONAL, sub_category="Foundation")]
+    exams += [M.Exam(name=f"Exam {i}", category=M.ExamCategory.ACADEMICS) for i in range(10)]
+    db.add_all(exams)
+    db.flush()
+    subjects = [M.Subject(name=f"Subject {i}", exam_id=exams[i % len(exams)].id) for i in range(60)]
+    db.add_all(subjects)
+    db.flush()
+    questions = []
+    for i in range(6000):
+        theory = i % 7 == 0
+        questions.append(M.Question(
+            subject_id=subjects[i % len(subjects)].id, text=f"Question {i}", topic=f"Topic {i % 9}",
+            year=2018 + i % 6, section="Section B: Theory" if theory else "Section A: Multiple Choice",
+            explanation=f"Explanation {i}", difficulty=M.DifficultyLevel.MEDIUM
+        ))
+    db.add_all(questions)
+    db.flush()
+    db.add_all([
+        M.Choice(question_id=q.id, label=label, text=f"{label}{q.id}", is_correct=label == "A")
+        for q in questions if q.section.startswith("Section A") for label in "ABCD"
+    ])
+    user = M.User(username="planner", email="planner@example.com", hashed_password="x")
+    other = M.User(username="other", email="other@example.com", hashed_password="x")
+    db.add_all([user, other])
+    db.flush()
+    db.add_all([
+        M.UserProgress(user_id=(user if i % 3 else other).id, question_id=questions[i].id, topic=questions[i].topic,
+                       difficulty=M.DifficultyLevel.MEDIUM, is_correct=i % 2 == 0)
+        for i in range(1000)
+    ])
+    db.commit()
+    return user, subjects, questions
+
+
+def exercise(client, headers, user, subjects, questions):
+    """Drives the hot endpoints; every statement they run is recorded."""
+    mcq = [q for q in questions if q.section.startswith("Section A")]
+    client.get(f"/api/subjects/{subjects[0].id}/questions", headers=headers)
+    client.get(f"/api/questions/{mcq[0].id}", headers=headers)
+    client.post("/api/submit", json={"user_id": user.id, "question_id": mcq[1].id, "selected_label": "A",
+                                     "is_correct": True, "topic": mcq[1].topic}, headers=headers)
+    client.get(f"/api/history/{user.id}", headers=headers)
+    client.get(f"/api/user/stats/{user.id}", headers=headers)
+    client.get(f"/api/simulation/sessions/{user.id}", headers=headers)
+
+    jamb_subject = subjects[0]
+    started = client.post("/api/simulation/start", json={
+        "user_id": user.id, "exam_id": jamb_subject.exam_id, "subject_id": jamb_subject.id,
+        "question_count": 20, "year": 2019
+    }, headers=headers).json()
+    client.post("/api/simulation/start", json={
+        "user_id": user.id, "exam_id": subjects[1].exam_id, "subject_id": subjects[1].id,
+        "section": "full exam"
+    }, headers=headers)
+    client.post("/api/simulation/start", json={
+        "user_id": user.id, "exam_id": jamb_subject.exam_id, "topics": ["Topic 1"], "question_count": 10
+    }, headers=headers)
+
+    answers = {str(q["id"]): "A" for q in started.get("questions", [])}
+    job = client.post("/api/simulation/submit", json={"session_id": started["session_id"], "answers": answers}, headers=headers).json()
+    for _ in range(50):
+        if client.get(f"/api/jobs/{job['job_id']}", headers=headers).json()["status"] in ("done", "failed"):
+            break
+        time.sleep(0.1)
+
+    agent = ExamAgent()
+    try:
+        agent.get_weak_topics(user.id)
+        agent.get_adaptive_v2(user.id, "JAMB")
+        agent.get_practice_batch(user.id, "JAMB", 5)
+        agent.get_session_summary(user.id, 10)
+        agent.get_simulation_history(user.id)
+        agent.log_answer(user.id, mcq[2].id, False)
+    finally:
+        agent.close()
+
+
+def watched(statement):
+    return any(re.search(rf"\b{t}\b", statement) for t in WATCHED_TABLES)
+
+
+def explain(conn, statement, params):
+    if engine.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params).fetchall()
+        violations = []
+        for row in rows:
+            detail = row[-1]
+            match = re.match(r"SCAN (\w+)", detail)
+            if match and match.group(1) in WATCHED_TABLES:
+                violations.append(detail)
+        return violations
+
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params).scalar()
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    violations = []
+
+    def walk(node):
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in WATCHED_TABLES:
+            violations.append(f"Seq Scan on {node['Relation Name']}")
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return violations
+
+
+def main_check():
+    db = SessionLocal()
+    user, subjects, questions = seed(db)
+    token = auth.create_access_token({"sub": user.username, "user_id": user.id})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and watched(statement):
+            captured.append((statement, parameters))
+
+    if engine.dialect.name == "sqlite":
+        # Let the planner see realistic row counts
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    event.listen(engine, "before_cursor_execute", record)
+    with TestClient(main.app) as client:
+        exercise(client, headers, user, subjects, questions)
+    event.remove(engine, "before_cursor_execute", record)
+
+    seen, failures = set(), []
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+        for statement, params in captured:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            violations = explain(conn, statement, params)
+            if violations:
+                failures.append((statement, violations))
+
+    print(f"Checked {len(seen)} distinct statement(s) on {engine.dialect.name}")
+    for statement, violations in failures:
+        print("\nFAIL:", "; ".join(violations))
+        print("  " + " ".join(statement.split())[:400])
+    db.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
@@ -34,7 +34,7 @@ def migrate():
     
     for table_name in tables:
         if table_name not in pg_metadata.tables:
-            print(f"Table {table_name} missing in Postgres. Ensure backend has run to create tables.")
+            print(f"Table {table_name} missing in Postgres. Run `python -m agent_core.migrations` first to create tables.")
             continue
             
         pg_table = pg_metadata.tables[table_name]